@@ -0,0 +1,162 @@
+from __future__ import annotations
+
+import logging
+import queue
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future
+from dataclasses import dataclass, field
+from typing import Deque, Dict, List, Optional
+
+import numpy as np
+
+from .embeddings import EmbeddingService
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class _Pending:
+	text: str
+	normalize: bool
+	enqueued: float
+	future: "Future[np.ndarray]" = field(default_factory=Future)
+
+
+class BatcherStats:
+	"""Thread-safe counters for batch sizes and queueing delay."""
+
+	def __init__(self, window: int = 1024) -> None:
+		self._lock = threading.Lock()
+		self.batches: int = 0
+		self.items: int = 0
+		self.max_batch: int = 0
+		self.batch_sizes: Dict[int, int] = {}
+		self._delays_ms: Deque[float] = deque(maxlen=window)
+		self._encode_ms: Deque[float] = deque(maxlen=window)
+
+	def record(self, batch_size: int, delays_ms: List[float], encode_ms: float) -> None:
+		with self._lock:
+			self.batches += 1
+			self.items += batch_size
+			self.max_batch = max(self.max_batch, batch_size)
+			self.batch_sizes[batch_size] = self.batch_sizes.get(batch_size, 0) + 1
+			self._delays_ms.extend(delays_ms)
+			self._encode_ms.append(encode_ms)
+
+	@staticmethod
+	def _pct(values: Deque[float], q: float) -> float:
+		return float(np.percentile(np.asarray(values), q)) if values else 0.0
+
+	def snapshot(self) -> Dict:
+		with self._lock:
+			return {
+				"batches": self.batches,
+				"items": self.items,
+				"avg_batch_size": self.items / self.batches if self.batches else 0.0,
+				"max_batch_size": self.max_batch,
+				"batch_size_counts": dict(sorted(self.batch_sizes.items())),
+				"queue_delay_ms": {
+					"p50": self._pct(self._delays_ms, 50),
+					"p95": self._pct(self._delays_ms, 95),
+					"max": max(self._delays_ms, default=0.0),
+				},
+				"encode_ms": {
+					"p50": self._pct(self._encode_ms, 50),
+					"p95": self._pct(self._encode_ms, 95),
+				},
+			}
+
+
+class EmbeddingBatcher:
+	"""Coalesce single-query encodes from concurrent requests into one batch.
+
+	A background thread takes the first waiting query, then keeps collecting
+	until ``window_ms`` has passed since that query arrived or ``max_batch``
+	queries are queued, encodes them in one call and hands each caller its row.
+	"""
+
+	def __init__(
+		self, service: EmbeddingService, window_ms: float = 2.0, max_batch: int = 32
+	) -> None:
+		self.service = service
+		self.window_s = max(float(window_ms), 0.0) / 1000.0
+		self.max_batch = max(int(max_batch), 1)
+		self.stats = BatcherStats()
+		self._queue: "queue.Queue[Optional[_Pending]]" = queue.Queue()
+		self._thread = threading.Thread(target=self._run, name="embedding-batcher", daemon=True)
+		self._thread.start()
+
+	def submit(self, text: str, normalize: bool = False) -> "Future[np.ndarray]":
+		"""Queue one text; the future resolves to its row once its batch is encoded.
+
+		Async callers await it (``asyncio.wrap_future``) instead of parking a
+		thread on it; cancelling it before its batch starts drops the text.
+		"""
+		pending = _Pending(text=text, normalize=normalize, enqueued=time.perf_counter())
+		self._queue.put(pending)
+		return pending.future
+
+	def encode_one(
+		self, text: str, normalize: bool = False, timeout: Optional[float] = None
+	) -> np.ndarray:
+		"""Encode one text; blocks until its batch has been encoded."""
+		return self.submit(text, normalize=normalize).result(timeout=timeout)
+
+	def close(self) -> None:
+		self._queue.put(None)
+		self._thread.join(timeout=5.0)
+
+	def _run(self) -> None:
+		while True:
+			first = self._queue.get()
+			if first is None:
+				return
+			batch = [first]
+			deadline = first.enqueued + self.window_s
+			closing = False
+			while len(batch) < self.max_batch:
+				remaining = deadline - time.perf_counter()
+				try:
+					item = (
+						self._queue.get(timeout=remaining)
+						if remaining > 0
+						else self._queue.get_nowait()
+					)
+				except queue.Empty:
+					break
+				if item is None:
+					closing = True
+					break
+				batch.append(item)
+			self._flush(batch)
+			if closing:
+				return
+
+	def _flush(self, batch: List[_Pending]) -> None:
+		# Skip callers that gave up; the rest can no longer be cancelled
+		batch = [p for p in batch if p.future.set_running_or_notify_cancel()]
+		if not batch:
+			return
+		started = time.perf_counter()
+		try:
+			# Encode unnormalized once; callers asking for unit vectors get their row L2-normalized
+			emb = self.service.encode(
+				[p.text for p in batch], batch_size=len(batch), normalize=False
+			)
+		except Exception as e:  # propagate to every waiting caller
+			logger.error("Batched encode of %d queries failed: %s", len(batch), e)
+			for p in batch:
+				p.future.set_exception(e)
+			return
+		done = time.perf_counter()
+		for p, row in zip(batch, emb):
+			if p.normalize:
+				row = row / (np.linalg.norm(row) + 1e-12)
+			p.future.set_result(row)
+		self.stats.record(
+			len(batch),
+			[(started - p.enqueued) * 1000.0 for p in batch],
+			(done - started) * 1000.0,
+		)
@@ -0,0 +1,212 @@
+from __future__ import annotations
+
+import math
+import re
+import threading
+from collections import Counter
+from pathlib import Path
+from typing import Dict, Iterable, List, Literal, Optional, Tuple
+
+import numpy as np
+
+from .preprocess import normalize_text
+
+Fusion = Literal["rrf", "weighted"]
+_token_re = re.compile(r"\w+")
+
+
+def tokenize(text: str) -> List[str]:
+	"""Lexical tokens: the ``normalize_text`` form of ``text`` split on non-word characters."""
+	return _token_re.findall(normalize_text(text))
+
+
+class BM25Index:
+	"""Okapi BM25 over an inverted index held in compact NumPy arrays.
+
+	- Postings are CSR: ``offsets[t]:offsets[t+1]`` slices ``doc_ids``/``tfs`` for term ``t``
+	- Scoring a query touches only its terms' postings and scatters their
+		weights into one ``(N,)`` score array with vectorized ops
+	- Rows appended after the build go to a small per-term tail that is merged
+		into the CSR arrays once it grows past a fraction of the main postings
+	"""
+
+	def __init__(self, k1: float = 1.2, b: float = 0.75) -> None:
+		self.k1 = float(k1)
+		self.b = float(b)
+		self._vocab: Dict[str, int] = {}
+		self._offsets: np.ndarray = np.zeros((1,), dtype=np.int64)
+		self._doc_ids: np.ndarray = np.empty((0,), dtype=np.int32)
+		self._tfs: np.ndarray = np.empty((0,), dtype=np.float32)
+		self._tail: Dict[int, Tuple[List[int], List[float]]] = {}
+		self._tail_postings: int = 0
+		self._doc_len: np.ndarray = np.zeros((16,), dtype=np.float32)
+		self.n_docs: int = 0
+		self._total_len: float = 0.0
+		self._lock = threading.Lock()
+
+	@classmethod
+	def from_texts(cls, texts: Iterable[str], k1: float = 1.2, b: float = 0.75) -> "BM25Index":
+		index = cls(k1=k1, b=b)
+		index.add(texts)
+		index.merge()
+		return index
+
+	def add(self, texts: Iterable[str]) -> None:
+		"""Append documents; row numbers continue from ``n_docs``."""
+		with self._lock:
+			for text in texts:
+				tokens = tokenize(text)
+				row = self.n_docs
+				if row >= self._doc_len.shape[0]:
+					grown = np.zeros((2 * self._doc_len.shape[0],), dtype=np.float32)
+					grown[:row] = self._doc_len[:row]
+					self._doc_len = grown
+				self._doc_len[row] = len(tokens)
+				self._total_len += len(tokens)
+				self.n_docs += 1
+				for term, tf in Counter(tokens).items():
+					tid = self._vocab.setdefault(term, len(self._vocab))
+					rows, tfs = self._tail.setdefault(tid, ([], []))
+					rows.append(row)
+					tfs.append(float(tf))
+					self._tail_postings += 1
+			if self._tail_postings > max(4096, self._doc_ids.shape[0] // 10):
+				self._merge_locked()
+
+	def merge(self) -> None:
+		"""Fold the tail postings into the CSR arrays."""
+		with self._lock:
+			self._merge_locked()
+
+	def _merge_locked(self) -> None:
+		if not self._tail:
+			return
+		n_main_terms = self._offsets.shape[0] - 1
+		main_tids = np.repeat(np.arange(n_main_terms, dtype=np.int64), np.diff(self._offsets))
+		tail_tids = np.concatenate(
+			[np.full((len(r),), t, dtype=np.int64) for t, (r, _) in self._tail.items()]
+		)
+		tail_docs = np.concatenate([np.asarray(r, dtype=np.int32) for r, _ in self._tail.values()])
+		tail_tfs = np.concatenate([np.asarray(f, dtype=np.float32) for _, f in self._tail.values()])
+		tids = np.concatenate([main_tids, tail_tids])
+		# Stable sort keeps each term's postings in row order (tail rows come after main rows)
+		order = np.argsort(tids, kind="stable")
+		self._doc_ids = np.concatenate([self._doc_ids, tail_docs])[order]
+		self._tfs = np.concatenate([self._tfs, tail_tfs])[order]
+		self._offsets = np.zeros((len(self._vocab) + 1,), dtype=np.int64)
+		self._offsets[1:] = np.cumsum(np.bincount(tids, minlength=len(self._vocab)))
+		self._tail = {}
+		self._tail_postings = 0
+
+	def _postings(self, tid: int) -> Tuple[np.ndarray, np.ndarray]:
+		if tid + 1 < self._offsets.shape[0]:
+			lo, hi = self._offsets[tid], self._offsets[tid + 1]
+			rows, tfs = self._doc_ids[lo:hi], self._tfs[lo:hi]
+		else:
+			rows, tfs = self._doc_ids[:0], self._tfs[:0]
+		tail = self._tail.get(tid)
+		if tail is not None:
+			rows = np.concatenate([rows, np.asarray(tail[0], dtype=np.int32)])
+			tfs = np.concatenate([tfs, np.asarray(tail[1], dtype=np.float32)])
+		return rows, tfs
+
+	def score(self, query: str, n: Optional[int] = None) -> np.ndarray:
+		"""BM25 score of every row for ``query``, a float32 ``(n,)`` array (0 = no shared term)."""
+		n = self.n_docs if n is None else n
+		scores = np.zeros((n,), dtype=np.float32)
+		with self._lock:
+			if self.n_docs == 0:
+				return scores
+			avgdl = self._total_len / self.n_docs or 1.0
+			for term, qtf in Counter(tokenize(query)).items():
+				tid = self._vocab.get(term)
+				if tid is None:
+					continue
+				rows, tfs = self._postings(tid)
+				keep = rows < n
+				rows, tfs = rows[keep], tfs[keep]
+				df = rows.shape[0]
+				if df == 0:
+					continue
+				idf = math.log(1.0 + (self.n_docs - df + 0.5) / (df + 0.5))
+				norm = self.k1 * (1.0 - self.b + self.b * self._doc_len[rows] / avgdl)
+				# A term occurs once per row in its postings, so plain fancy-index += is safe
+				scores[rows] += qtf * idf * tfs * (self.k1 + 1.0) / (tfs + norm)
+		return scores
+
+	def save(self, path: Path) -> None:
+		"""Write the merged postings as one ``.npz`` (terms as a UTF-8 blob plus offsets)."""
+		self.merge()
+		terms = sorted(self._vocab, key=self._vocab.__getitem__)
+		encoded = [t.encode("utf-8") for t in terms]
+		term_offsets = np.zeros((len(encoded) + 1,), dtype=np.int64)
+		term_offsets[1:] = np.cumsum([len(e) for e in encoded])
+		tmp_path = path.with_name(path.name + ".tmp.npz")
+		np.savez(
+			str(tmp_path),
+			terms_blob=np.frombuffer(b"".join(encoded), dtype=np.uint8),
+			terms_offsets=term_offsets,
+			offsets=self._offsets,
+			doc_ids=self._doc_ids,
+			tfs=self._tfs,
+			doc_len=self._doc_len[: self.n_docs],
+			params=np.array([self.k1, self.b], dtype=np.float64),
+		)
+		tmp_path.replace(path)
+
+	@classmethod
+	def load(cls, path: Path) -> "BM25Index":
+		with np.load(str(path)) as z:
+			k1, b = (float(x) for x in z["params"])
+			index = cls(k1=k1, b=b)
+			blob = z["terms_blob"].tobytes()
+			term_offsets = z["terms_offsets"]
+			index._vocab = {
+				blob[term_offsets[i]:term_offsets[i + 1]].decode("utf-8"): i
+				for i in range(term_offsets.shape[0] - 1)
+			}
+			index._offsets = z["offsets"]
+			index._doc_ids = z["doc_ids"]
+			index._tfs = z["tfs"]
+			doc_len = z["doc_len"]
+		index.n_docs = int(doc_len.shape[0])
+		index._doc_len = np.zeros((max(16, index.n_docs),), dtype=np.float32)
+		index._doc_len[: index.n_docs] = doc_len
+		index._total_len = float(doc_len.sum())
+		return index
+
+
+def fuse_results(
+	vector_hits: List[Tuple[str, float, Dict]],
+	lexical_hits: List[Tuple[str, float, Dict]],
+	k: int,
+	fusion: Fusion = "rrf",
+	alpha: float = 0.5,
+	rrf_k: int = 60,
+) -> List[Tuple[str, float, Dict]]:
+	"""Merge two ranked hit lists into one top-k.
+
+	``rrf``: sum of ``1 / (rrf_k + rank)`` over the lists a hit appears in.
+	``weighted``: ``alpha * vector + (1 - alpha) * lexical`` after min-max
+	scaling each list's scores to [0, 1]; a hit missing from a list gets 0 there.
+	"""
+	fused: Dict[str, float] = {}
+	metas: Dict[str, Dict] = {}
+	for weight, hits in ((alpha, vector_hits), (1.0 - alpha, lexical_hits)):
+		if not hits:
+			continue
+		if fusion == "rrf":
+			contrib = [1.0 / (rrf_k + rank + 1) for rank in range(len(hits))]
+		elif fusion == "weighted":
+			values = np.asarray([h[1] for h in hits], dtype=np.float64)
+			span = float(values.max() - values.min())
+			contrib = list(
+				weight * ((values - values.min()) / span if span > 0 else np.ones_like(values))
+			)
+		else:
+			raise ValueError(f"unknown fusion: {fusion}")
+		for (record_id, _, meta), c in zip(hits, contrib):
+			fused[record_id] = fused.get(record_id, 0.0) + float(c)
+			metas.setdefault(record_id, meta)
+	ranked = sorted(fused.items(), key=lambda kv: -kv[1])[:k]
+	return [(record_id, score, metas[record_id]) for record_id, score in ranked]
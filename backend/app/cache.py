@@ -0,0 +1,113 @@
+from __future__ import annotations
+
+import threading
+import time
+import weakref
+from collections import OrderedDict
+from typing import Any, Dict, Generic, Hashable, Optional, Tuple, TypeVar
+
+V = TypeVar("V")
+
+
+class LRUCache(Generic[V]):
+	"""Bounded, thread-safe LRU cache with an optional per-entry TTL.
+
+	``maxsize=0`` disables caching (every ``get`` is a miss, ``put`` is a no-op).
+	"""
+
+	def __init__(self, maxsize: int, ttl_s: Optional[float] = None) -> None:
+		self.maxsize = max(int(maxsize), 0)
+		self.ttl_s = ttl_s if ttl_s and ttl_s > 0 else None
+		self._data: "OrderedDict[Hashable, Tuple[float, V]]" = OrderedDict()
+		self._lock = threading.Lock()
+		self.hits = 0
+		self.misses = 0
+		self.evictions = 0
+		self.expirations = 0
+		self.invalidations = 0
+
+	def get(self, key: Hashable) -> Optional[V]:
+		with self._lock:
+			entry = self._data.get(key)
+			if entry is None:
+				self.misses += 1
+				return None
+			stored_at, value = entry
+			if self.ttl_s is not None and time.monotonic() - stored_at > self.ttl_s:
+				del self._data[key]
+				self.expirations += 1
+				self.misses += 1
+				return None
+			self._data.move_to_end(key)
+			self.hits += 1
+			return value
+
+	def put(self, key: Hashable, value: V) -> None:
+		if self.maxsize == 0:
+			return
+		with self._lock:
+			self._data[key] = (time.monotonic(), value)
+			self._data.move_to_end(key)
+			while len(self._data) > self.maxsize:
+				self._data.popitem(last=False)
+				self.evictions += 1
+
+	def clear(self) -> None:
+		with self._lock:
+			if self._data:
+				self.invalidations += 1
+			self._data.clear()
+
+	def __len__(self) -> int:
+		return len(self._data)
+
+	def stats(self) -> Dict[str, Any]:
+		with self._lock:
+			lookups = self.hits + self.misses
+			return {
+				"size": len(self._data),
+				"maxsize": self.maxsize,
+				"ttl_s": self.ttl_s,
+				"hits": self.hits,
+				"misses": self.misses,
+				"hit_rate": self.hits / lookups if lookups else 0.0,
+				"evictions": self.evictions,
+				"expirations": self.expirations,
+				"invalidations": self.invalidations,
+			}
+
+
+class BoundLRUCache(LRUCache[V]):
+	"""LRU cache whose entries are only valid for one owner object and its ``version``.
+
+	``bind`` is called before every lookup; it clears the cache when the owner
+	(e.g. the index or the embedding model) was replaced, or when its
+	``version`` attribute changed since the last call.
+	"""
+
+	def __init__(self, maxsize: int, ttl_s: Optional[float] = None) -> None:
+		super().__init__(maxsize, ttl_s)
+		self._owner_ref: Optional[weakref.ref] = None
+		self._owner_version: int = -1
+
+	def _is_bound(self, owner: Any) -> bool:
+		current = self._owner_ref() if self._owner_ref is not None else None
+		return current is owner and int(getattr(owner, "version", 0)) == self._owner_version
+
+	def bind(self, owner: Any) -> None:
+		if self._is_bound(owner):
+			return
+		self.clear()
+		self._owner_ref = weakref.ref(owner)
+		self._owner_version = int(getattr(owner, "version", 0))
+
+	def put(self, key: Hashable, value: V, owner: Any = None) -> None:
+		"""Store ``value``; with ``owner``, only if it is still the bound owner and version.
+
+		A value computed while the owner was replaced or changed (e.g. a search
+		still running on an index that a reload swapped out) is dropped rather
+		than cached under the new owner.
+		"""
+		if owner is not None and not self._is_bound(owner):
+			return
+		super().put(key, value)
@@ -40,10 +40,216 @@ class Settings(BaseSettings):
 		default_factory=lambda: ["http://localhost:5173"],
 		description="Allowed CORS origins",
 	)
+	shared_index_dir: Optional[Path] = Field(
+		default=None,
+		description=(
+			"Serve read-only index generations published here (scripts/publish_index.py) "
+			"instead of index_dir"
+		),
+	)
+	shared_index_poll_s: float = Field(
+		default=1.0,
+		gt=0.0,
+		description="How often workers check for a new shared generation",
+	)
+	index_watch: bool = Field(
+		default=False,
+		description="Reload the index when a new one is saved to index_dir (e.g. by reindex.py)",
+	)
+	index_watch_poll_s: float = Field(
+		default=2.0,
+		gt=0.0,
+		description="How often index_dir/index.json is checked when index_watch is on",
+	)
+	admin_token: Optional[str] = Field(
+		default=None,
+		description="X-Admin-Token for /admin endpoints, which are refused (403) while unset",
+	)
+	index_format: Literal["npz", "npy"] = Field(
+		default="npz",
+		description="npz = compressed data.npz; npy = per-array .npy files memory-mapped on load",
+	)
 	batch_size: int = Field(default=64, ge=1, le=1024)
-	device: Literal["auto", "cpu", "cuda", "mps"] = Field(default="auto", description="Unused in MVP; library default device is used.")
+	embed_token_budget: int = Field(
+		default=8192,
+		ge=0,
+		description=(
+			"Padded tokens per encoder batch in index builds, texts sorted by length "
+			"(0 = batch_size texts in file order)"
+		),
+	)
+	embed_chunk_size: int = Field(
+		default=4096, ge=1, description="Entries read and encoded per chunk when building the index"
+	)
+	stream_build: bool = Field(
+		default=False,
+		description="Stream the dataset and build rows in memmapped scratch files (bounded memory)",
+	)
+	embed_batch_window_ms: float = Field(
+		default=2.0, ge=0.0, description="Window for coalescing concurrent query encodes (0 = off)"
+	)
+	embed_max_batch: int = Field(
+		default=32,
+		ge=1,
+		le=1024,
+		description="Max queries per coalesced encode",
+	)
+	query_cache_size: int = Field(
+		default=10000,
+		ge=0,
+		description="Max cached query embeddings (0 = off)",
+	)
+	result_cache_size: int = Field(
+		default=10000,
+		ge=0,
+		description="Max cached search results (0 = off)",
+	)
+	cache_ttl_s: float = Field(
+		default=300.0,
+		ge=0.0,
+		description="Cache entry time-to-live in seconds (0 = no expiry)",
+	)
+	compact_tombstone_ratio: float = Field(
+		default=0.2,
+		ge=0.0,
+		le=1.0,
+		description="Compact the index once this fraction of rows is deleted",
+	)
+	persist_after_writes: int = Field(
+		default=1000,
+		ge=0,
+		description="Persist the index once this many row writes are unsaved (0 = off)",
+	)
+	persist_interval_s: float = Field(
+		default=60.0,
+		ge=0.0,
+		description="Persist unsaved writes this many seconds after the last save (0 = off)",
+	)
+	device: Literal["auto", "cpu", "cuda", "mps"] = Field(
+		default="auto",
+		description="Torch device of the encoder (auto = library default)",
+	)
+	encoder_backend: Literal["torch", "onnx"] = Field(
+		default="torch",
+		description=(
+			"torch = SentenceTransformer; onnx = ONNX Runtime export of embed_model "
+			"(exported to onnx_dir on first use)"
+		),
+	)
+	onnx_dir: Path = Field(
+		default_factory=lambda: _project_root() / "backend" / "models" / "onnx",
+		description="Where ONNX exports of embed_model are written and loaded from",
+	)
+	onnx_quantize: bool = Field(
+		default=False,
+		description="Serve the int8 dynamically quantized ONNX model",
+	)
+	onnx_threads: int = Field(
+		default=0,
+		ge=0,
+		description="ONNX Runtime intra-op threads per encode (0 = one per core)",
+	)
 	max_seq_length: Optional[int] = Field(default=512, description="Max sequence length for encoder")
 	normalize_input_text: bool = Field(default=True, description="Apply simple text normalization before encoding")
+	index_type: Literal["flat", "ivf", "hnsw", "pq", "sq", "sharded"] = Field(
+		default="flat",
+		description=(
+			"flat = exact scan, ivf = inverted-file search, hnsw = graph search, "
+			"pq = product-quantized scan, sq = float16/int8 scan, "
+			"sharded = exact scan split across a thread pool"
+		),
+	)
+	ivf_nlist: int = Field(
+		default=100,
+		ge=1,
+		description="Number of IVF coarse centroids (posting lists)",
+	)
+	ivf_nprobe: int = Field(
+		default=8,
+		ge=1,
+		description="Default number of IVF lists scanned per query",
+	)
+	hnsw_m: int = Field(
+		default=16,
+		ge=2,
+		le=256,
+		description="HNSW max neighbors per node (2*M on the base layer)",
+	)
+	hnsw_ef_construction: int = Field(
+		default=200,
+		ge=1,
+		description="HNSW candidate list size while inserting",
+	)
+	hnsw_ef_search: int = Field(
+		default=64,
+		ge=1,
+		description="HNSW candidate list size while searching",
+	)
+	pq_m: int = Field(
+		default=8,
+		ge=1,
+		description="PQ subvectors per row (must divide the embedding dimension)",
+	)
+	pq_rerank: int = Field(
+		default=100,
+		ge=0,
+		description="PQ candidates re-scored exactly from vectors.npy (0 = off)",
+	)
+	sq_dtype: Literal["float16", "int8"] = Field(
+		default="int8",
+		description="Storage dtype of the sq index (int8 uses per-dimension scale/offset)",
+	)
+	sq_rerank: int = Field(
+		default=50,
+		ge=0,
+		description="SQ candidates re-scored in float32 from vectors.npy (0 = off)",
+	)
+	hybrid_candidates: int = Field(
+		default=100,
+		ge=1,
+		le=10000,
+		description="Hits taken from each of vector and BM25 search before hybrid fusion",
+	)
+	search_shards: int = Field(
+		default=0,
+		ge=0,
+		description="Row shards scanned in parallel by the sharded index (0 = one per thread)",
+	)
+	search_threads: int = Field(
+		default=0,
+		ge=0,
+		description="Thread pool size for sharded search (0 = CPU count)",
+	)
+	search_encode_threads: int = Field(
+		default=2,
+		ge=1,
+		description="Threads running query encodes for /search",
+	)
+	search_score_threads: int = Field(
+		default=4,
+		ge=1,
+		description="Threads running index scoring for /search",
+	)
+	search_max_inflight: int = Field(
+		default=64,
+		ge=0,
+		description=(
+			"Search requests admitted at once (running or queued); "
+			"more get HTTP 429 (0 = no limit)"
+		),
+	)
+	search_deadline_ms: float = Field(
+		default=5000.0,
+		ge=0.0,
+		description=(
+			"Default per-request search deadline; past it the request fails with 503 "
+			"(0 = none)"
+		),
+	)
+	server_timing: bool = Field(
+		default=False,
+		description="Add a Server-Timing header with per-stage durations to every response",
+	)
 
 
 @lru_cache
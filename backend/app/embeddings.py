@@ -1,33 +1,189 @@
 from __future__ import annotations
 
 import logging
-from typing import Iterable, List, Optional
+from pathlib import Path
+from typing import TYPE_CHECKING, Any, Iterable, List, Optional, Sequence, Tuple
 
 import numpy as np
-from sentence_transformers import SentenceTransformer
 
 from .preprocess import normalize_text
 
+if TYPE_CHECKING:
+	from .config import Settings
+
 logger = logging.getLogger(__name__)
 
 
+def length_batches(
+	lengths: Sequence[int], token_budget: int, max_batch: int = 512, max_padding: float = 0.1
+) -> List[np.ndarray]:
+	"""Row indices grouped longest first, each group padding to at most ``token_budget`` tokens.
+
+	A group pads to its first (longest) row. It grows until the padded size
+	would pass ``token_budget`` or its padding would exceed ``max_padding`` of
+	its real tokens, so short texts go in large batches, long ones in small
+	batches, and little compute is spent on padding.
+	"""
+	tokens = np.maximum(np.asarray(lengths, dtype=np.int64), 1)
+	order = np.argsort(-tokens, kind="stable")
+	sorted_lengths = tokens[order]
+	batches: List[np.ndarray] = []
+	start = 0
+	n = len(order)
+	while start < n:
+		longest = int(sorted_lengths[start])
+		size = min(max(token_budget // longest, 1), max_batch, n - start)
+		# Real tokens of the first i rows; padding is i * longest minus that
+		real = np.cumsum(sorted_lengths[start : start + size])
+		fits = np.arange(1, size + 1) * longest <= (1.0 + max_padding) * real
+		size = max(int(np.argmin(fits)) if not fits.all() else size, 1)
+		batches.append(order[start : start + size])
+		start += size
+	return batches
+
+
 class EmbeddingService:
-	def __init__(self, model_name: str, device: str = "default", max_seq_length: int | None = 512, normalize_input: bool = True) -> None:
+	"""Text encoder behind the index builders and /search.
+
+	``backend="torch"`` runs the SentenceTransformer model; ``backend="onnx"``
+	runs an ONNX Runtime export of it (created under ``onnx_dir`` on first use,
+	optionally int8-quantized), which needs neither torch nor
+	sentence-transformers once the export exists.
+	"""
+
+	def __init__(
+		self,
+		model_name: str,
+		device: str = "auto",
+		max_seq_length: int | None = 512,
+		normalize_input: bool = True,
+		backend: str = "torch",
+		onnx_dir: Optional[Path] = None,
+		onnx_quantize: bool = False,
+		onnx_threads: int = 0,
+	) -> None:
 		self.model_name = model_name
-		# Keep a simple default to minimize complexity; let the library decide the device
-		self.device = "default"
-		self.model = self._load_model(model_name)
-		if max_seq_length:
-			try:
-				self.model.max_seq_length = int(max_seq_length)  # type: ignore[attr-defined]
-			except Exception:
-				pass
+		self.device = device
+		self.backend = backend
+		if backend == "onnx":
+			self.model = self._load_onnx(
+				model_name, onnx_dir, onnx_quantize, onnx_threads, max_seq_length
+			)
+		elif backend == "torch":
+			self.model = self._load_model(model_name)
+			if max_seq_length:
+				try:
+					self.model.max_seq_length = int(max_seq_length)  # type: ignore[attr-defined]
+				except Exception:
+					pass
+		else:
+			raise ValueError(f"unknown encoder backend '{backend}'")
 		self.normalize_input = normalize_input
 
-	def _load_model(self, model_name: str) -> SentenceTransformer:
+	@classmethod
+	def from_settings(cls, settings: Settings) -> EmbeddingService:
+		return cls(
+			settings.embed_model,
+			device=settings.device,
+			max_seq_length=settings.max_seq_length,
+			normalize_input=settings.normalize_input_text,
+			backend=settings.encoder_backend,
+			onnx_dir=settings.onnx_dir,
+			onnx_quantize=settings.onnx_quantize,
+			onnx_threads=settings.onnx_threads,
+		)
+
+	def _load_model(self, model_name: str) -> Any:
+		# Imported here: torch dominates startup and the onnx backend never needs it
+		from sentence_transformers import SentenceTransformer
+
 		logger.info("Loading embedding model %s", model_name)
-		# No fallback and no explicit device: use library defaults (typically CPU)
-		return SentenceTransformer(model_name)
+		# No fallback: "auto" lets the library pick the device (typically CPU)
+		return SentenceTransformer(
+			model_name, device=None if self.device in ("auto", "default") else self.device
+		)
+
+	def _load_onnx(
+		self,
+		model_name: str,
+		onnx_dir: Optional[Path],
+		quantize: bool,
+		threads: int,
+		max_seq_length: Optional[int],
+	) -> Any:
+		from .onnx_encoder import OnnxEncoder, ensure_export
+
+		if onnx_dir is None:
+			raise ValueError("the onnx encoder backend needs onnx_dir")
+		directory = ensure_export(
+			model_name, onnx_dir, quantize=quantize, max_seq_length=max_seq_length
+		)
+		logger.info(
+			"Loading ONNX embedding model %s from %s%s",
+			model_name,
+			directory,
+			" (int8)" if quantize else "",
+		)
+		return OnnxEncoder(
+			directory, quantized=quantize, threads=threads, max_seq_length=max_seq_length
+		)
+
+	def _tokenize(self, texts: List[str]) -> Tuple[List[Any], List[int]]:
+		"""Per-text token features (truncated, unpadded) and their token counts."""
+		if self.backend == "onnx":
+			encodings = self.model.tokenize(texts)
+			return encodings, [len(e.ids) for e in encodings]
+		transformer = self.model[0]
+		# Same input preparation as SentenceTransformer's Transformer.tokenize
+		texts = [t.strip() for t in texts]
+		if getattr(transformer, "do_lower_case", False):
+			texts = [t.lower() for t in texts]
+		enc = transformer.tokenizer(texts, truncation=True, max_length=self.model.max_seq_length)
+		keys = list(enc.keys())
+		items = [{k: enc[k][i] for k in keys} for i in range(len(texts))]
+		return items, [len(ids) for ids in enc["input_ids"]]
+
+	def _embed_tokens(self, items: List[Any]) -> np.ndarray:
+		if self.backend == "onnx":
+			return np.asarray(self.model.embed_tokens(items), dtype=np.float32)
+		import torch
+
+		features = self.model[0].tokenizer.pad(items, return_tensors="pt")
+		features = {k: v.to(self.model.device) for k, v in features.items()}
+		self.model.eval()
+		with torch.inference_mode():
+			out = self.model(features)["sentence_embedding"]
+		return np.asarray(out.float().cpu().numpy(), dtype=np.float32)
+
+	def encode_bulk(
+		self,
+		texts: Iterable[str],
+		token_budget: int = 8192,
+		max_batch: int = 512,
+		normalize: bool = False,
+	) -> np.ndarray:
+		"""Encode a corpus in length-sorted batches sized by padded tokens; rows keep input order.
+
+		Every text is tokenized once up front; batches are then formed from
+		similar lengths (see ``length_batches``) so the encoder computes on
+		tokens rather than on padding to the longest text of a mixed batch.
+		"""
+		texts = [normalize_text(t) for t in texts] if self.normalize_input else list(texts)
+		if not texts:
+			return np.empty(
+				(0, int(self.model.get_sentence_embedding_dimension() or 0)), dtype=np.float32
+			)
+		items, lengths = self._tokenize(texts)
+		out: Optional[np.ndarray] = None
+		for rows in length_batches(lengths, token_budget, max_batch):
+			emb = self._embed_tokens([items[i] for i in rows])
+			if out is None:
+				out = np.empty((len(texts), emb.shape[1]), dtype=np.float32)
+			out[rows] = emb
+		assert out is not None
+		if normalize:
+			out /= np.clip(np.linalg.norm(out, axis=1, keepdims=True), 1e-12, None)
+		return out
 
 	def encode(self, texts: Iterable[str], batch_size: int = 64, normalize: bool = False) -> np.ndarray:
 		if self.normalize_input:
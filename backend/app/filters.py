@@ -0,0 +1,198 @@
+from __future__ import annotations
+
+import threading
+from dataclasses import dataclass
+from typing import Any, Dict, Hashable, Iterable, List, Mapping, Optional, Tuple, Union
+
+import numpy as np
+
+# Free text and bookkeeping fields would only bloat the vocabularies
+UNINDEXED_FIELDS = frozenset({"text", "content_hash"})
+_RANGE_OPS = ("gt", "gte", "lt", "lte")
+
+Scalar = Union[str, int, float, bool]
+
+
+@dataclass(frozen=True)
+class Condition:
+	"""One field test: ``op`` is "eq", "in" or "range" (``value``: sorted gt/gte/lt/lte bounds)."""
+
+	field: str
+	op: str
+	value: Any
+
+
+def _is_number(v: Any) -> bool:
+	return isinstance(v, (int, float)) and not isinstance(v, bool)
+
+
+def _is_scalar(v: Any) -> bool:
+	return isinstance(v, (str, bool)) or _is_number(v)
+
+
+def parse_filter(spec: Optional[Mapping[str, Any]]) -> List[Condition]:
+	"""Parse ``{"field": value | [values] | {"gte": x, "lt": y, ...}}`` into AND-ed conditions.
+
+	A scalar means equality, a list means "in", and a dict holds range bounds
+	(or an explicit ``{"eq": v}`` / ``{"in": [...]}``). Raises ValueError on
+	anything else.
+	"""
+	conditions: List[Condition] = []
+	for field, value in (spec or {}).items():
+		if _is_scalar(value):
+			conditions.append(Condition(field, "eq", value))
+		elif isinstance(value, list):
+			if not all(_is_scalar(v) for v in value):
+				raise ValueError(
+					f"filter on '{field}': 'in' values must be strings, numbers or booleans"
+				)
+			conditions.append(Condition(field, "in", tuple(value)))
+		elif isinstance(value, dict):
+			if set(value) == {"eq"} and _is_scalar(value["eq"]):
+				conditions.append(Condition(field, "eq", value["eq"]))
+			elif (
+				set(value) == {"in"}
+				and isinstance(value["in"], list)
+				and all(_is_scalar(v) for v in value["in"])
+			):
+				conditions.append(Condition(field, "in", tuple(value["in"])))
+			elif (
+				value
+				and set(value) <= set(_RANGE_OPS)
+				and all(_is_number(v) for v in value.values())
+			):
+				conditions.append(Condition(field, "range", tuple(sorted(value.items()))))
+			else:
+				raise ValueError(
+					f"filter on '{field}': expected eq, in or numeric gt/gte/lt/lte bounds"
+				)
+		else:
+			raise ValueError(f"filter on '{field}': unsupported value {value!r}")
+	return conditions
+
+
+class _Column:
+	"""Capacity-doubled 1-D array whose unset rows hold ``fill``."""
+
+	def __init__(self, dtype: Any, fill: Any) -> None:
+		self.fill = fill
+		self.data = np.full((16,), fill, dtype=dtype)
+
+	def reserve(self, n: int) -> None:
+		if n > self.data.shape[0]:
+			grown = np.full((max(n, 2 * self.data.shape[0]),), self.fill, dtype=self.data.dtype)
+			grown[: self.data.shape[0]] = self.data
+			self.data = grown
+
+
+class MetadataColumns:
+	"""Columnar view of scalar metadata fields for vectorized filtering.
+
+	- Numbers go to a float64 column (NaN where missing); strings and booleans
+		are dictionary-encoded into an int32 code column (-1 where missing)
+	- A field holding both kinds gets both columns; the query value's type
+		picks which one a condition is checked against
+	- ``extend`` appends rows in amortized O(1), so the columns follow inserts
+	"""
+
+	def __init__(self) -> None:
+		self.n: int = 0
+		self._numeric: Dict[str, _Column] = {}
+		self._codes: Dict[str, _Column] = {}
+		self._vocab: Dict[str, Dict[Hashable, int]] = {}
+		self._lock = threading.Lock()
+
+	@classmethod
+	def from_metadatas(cls, metadatas: Iterable[Mapping[str, Any]]) -> "MetadataColumns":
+		columns = cls()
+		columns.extend(metadatas)
+		return columns
+
+	@staticmethod
+	def _key(value: Scalar) -> Hashable:
+		# Keep True and "True" (and True and 1) apart in the vocabulary
+		return (type(value).__name__, value)
+
+	def extend(self, metadatas: Iterable[Mapping[str, Any]]) -> None:
+		with self._lock:
+			numeric: Dict[str, List[Tuple[int, float]]] = {}
+			codes: Dict[str, List[Tuple[int, int]]] = {}
+			row = self.n
+			for meta in metadatas:
+				for field, value in meta.items():
+					if field in UNINDEXED_FIELDS:
+						continue
+					if _is_number(value):
+						numeric.setdefault(field, []).append((row, float(value)))
+					elif isinstance(value, (str, bool)):
+						vocab = self._vocab.setdefault(field, {})
+						code = vocab.setdefault(self._key(value), len(vocab))
+						codes.setdefault(field, []).append((row, code))
+				row += 1
+			for field, pairs in numeric.items():
+				col = self._numeric.setdefault(field, _Column(np.float64, np.nan))
+				col.reserve(row)
+				rows, values = zip(*pairs)
+				col.data[list(rows)] = values
+			for field, cpairs in codes.items():
+				ccol = self._codes.setdefault(field, _Column(np.int32, -1))
+				ccol.reserve(row)
+				crows, cvalues = zip(*cpairs)
+				ccol.data[list(crows)] = cvalues
+			self.n = row
+
+	def _eq(self, field: str, values: Tuple[Scalar, ...], n: int) -> np.ndarray:
+		mask = np.zeros((n,), dtype=bool)
+		nums = [float(v) for v in values if _is_number(v)]
+		cats = [v for v in values if not _is_number(v)]
+		col = self._numeric.get(field)
+		if nums and col is not None:
+			col.reserve(n)
+			mask |= np.isin(col.data[:n], nums)
+		ccol = self._codes.get(field)
+		if cats and ccol is not None:
+			vocab = self._vocab[field]
+			wanted = [vocab[k] for k in (self._key(v) for v in cats) if k in vocab]
+			if wanted:
+				ccol.reserve(n)
+				mask |= np.isin(ccol.data[:n], wanted)
+		return mask
+
+	def _range(self, field: str, bounds: Tuple[Tuple[str, float], ...], n: int) -> np.ndarray:
+		col = self._numeric.get(field)
+		if col is None:
+			return np.zeros((n,), dtype=bool)
+		# Rows appended after the field's last occurrence are past the column's end
+		col.reserve(n)
+		data = col.data[:n]
+		mask: np.ndarray = ~np.isnan(data)
+		for op, bound in bounds:
+			if op == "gt":
+				mask &= data > bound
+			elif op == "gte":
+				mask &= data >= bound
+			elif op == "lt":
+				mask &= data < bound
+			else:
+				mask &= data <= bound
+		return mask
+
+	def mask(self, conditions: List[Condition], n: int) -> np.ndarray:
+		"""Boolean ``(n,)`` mask of rows matching every condition (rows past ``self.n`` don't)."""
+		with self._lock:
+			m = min(n, self.n)
+			mask = np.ones((m,), dtype=bool)
+			for cond in conditions:
+				if cond.op == "eq":
+					mask &= self._eq(cond.field, (cond.value,), m)
+				elif cond.op == "in":
+					mask &= self._eq(cond.field, cond.value, m)
+				elif cond.op == "range":
+					mask &= self._range(cond.field, cond.value, m)
+				else:
+					raise ValueError(f"unknown filter op: {cond.op}")
+		if m == n:
+			return mask
+		out = np.zeros((n,), dtype=bool)
+		out[:m] = mask
+		return out
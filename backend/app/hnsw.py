@@ -0,0 +1,456 @@
+from __future__ import annotations
+
+import heapq
+import math
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from .metadata_store import Rows
+from .vector_db import FlatVectorIndex, IndexLayout, Metric
+
+
+class _Graph:
+	"""One version of the HNSW graph; writers link into a copy and swap it in.
+
+	Searches read ``HNSWVectorIndex._graph`` once and walk only that object, so
+	they never see a neighbor list that is being rewritten.
+	"""
+
+	def __init__(
+		self,
+		levels: np.ndarray,
+		links0: np.ndarray,
+		upper_offsets: np.ndarray,
+		upper_links: np.ndarray,
+		upper_used: int,
+		entry: int = -1,
+		max_level: int = -1,
+	) -> None:
+		self.levels = levels
+		self.links0 = links0
+		self.upper_offsets = upper_offsets
+		self.upper_links = upper_links
+		self.upper_used = upper_used
+		self.entry = entry
+		self.max_level = max_level
+		# Nodes [0, linked) are in the graph
+		self.linked: int = int(links0.shape[0])
+
+	@classmethod
+	def empty(cls, M: int) -> "_Graph":
+		return cls(
+			np.empty((0,), dtype=np.int8),
+			np.full((0, 2 * M), -1, dtype=np.int32),
+			np.empty((0,), dtype=np.int64),
+			np.full((0, M), -1, dtype=np.int32),
+			0,
+		)
+
+	def extended(self, n: int) -> "_Graph":
+		"""Writable copy with room for nodes ``[linked, n)``, which are not linked yet."""
+		levels = np.zeros((n,), dtype=np.int8)
+		links0 = np.full((n, self.links0.shape[1]), -1, dtype=np.int32)
+		upper_offsets = np.full((n,), -1, dtype=np.int64)
+		levels[: self.linked] = self.levels[: self.linked]
+		links0[: self.linked] = self.links0[: self.linked]
+		upper_offsets[: self.linked] = self.upper_offsets[: self.linked]
+		upper_links = np.array(self.upper_links[: self.upper_used], dtype=np.int32)
+		graph = _Graph(
+			levels, links0, upper_offsets, upper_links, self.upper_used, self.entry, self.max_level
+		)
+		graph.linked = self.linked
+		return graph
+
+	def _row(self, node: int, level: int) -> np.ndarray:
+		if level == 0:
+			return np.asarray(self.links0[node])
+		return np.asarray(self.upper_links[self.upper_offsets[node] + level - 1])
+
+	def neighbors(self, node: int, level: int) -> np.ndarray:
+		row = self._row(node, level)
+		return row[row >= 0]
+
+	def set_neighbors(self, node: int, level: int, nbrs: np.ndarray) -> None:
+		row = self._row(node, level)
+		row.fill(-1)
+		row[: nbrs.shape[0]] = nbrs
+
+
+def _pack(links: np.ndarray) -> np.ndarray:
+	"""Move the -1 padding of each neighbor row behind its valid entries."""
+	order = np.argsort(links < 0, axis=1, kind="stable")
+	return np.take_along_axis(links, order, axis=1)
+
+
+class HNSWVectorIndex(FlatVectorIndex):
+	"""Hierarchical navigable small-world graph over the stored vectors.
+
+	- Rows are linked when they are inserted (or adopted / loaded without a
+		graph): the new nodes go into a copy of the graph, which then replaces the
+		live one, so lock-free searches always walk a complete graph and never
+		modify it. ``bulk_insert`` pays for one copy per batch
+	- ``compact`` renumbers the graph over the surviving rows and reconnects
+		nodes that lost neighbors instead of relinking every row
+	- The graph is built in the ``space`` metric; other metrics reuse it
+	- Neighbor lists live in int32 arrays padded with -1:
+		``links0`` ``(N, 2M)`` for the base layer and ``upper_links`` with one
+		``M``-wide row per (node, level >= 1), addressed via ``upper_offsets``
+	"""
+
+	index_type = "hnsw"
+
+	def __init__(
+		self,
+		dimension: int,
+		M: int = 16,
+		ef_construction: int = 200,
+		ef_search: int = 64,
+		space: Metric = "cosine",
+		seed: int = 0,
+	) -> None:
+		super().__init__(dimension)
+		self.M: int = int(M)
+		self.ef_construction: int = int(ef_construction)
+		self.ef_search: int = int(ef_search)
+		self.space: Metric = space
+		self.seed: int = int(seed)
+		self._level_mult = 1.0 / math.log(max(self.M, 2))
+		self._graph: _Graph = _Graph.empty(self.M)
+		# Graph version being written by ``save``
+		self._save_graph: Optional[_Graph] = None
+		self._reset_graph()
+
+	# ----- graph storage -----
+
+	@staticmethod
+	def _grow(arr: np.ndarray, rows: int, fill: int) -> np.ndarray:
+		if arr.shape[0] >= rows:
+			return arr
+		cap = max(rows, 2 * arr.shape[0], 16)
+		out = np.full((cap,) + arr.shape[1:], fill, dtype=arr.dtype)
+		out[: arr.shape[0]] = arr
+		return out
+
+	def _max_degree(self, level: int) -> int:
+		return 2 * self.M if level == 0 else self.M
+
+	# ----- scoring helpers -----
+
+	def _node_scores(self, node: int, rows: np.ndarray) -> np.ndarray:
+		assert self._vectors is not None
+		v = self._vectors[node]
+		return self._scores(
+			v, float(np.linalg.norm(v)), self.space, False, rows=rows, mask_deleted=False
+		)
+
+	def _search_layer(
+		self,
+		graph: _Graph,
+		q: np.ndarray,
+		norm_q: float,
+		metric: Metric,
+		entry_points: List[int],
+		ef: int,
+		level: int,
+	) -> List[Tuple[float, int]]:
+		"""Beam search on one layer; returns up to ``ef`` (score, node) pairs, best first."""
+		visited = set(entry_points)
+		eps = np.asarray(entry_points, dtype=np.int64)
+		# Tombstoned nodes still route the walk; they are masked only in the final ranking
+		ep_scores = self._scores(q, norm_q, metric, False, rows=eps, mask_deleted=False).tolist()
+		candidates = [(-s, n) for s, n in zip(ep_scores, entry_points)]
+		heapq.heapify(candidates)
+		best = [(s, n) for s, n in zip(ep_scores, entry_points)]
+		heapq.heapify(best)
+		while len(best) > ef:
+			heapq.heappop(best)
+		while candidates:
+			neg_s, node = heapq.heappop(candidates)
+			if len(best) >= ef and -neg_s < best[0][0]:
+				break
+			fresh = [int(n) for n in graph.neighbors(node, level) if int(n) not in visited]
+			if not fresh:
+				continue
+			visited.update(fresh)
+			scores = self._scores(
+				q, norm_q, metric, False, rows=np.asarray(fresh, dtype=np.int64), mask_deleted=False
+			)
+			for s, n in zip(scores.tolist(), fresh):
+				if len(best) < ef or s > best[0][0]:
+					heapq.heappush(candidates, (-s, n))
+					heapq.heappush(best, (s, n))
+					if len(best) > ef:
+						heapq.heappop(best)
+		return sorted(best, reverse=True)
+
+	def _select_neighbors(
+		self, base: int, candidates: List[Tuple[float, int]], m: int
+	) -> np.ndarray:
+		"""HNSW neighbor heuristic: keep a candidate only if it is closer to ``base``
+		than to every already selected neighbor; top up with the rest if short."""
+		selected: List[int] = []
+		skipped: List[int] = []
+		for score, node in candidates:
+			if len(selected) >= m:
+				break
+			if selected:
+				to_selected = self._node_scores(node, np.asarray(selected, dtype=np.int64))
+				if np.any(to_selected > score):
+					skipped.append(node)
+					continue
+			selected.append(node)
+		selected.extend(skipped[: m - len(selected)])
+		return np.asarray(selected, dtype=np.int32)
+
+	def _reselect(self, graph: _Graph, node: int, level: int, pool: np.ndarray) -> None:
+		"""Set ``node``'s neighbors at ``level`` to the heuristic's pick from ``pool``."""
+		pool = np.unique(pool[pool != node]).astype(np.int64)
+		scores = self._node_scores(node, pool)
+		order = np.argsort(-scores, kind="stable")
+		ranked = [(float(scores[i]), int(pool[i])) for i in order]
+		graph.set_neighbors(
+			node, level, self._select_neighbors(node, ranked, self._max_degree(level))
+		)
+
+	# ----- construction -----
+
+	def _random_level(self) -> int:
+		return min(int(-math.log(1.0 - self._rng.random()) * self._level_mult), 127)
+
+	def _link(self, graph: _Graph, node: int) -> None:
+		"""Link ``node`` into ``graph``, which must be a private copy (see ``_link_pending``)."""
+		assert self._vectors is not None
+		level = self._random_level()
+		graph.levels[node] = level
+		if level > 0:
+			graph.upper_offsets[node] = graph.upper_used
+			graph.upper_links = self._grow(graph.upper_links, graph.upper_used + level, -1)
+			graph.upper_used += level
+		if graph.entry < 0:
+			graph.entry, graph.max_level = node, level
+			return
+
+		q = self._vectors[node]
+		norm_q = float(np.linalg.norm(q))
+		eps = [graph.entry]
+		for lc in range(graph.max_level, level, -1):
+			eps = [self._search_layer(graph, q, norm_q, self.space, eps, 1, lc)[0][1]]
+		for lc in range(min(level, graph.max_level), -1, -1):
+			found = self._search_layer(graph, q, norm_q, self.space, eps, self.ef_construction, lc)
+			nbrs = self._select_neighbors(node, found, self.M)
+			graph.set_neighbors(node, lc, nbrs)
+			max_deg = self._max_degree(lc)
+			for n in nbrs.tolist():
+				current = graph.neighbors(n, lc)
+				if current.shape[0] < max_deg:
+					graph.set_neighbors(n, lc, np.append(current, np.int32(node)))
+				else:
+					self._reselect(graph, n, lc, np.append(current, np.int32(node)))
+			eps = [n for _, n in found]
+		if level > graph.max_level:
+			graph.entry, graph.max_level = node, level
+
+	def _link_pending(self) -> None:
+		"""Link stored rows that are not in the graph yet; the caller holds the lock."""
+		assert self._vectors is not None
+		n = self._vectors.shape[0]
+		current = self._graph
+		if current.linked >= n:
+			return
+		graph = current.extended(n)
+		for node in range(current.linked, n):
+			self._link(graph, node)
+		graph.linked = n
+		# One reference assignment: a search sees the old graph or the new one, never a mix
+		self._graph = graph
+
+	def _append_rows(self, ids: List[str], metadatas: List[Dict], vectors: np.ndarray) -> None:
+		with self._lock:
+			super()._append_rows(ids, metadatas, vectors)
+			self._link_pending()
+
+	def _adopt_rows(
+		self,
+		ids: Rows[str],
+		metadatas: Rows[Dict],
+		vectors: np.ndarray,
+		sqnorms: np.ndarray,
+		normed: Optional[np.ndarray] = None,
+	) -> None:
+		with self._lock:
+			super()._adopt_rows(ids, metadatas, vectors, sqnorms, normed)
+			self._link_pending()
+
+	def _materialize(self) -> None:
+		super()._materialize()
+		assert self._vectors is not None
+		if self._graph.linked < self._vectors.shape[0]:
+			with self._lock:
+				self._link_pending()
+
+	def _compact_extra(self, keep: np.ndarray) -> None:
+		# Row ids shift: renumber the graph over the surviving rows, then give nodes
+		# that lost neighbors new ones from their old neighbors' lists
+		old = self._graph
+		n_old = old.linked
+		rows = np.flatnonzero(keep[:n_old])
+		if rows.shape[0] == 0:
+			self._reset_graph()
+			return
+		# remap[-1] stays -1, so padding maps to padding
+		remap = np.full((n_old + 1,), -1, dtype=np.int64)
+		remap[rows] = np.arange(rows.shape[0])
+		levels = old.levels[rows]
+		old_links0 = np.asarray(old.links0[rows])
+		links0 = _pack(remap[old_links0].astype(np.int32))
+
+		upper_nodes = np.flatnonzero(levels > 0)
+		lens = levels[upper_nodes].astype(np.int64)
+		starts = np.concatenate([[0], np.cumsum(lens)[:-1]]).astype(np.int64)
+		upper_offsets = np.full((rows.shape[0],), -1, dtype=np.int64)
+		upper_offsets[upper_nodes] = starts
+		old_starts = np.asarray(old.upper_offsets[rows[upper_nodes]], dtype=np.int64)
+		gather = np.repeat(old_starts - starts, lens) + np.arange(int(lens.sum()), dtype=np.int64)
+		old_upper = np.asarray(old.upper_links[gather])
+		upper_links = _pack(remap[old_upper].astype(np.int32))
+
+		if keep[old.entry]:
+			entry, max_level = int(remap[old.entry]), old.max_level
+		else:
+			entry = int(np.argmax(levels))
+			max_level = int(levels[entry])
+		graph = _Graph(
+			levels, links0, upper_offsets, upper_links, int(upper_links.shape[0]), entry, max_level
+		)
+
+		# Reconnect through the removed neighbors (two hops in the old graph)
+		upper_rows = np.arange(int(lens.sum()), dtype=np.int64)
+		for old_rows, row_node, row_level in (
+			(old_links0, np.arange(rows.shape[0]), np.zeros((rows.shape[0],), dtype=np.int64)),
+			(old_upper, np.repeat(upper_nodes, lens), upper_rows - np.repeat(starts, lens) + 1),
+		):
+			for r in np.flatnonzero(((old_rows >= 0) & (remap[old_rows] < 0)).any(axis=1)).tolist():
+				node, lc = int(row_node[r]), int(row_level[r])
+				was = old_rows[r][old_rows[r] >= 0].astype(np.int64)
+				removed = was[remap[was] < 0]
+				hops = [old.neighbors(int(d), lc) for d in removed.tolist() if old.levels[d] >= lc]
+				pool = remap[np.concatenate([was, *hops]).astype(np.int64)]
+				pool = pool[pool >= 0]
+				if pool.shape[0]:
+					self._reselect(graph, node, lc, pool)
+		self._graph = graph
+
+	def _reset_graph(self) -> None:
+		self._rng = np.random.default_rng(self.seed)
+		self._graph = _Graph.empty(self.M)
+
+	# ----- search -----
+
+	def search(
+		self,
+		query: np.ndarray,
+		k: int,
+		metric: Metric = "cosine",
+		normalize_scores: bool = False,
+		ef_search: Optional[int] = None,
+	) -> List[Tuple[str, float, Dict]]:
+		FlatVectorIndex._materialize(self)
+		q, norm_q = self._prepare_query(query)
+		# Rows are linked on the write path; this graph is never modified in place
+		graph = self._graph
+		if graph.entry < 0:
+			return []
+		ef = max(int(ef_search or self.ef_search), k)
+		eps = [graph.entry]
+		for lc in range(graph.max_level, 0, -1):
+			eps = [self._search_layer(graph, q, norm_q, metric, eps, 1, lc)[0][1]]
+		found = self._search_layer(graph, q, norm_q, metric, eps, ef, 0)
+		rows = np.asarray([n for _, n in found], dtype=np.int64)
+		scores = self._scores(q, norm_q, metric, normalize_scores, rows=rows)
+		idx = self._top_k(scores, k)
+		return [
+			(self._ids[rows[i]], float(scores[i]), self._metadatas[rows[i]])
+			for i in idx
+		]
+
+	def search_batch(
+		self,
+		queries: np.ndarray,
+		k: int,
+		metric: Metric = "cosine",
+		normalize_scores: bool = False,
+		ef_search: Optional[int] = None,
+	) -> List[List[Tuple[str, float, Dict]]]:
+		return self._search_each(
+			queries, k, metric=metric, normalize_scores=normalize_scores, ef_search=ef_search
+		)
+
+	# ----- persistence -----
+
+	def save(
+		self, directory: Path, model_name: str, default_metric: Metric, layout: IndexLayout = "npz"
+	) -> None:
+		# Arrays and manifest (entry point, max level) must describe one graph version
+		with self._lock:
+			self._materialize()
+			self._save_graph = self._graph
+			try:
+				super().save(directory, model_name, default_metric, layout=layout)
+			finally:
+				self._save_graph = None
+
+	def _persisted_graph(self) -> _Graph:
+		graph = self._save_graph
+		return graph if graph is not None else self._graph
+
+	def _extra_arrays(self) -> Dict[str, np.ndarray]:
+		graph = self._persisted_graph()
+		n = graph.linked
+		return {
+			"hnsw_levels": graph.levels[:n],
+			"hnsw_links0": graph.links0[:n],
+			"hnsw_upper_offsets": graph.upper_offsets[:n],
+			"hnsw_upper_links": graph.upper_links[: graph.upper_used],
+		}
+
+	def _extra_manifest(self) -> Dict:
+		graph = self._persisted_graph()
+		return {
+			"hnsw": {
+				"M": self.M,
+				"ef_construction": self.ef_construction,
+				"ef_search": self.ef_search,
+				"space": self.space,
+				"entry": graph.entry,
+				"max_level": graph.max_level,
+			}
+		}
+
+	def _restore_extra(
+		self, arrays: Dict[str, np.ndarray], manifest: Dict, directory: Path
+	) -> None:
+		params = manifest.get("hnsw", {}) or {}
+		self.M = int(params.get("M", self.M))
+		self.ef_construction = int(params.get("ef_construction", self.ef_construction))
+		self.ef_search = int(params.get("ef_search", self.ef_search))
+		self.space = params.get("space", self.space)
+		self._level_mult = 1.0 / math.log(max(self.M, 2))
+		if "hnsw_links0" not in arrays:
+			# Vectors without a graph (e.g. converted layout): link them now,
+			# not on the first search
+			self._reset_graph()
+			self._materialize()
+			return
+		# Possibly read-only memmaps: linking always writes to a copy
+		upper_links = arrays["hnsw_upper_links"].astype(np.int32, copy=False)
+		self._graph = _Graph(
+			arrays["hnsw_levels"].astype(np.int8, copy=False),
+			arrays["hnsw_links0"].astype(np.int32, copy=False),
+			arrays["hnsw_upper_offsets"].astype(np.int64, copy=False),
+			upper_links,
+			int(upper_links.shape[0]),
+			int(params.get("entry", -1)),
+			int(params.get("max_level", -1)),
+		)
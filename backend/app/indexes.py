@@ -0,0 +1,119 @@
+from __future__ import annotations
+
+import json
+from pathlib import Path
+from typing import Dict, Optional, Type
+
+import numpy as np
+
+from .config import Settings
+from .hnsw import HNSWVectorIndex
+from .ivf import IVFVectorIndex
+from .pq import PQVectorIndex
+from .sharded import ShardedVectorIndex
+from .sq import SQVectorIndex
+from .vector_db import FlatVectorIndex, Metric
+
+INDEX_TYPES: Dict[str, Type[FlatVectorIndex]] = {
+	FlatVectorIndex.index_type: FlatVectorIndex,
+	IVFVectorIndex.index_type: IVFVectorIndex,
+	HNSWVectorIndex.index_type: HNSWVectorIndex,
+	PQVectorIndex.index_type: PQVectorIndex,
+	ShardedVectorIndex.index_type: ShardedVectorIndex,
+	SQVectorIndex.index_type: SQVectorIndex,
+}
+
+
+def read_manifest(directory: Path) -> Dict:
+	"""Manifest fields of index.json (without the per-row ids and metadatas)."""
+	index_path = directory / "index.json"
+	if not index_path.exists():
+		return {}
+	with index_path.open("r", encoding="utf-8") as f:
+		manifest: Dict = json.load(f)
+	manifest.pop("ids", None)
+	manifest.pop("metadatas", None)
+	return manifest
+
+
+def read_index_type(directory: Path) -> str:
+	"""Index type recorded in the manifest; layouts without the field are flat."""
+	return str(read_manifest(directory).get("index_type", FlatVectorIndex.index_type))
+
+
+def load_index(directory: Path, settings: Optional[Settings] = None) -> FlatVectorIndex:
+	"""Load a persisted index with the class named by its manifest.
+
+	With ``settings``, its search-time tunables replace the saved ones (see
+	``configure_index``), as they would for an index created from them.
+	"""
+	index_type = read_index_type(directory)
+	if index_type not in INDEX_TYPES:
+		raise ValueError(f"unknown index type in manifest: {index_type}")
+	index = INDEX_TYPES[index_type].load(directory)
+	return configure_index(index, settings) if settings is not None else index
+
+
+def configure_index(index: FlatVectorIndex, settings: Settings) -> FlatVectorIndex:
+	"""Apply the search-time tunables in ``settings`` to ``index``; build parameters are kept."""
+	if isinstance(index, IVFVectorIndex):
+		index.nprobe = settings.ivf_nprobe
+	elif isinstance(index, HNSWVectorIndex):
+		index.ef_search = settings.hnsw_ef_search
+	elif isinstance(index, PQVectorIndex):
+		index.rerank = settings.pq_rerank
+	elif isinstance(index, SQVectorIndex):
+		index.rerank = settings.sq_rerank
+	elif isinstance(index, ShardedVectorIndex):
+		index.configure(shards=settings.search_shards, threads=settings.search_threads)
+	return index
+
+
+def create_index(dimension: int, settings: Settings) -> FlatVectorIndex:
+	"""Create an empty index of the type configured in ``settings``."""
+	if settings.index_type == "ivf":
+		return IVFVectorIndex(dimension, nlist=settings.ivf_nlist, nprobe=settings.ivf_nprobe)
+	if settings.index_type == "hnsw":
+		return HNSWVectorIndex(
+			dimension,
+			M=settings.hnsw_m,
+			ef_construction=settings.hnsw_ef_construction,
+			ef_search=settings.hnsw_ef_search,
+			space=settings.default_metric,
+		)
+	if settings.index_type == "pq":
+		return PQVectorIndex(dimension, m=settings.pq_m, rerank=settings.pq_rerank)
+	if settings.index_type == "sq":
+		return SQVectorIndex(dimension, dtype=settings.sq_dtype, rerank=settings.sq_rerank)
+	if settings.index_type == "sharded":
+		return ShardedVectorIndex(
+			dimension, shards=settings.search_shards, threads=settings.search_threads
+		)
+	return FlatVectorIndex(dimension)
+
+
+def convert_index(index: FlatVectorIndex, settings: Settings) -> FlatVectorIndex:
+	"""Return ``index`` as the configured type, reusing its stored vectors."""
+	if index.index_type == settings.index_type:
+		return index
+	converted = create_index(index.dimension, settings)
+	converted._copy_from(index)
+	return converted
+
+
+def recall_at_k(
+	approx: FlatVectorIndex,
+	exact: FlatVectorIndex,
+	queries: np.ndarray,
+	k: int,
+	metric: Metric = "cosine",
+) -> float:
+	"""Mean fraction of the exact top-k ids that ``approx`` also returns."""
+	hits = 0
+	total = 0
+	for q in queries:
+		truth = {r[0] for r in exact.search(q, k=k, metric=metric)}
+		found = {r[0] for r in approx.search(q, k=k, metric=metric)}
+		hits += len(truth & found)
+		total += len(truth)
+	return hits / max(total, 1)
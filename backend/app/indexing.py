@@ -0,0 +1,300 @@
+from __future__ import annotations
+
+import logging
+import shutil
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+import numpy as np
+
+from .config import Settings
+from .embeddings import EmbeddingService
+from .indexes import create_index, load_index
+from .loader import content_hash, count_blogs, iter_blogs, load_blogs
+from .metadata_store import RowsWriter
+from .vector_db import FlatVectorIndex
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class ReindexStats:
+	embedded: int = 0
+	reused: int = 0
+	removed: int = 0
+	embed_seconds: float = 0.0
+
+	@property
+	def seconds_per_text(self) -> Optional[float]:
+		return self.embed_seconds / self.embedded if self.embedded else None
+
+	@property
+	def time_saved_seconds(self) -> Optional[float]:
+		"""Estimated embedding time avoided by reusing vectors (needs >= 1 embedded text)."""
+		per_text = self.seconds_per_text
+		return per_text * self.reused if per_text is not None else None
+
+	def summary(self) -> str:
+		saved = self.time_saved_seconds
+		saved_str = f"~{saved:.1f}s" if saved is not None else "n/a (nothing embedded to time)"
+		return (
+			f"embedded={self.embedded} reused={self.reused} removed={self.removed} "
+			f"embed_time={self.embed_seconds:.1f}s time_saved={saved_str}"
+		)
+
+
+def _reusable_rows(existing: Optional[FlatVectorIndex]) -> Dict[str, Tuple[int, str]]:
+	"""id -> (row, content_hash) for live rows of ``existing`` that carry a hash."""
+	if existing is None:
+		return {}
+	rows: Dict[str, Tuple[int, str]] = {}
+	for record_id, row in existing._id_map().items():
+		h = existing._metadatas[row].get("content_hash")
+		if h:
+			rows[record_id] = (row, h)
+	return rows
+
+
+def _allocate(shape: Tuple[int, ...], scratch_dir: Optional[Path], name: str) -> np.ndarray:
+	"""float32 output array: in RAM, or a writable memmap under ``scratch_dir``."""
+	if scratch_dir is None:
+		return np.empty(shape, dtype=np.float32)
+	scratch_dir.mkdir(parents=True, exist_ok=True)
+	out: np.ndarray = np.lib.format.open_memmap(
+		str(scratch_dir / f"{name}.npy"), mode="w+", dtype=np.float32, shape=shape
+	)
+	return out
+
+
+def _split_chunk(
+	chunk: List[Dict],
+	hashes: List[str],
+	reusable: Dict[str, Tuple[int, str]],
+) -> Tuple[List[int], List[int], List[int], int]:
+	"""Positions in ``chunk`` to reuse, their old-index rows, positions to embed, and id matches."""
+	reuse_at: List[int] = []
+	reuse_rows: List[int] = []
+	embed_at: List[int] = []
+	matched = 0
+	for i, (e, h) in enumerate(zip(chunk, hashes)):
+		hit = reusable.get(e["id"])
+		matched += hit is not None
+		if hit is not None and hit[1] == h:
+			reuse_at.append(i)
+			reuse_rows.append(hit[0])
+		else:
+			embed_at.append(i)
+	return reuse_at, reuse_rows, embed_at, matched
+
+
+def _chunks(entries: Iterable[Dict], size: int) -> Iterator[List[Dict]]:
+	chunk: List[Dict] = []
+	for e in entries:
+		chunk.append(e)
+		if len(chunk) >= size:
+			yield chunk
+			chunk = []
+	if chunk:
+		yield chunk
+
+
+def _encode(
+	embeddings: Optional[EmbeddingService], texts: List[str], settings: Settings
+) -> np.ndarray:
+	if embeddings is None:
+		raise RuntimeError("an encoder is needed for rows without precomputed vectors")
+	if settings.embed_token_budget > 0 and hasattr(embeddings, "encode_bulk"):
+		return embeddings.encode_bulk(texts, token_budget=settings.embed_token_budget)
+	return embeddings.encode(texts, batch_size=settings.batch_size, normalize=False)
+
+
+def build_index(
+	entries: Iterable[Dict],
+	embeddings: Optional[EmbeddingService],
+	settings: Settings,
+	existing: Optional[FlatVectorIndex] = None,
+	count: Optional[int] = None,
+	scratch_dir: Optional[Path] = None,
+	encoded: Optional[np.ndarray] = None,
+) -> Tuple[FlatVectorIndex, ReindexStats]:
+	"""Build an index over ``entries``, embedding only texts not already in ``existing``.
+
+	Rows of ``existing`` whose id and content hash match an entry are reused
+	as-is; ids missing from ``entries`` are dropped. The result is always a fresh
+	index in dataset order, identical to a full rebuild with the same vectors.
+
+	Entries are consumed ``settings.embed_chunk_size`` at a time and each chunk's
+	rows are written straight into preallocated output arrays. With ``count``
+	given, ``entries`` may be a one-pass iterator; with ``scratch_dir`` the
+	outputs are memmaps in that directory and ids and metadatas are written to
+	columnar row files there chunk by chunk, so peak memory is bounded by the
+	chunk size rather than the corpus size (apart from 8-byte-per-row norms
+	and offsets, and the id -> row map of ``existing`` when reusing rows).
+
+	``encoded`` holds vectors already computed for the rows that need
+	embedding, by dataset row (see ``parallel_build``); the encoder is then
+	not called and may be None.
+	"""
+	if count is None:
+		entries = list(entries)
+		count = len(entries)
+	if count == 0:
+		raise RuntimeError("No entries to index")
+	reusable = _reusable_rows(existing)
+	stats = ReindexStats()
+	if existing is not None:
+		existing._materialize()
+
+	# Streamed builds write rows to scratch files instead of these lists
+	rows_out = RowsWriter(scratch_dir, count) if scratch_dir is not None else None
+	ids: List[str] = []
+	metadatas: List[Dict] = []
+	n = 0
+	vectors: Optional[np.ndarray] = None
+	normed: Optional[np.ndarray] = None
+	sqnorms = np.empty((count,), dtype=np.float32)
+	index: Optional[FlatVectorIndex] = None
+	matched = 0
+	for chunk in _chunks(entries, settings.embed_chunk_size):
+		start = n
+		if start + len(chunk) > count:
+			raise RuntimeError(f"dataset has more than the expected {count} entries")
+		texts = [e["metadata"]["text"] for e in chunk]
+		hashes = [content_hash(t) for t in texts]
+		reuse_at, reuse_rows, embed_at, hits = _split_chunk(chunk, hashes, reusable)
+		matched += hits
+
+		block: Optional[np.ndarray] = None
+		if embed_at:
+			t0 = time.perf_counter()
+			if encoded is not None:
+				emb = np.asarray(encoded[start + np.asarray(embed_at)], dtype=np.float32)
+			else:
+				emb = _encode(embeddings, [texts[i] for i in embed_at], settings)
+			stats.embed_seconds += time.perf_counter() - t0
+			if emb.ndim != 2:
+				raise RuntimeError("Embeddings must be 2D")
+			block = np.empty((len(chunk), emb.shape[1]), dtype=np.float32)
+			block[embed_at] = emb
+			stats.embedded += len(embed_at)
+		if reuse_rows:
+			assert existing is not None
+			if block is None:
+				block = np.empty((len(chunk), existing.dimension), dtype=np.float32)
+			block[reuse_at] = existing._vector_rows(np.asarray(reuse_rows))
+			stats.reused += len(reuse_rows)
+		assert block is not None
+
+		if index is None:
+			# Dimension is known once the first chunk is encoded
+			index = create_index(int(block.shape[1]), settings)
+			vectors = _allocate((count, index.dimension), scratch_dir, "vectors")
+			if index._store_normed:
+				normed = _allocate((count, index.dimension), scratch_dir, "normed")
+		assert vectors is not None
+		norms = np.linalg.norm(block, axis=1)
+		end = start + len(chunk)
+		vectors[start:end] = block
+		sqnorms[start:end] = norms**2
+		if normed is not None:
+			normed[start:end] = block / (norms[:, None] + 1e-12)
+		chunk_ids = [e["id"] for e in chunk]
+		chunk_metadatas = [{**e["metadata"], "content_hash": h} for e, h in zip(chunk, hashes)]
+		if rows_out is not None:
+			rows_out.extend(chunk_ids, chunk_metadatas)
+		else:
+			ids.extend(chunk_ids)
+			metadatas.extend(chunk_metadatas)
+		n = end
+
+	if index is None or vectors is None:
+		raise RuntimeError("No entries to index")
+	if existing is not None:
+		stats.removed = max(existing.size() - matched, 0)
+	if rows_out is not None:
+		ids, metadatas = rows_out.close()  # type: ignore[assignment]
+	index._adopt_rows(
+		ids,
+		metadatas,
+		vectors[:n],
+		sqnorms[:n],
+		normed[:n] if normed is not None else None,
+	)
+	return index, stats
+
+
+def rebuild_index(
+	settings: Settings,
+	embeddings: Optional[EmbeddingService],
+	existing: Optional[FlatVectorIndex] = None,
+	workers: int = 1,
+	threads_per_worker: int = 0,
+) -> Tuple[FlatVectorIndex, ReindexStats]:
+	"""Build the index from ``settings.blog_json_path`` and save it to ``settings.index_dir``.
+
+	With ``settings.stream_build`` the dataset is streamed twice (count, then
+	embed) and rows go through memmaps in ``index_dir/.build``; the returned
+	index is then reloaded from the saved files and the scratch files removed.
+
+	With ``workers > 1`` the texts are embedded first by that many processes
+	(``parallel_build.embed_parallel``, each loading its own encoder; pass
+	``embeddings=None``) into checkpointed files under ``index_dir/.build-parallel``,
+	which a rerun after an interruption resumes from and a successful save removes.
+	"""
+	path = settings.blog_json_path
+	scratch_dir = settings.index_dir / ".build" if settings.stream_build else None
+	if scratch_dir is not None:
+		count: Optional[int] = count_blogs(path)
+		entries: Iterable[Dict] = iter_blogs(path)
+	else:
+		entries = load_blogs(path)
+		count = len(entries)  # type: ignore[arg-type]
+	logger.info("Indexing %d entries from %s", count, path)
+	encoded: Optional[np.ndarray] = None
+	work_dir = settings.index_dir / ".build-parallel"
+	embed_seconds = 0.0
+	if workers > 1:
+		from .parallel_build import embed_parallel
+
+		t0 = time.perf_counter()
+		encoded, _ = embed_parallel(
+			entries,
+			settings,
+			workers,
+			threads_per_worker=threads_per_worker,
+			existing=existing,
+			work_dir=work_dir,
+			count=count,
+		)
+		embed_seconds = time.perf_counter() - t0
+		if scratch_dir is not None:
+			entries = iter_blogs(path)
+	try:
+		index, stats = build_index(
+			entries,
+			embeddings,
+			settings,
+			existing=existing,
+			count=count,
+			scratch_dir=scratch_dir,
+			encoded=encoded,
+		)
+		if encoded is not None:
+			stats.embed_seconds = embed_seconds
+		index.save(
+			settings.index_dir,
+			model_name=embeddings.model_name if embeddings is not None else settings.embed_model,
+			default_metric=settings.default_metric,
+			layout=settings.index_format,
+		)
+		if scratch_dir is not None:
+			index = load_index(settings.index_dir, settings)
+	finally:
+		if scratch_dir is not None:
+			shutil.rmtree(scratch_dir, ignore_errors=True)
+	if encoded is not None:
+		del encoded
+		shutil.rmtree(work_dir, ignore_errors=True)
+	return index, stats
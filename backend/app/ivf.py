@@ -0,0 +1,275 @@
+from __future__ import annotations
+
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from .vector_db import FlatVectorIndex, Metric
+
+
+def kmeans(
+	data: np.ndarray,
+	n_clusters: int,
+	iters: int = 20,
+	seed: int = 0,
+	max_train_points: Optional[int] = None,
+) -> np.ndarray:
+	"""Lloyd's k-means on float32 rows; returns ``(n_clusters, D)`` centroids.
+
+	Training runs on a random sample of at most ``max_train_points`` rows. Empty
+	clusters are re-seeded from random sample points.
+	"""
+	rng = np.random.default_rng(seed)
+	x = np.asarray(data, dtype=np.float32)
+	if max_train_points is not None and x.shape[0] > max_train_points:
+		x = x[rng.choice(x.shape[0], size=max_train_points, replace=False)]
+	n_clusters = min(int(n_clusters), x.shape[0])
+	centroids = x[rng.choice(x.shape[0], size=n_clusters, replace=False)].copy()
+	x_sq = np.einsum("ij,ij->i", x, x)
+	for _ in range(iters):
+		assign = assign_nearest(x, centroids, x_sq)
+		counts = np.bincount(assign, minlength=n_clusters)
+		sums = np.zeros_like(centroids)
+		np.add.at(sums, assign, x)
+		empty = counts == 0
+		centroids = sums / np.maximum(counts, 1)[:, None]
+		if empty.any():
+			centroids[empty] = x[rng.choice(x.shape[0], size=int(empty.sum()), replace=False)]
+	return centroids.astype(np.float32, copy=False)
+
+
+def assign_nearest(
+	x: np.ndarray,
+	centroids: np.ndarray,
+	x_sq: Optional[np.ndarray] = None,
+	chunk_rows: int = 65536,
+) -> np.ndarray:
+	"""Index of the nearest centroid (squared L2) for every row of ``x``.
+
+	Rows are processed in chunks so the ``(chunk, n_centroids)`` distance matrix
+	stays small even when ``x`` is a memmap of the whole corpus.
+	"""
+	c_sq = np.einsum("ij,ij->i", centroids, centroids)
+	out = np.empty((x.shape[0],), dtype=np.int32)
+	for start in range(0, x.shape[0], chunk_rows):
+		xc = np.asarray(x[start:start + chunk_rows], dtype=np.float32)
+		xc_sq = np.einsum("ij,ij->i", xc, xc) if x_sq is None else x_sq[start:start + chunk_rows]
+		d2 = xc_sq[:, None] + c_sq[None, :] - 2.0 * (xc @ centroids.T)
+		out[start:start + chunk_rows] = np.argmin(d2, axis=1)
+	return out
+
+
+class IVFVectorIndex(FlatVectorIndex):
+	"""Inverted-file index: approximate search over the ``nprobe`` closest lists.
+
+	- Coarse centroids are trained with k-means on the stored vectors on first use
+	- Rows inserted after training are assigned to their nearest centroid
+	- Posting lists are kept as one CSR pair: ``list_offsets`` and ``list_rows``
+	- Rows assigned after the build go to a small per-list tail that is merged
+		into the CSR arrays once it grows past a fraction of the lists
+	"""
+
+	index_type = "ivf"
+
+	def __init__(
+		self,
+		dimension: int,
+		nlist: int = 100,
+		nprobe: int = 8,
+		train_iters: int = 20,
+		seed: int = 0,
+	) -> None:
+		super().__init__(dimension)
+		self.nlist: int = int(nlist)
+		self.nprobe: int = int(nprobe)
+		self.train_iters: int = int(train_iters)
+		self.seed: int = int(seed)
+		self._centroids: Optional[np.ndarray] = None
+		self._assign: np.ndarray = np.empty((0,), dtype=np.int32)
+		# Capacity-doubled storage behind the ``_assign`` view
+		self._assign_buf: Optional[np.ndarray] = None
+		# (list_offsets, list_rows, tail): published as one tuple so a search never
+		# pairs CSR arrays with a tail from another merge
+		self._lists: Tuple[np.ndarray, np.ndarray, Dict[int, np.ndarray]] = (
+			np.zeros((1,), dtype=np.int64),
+			np.empty((0,), dtype=np.int64),
+			{},
+		)
+		self._tail_rows: int = 0
+
+	def train(self) -> None:
+		"""(Re)train coarse centroids on all stored vectors and rebuild posting lists."""
+		FlatVectorIndex._materialize(self)
+		assert self._vectors is not None
+		if self._vectors.shape[0] == 0:
+			raise ValueError("cannot train IVF index without vectors")
+		self._centroids = kmeans(
+			self._vectors,
+			self.nlist,
+			iters=self.train_iters,
+			seed=self.seed,
+			max_train_points=256 * self.nlist,
+		)
+		self._assign = assign_nearest(self._vectors, self._centroids)
+		self._assign_buf = None
+		self._build_lists()
+
+	def _build_lists(self) -> None:
+		"""Rebuild the CSR posting lists from ``_assign`` and empty the tail."""
+		assert self._centroids is not None
+		n_lists = self._centroids.shape[0]
+		list_rows = np.argsort(self._assign, kind="stable").astype(np.int64)
+		counts = np.bincount(self._assign, minlength=n_lists)
+		offsets = np.zeros((n_lists + 1,), dtype=np.int64)
+		np.cumsum(counts, out=offsets[1:])
+		self._lists = (offsets, list_rows, {})
+		self._tail_rows = 0
+
+	def _append_assign(self, assign: np.ndarray) -> None:
+		n = self._assign.shape[0]
+		need = n + assign.shape[0]
+		buf = self._assign_buf
+		if buf is None or buf.shape[0] < need:
+			buf = np.empty((max(need, 2 * n, 16),), dtype=np.int32)
+			buf[:n] = self._assign
+			self._assign_buf = buf
+		buf[n:need] = assign
+		self._assign = buf[:need]
+
+	def _add_to_tail(self, rows: np.ndarray, assign: np.ndarray) -> None:
+		"""Append ``rows`` to the tails of their lists; merge once the tail is large."""
+		offsets, list_rows, tail = self._lists
+		self._tail_rows += rows.shape[0]
+		if self._tail_rows > max(4096, list_rows.shape[0] // 10):
+			self._build_lists()
+			return
+		# Copy-on-write: searches keep reading the tail they took
+		tail = dict(tail)
+		order = np.argsort(assign, kind="stable")
+		lists, starts = np.unique(assign[order], return_index=True)
+		for i, chunk in zip(lists.tolist(), np.split(rows[order], starts[1:])):
+			prev = tail.get(i)
+			tail[i] = chunk if prev is None else np.concatenate([prev, chunk])
+		self._lists = (offsets, list_rows, tail)
+
+	def _materialize(self) -> None:
+		super()._materialize()
+		n = self._row_count()
+		if n == 0 or self._assign.shape[0] == n:
+			return
+		with self._lock:
+			if self._centroids is None:
+				self.train()
+				return
+			start = self._assign.shape[0]
+			if start >= n:
+				return
+			new_assign = assign_nearest(self._all_vectors()[start:n], self._centroids)
+			self._append_assign(new_assign)
+			self._add_to_tail(np.arange(start, n, dtype=np.int64), new_assign)
+
+	def clone(self) -> FlatVectorIndex:
+		with self._lock:
+			other = super().clone()
+			assert isinstance(other, IVFVectorIndex)
+			# Both sides may append assignments; the clone copies into its own buffer first
+			other._assign_buf = None
+			return other
+
+	def _compact_extra(self, keep: np.ndarray) -> None:
+		self._assign = self._assign[keep[: self._assign.shape[0]]]
+		self._assign_buf = None
+		if self._centroids is not None:
+			self._build_lists()
+
+	def _centroid_scores(self, q: np.ndarray, norm_q: float, metric: Metric) -> np.ndarray:
+		assert self._centroids is not None
+		c = self._centroids
+		scores: np.ndarray
+		if metric == "cosine":
+			c_norm = np.linalg.norm(c, axis=1) + 1e-12
+			scores = (c @ q) / (c_norm * (norm_q + 1e-12))
+		elif metric == "dot":
+			scores = c @ q
+		elif metric == "euclidean":
+			scores = -(np.einsum("ij,ij->i", c, c) - 2.0 * (c @ q))
+		else:
+			raise ValueError(f"unknown metric: {metric}")
+		return scores
+
+	def _probe_rows(self, q: np.ndarray, norm_q: float, metric: Metric, nprobe: int) -> np.ndarray:
+		assert self._centroids is not None
+		lists = self._top_k(self._centroid_scores(q, norm_q, metric), nprobe)
+		offs, list_rows, tail = self._lists
+		parts = []
+		for i in lists.tolist():
+			parts.append(list_rows[offs[i]:offs[i + 1]])
+			if i in tail:
+				parts.append(tail[i])
+		return np.concatenate(parts)
+
+	def search(
+		self,
+		query: np.ndarray,
+		k: int,
+		metric: Metric = "cosine",
+		normalize_scores: bool = False,
+		nprobe: Optional[int] = None,
+	) -> List[Tuple[str, float, Dict]]:
+		self._materialize()
+		q, norm_q = self._prepare_query(query)
+		if self._centroids is None:
+			return []
+		n_probe = max(1, min(int(nprobe or self.nprobe), self._centroids.shape[0]))
+		rows = self._probe_rows(q, norm_q, metric, n_probe)
+		scores = self._scores(q, norm_q, metric, normalize_scores, rows=rows)
+		idx = self._top_k(scores, k)
+		return [
+			(self._ids[rows[i]], float(scores[i]), self._metadatas[rows[i]])
+			for i in idx
+		]
+
+	def search_batch(
+		self,
+		queries: np.ndarray,
+		k: int,
+		metric: Metric = "cosine",
+		normalize_scores: bool = False,
+		nprobe: Optional[int] = None,
+	) -> List[List[Tuple[str, float, Dict]]]:
+		return self._search_each(
+			queries, k, metric=metric, normalize_scores=normalize_scores, nprobe=nprobe
+		)
+
+	def _extra_arrays(self) -> Dict[str, np.ndarray]:
+		if self._centroids is None:
+			return {}
+		return {
+			"ivf_centroids": self._centroids,
+			"ivf_assign": self._assign,
+		}
+
+	def _extra_manifest(self) -> Dict:
+		return {
+			"ivf": {
+				"nlist": self.nlist,
+				"nprobe": self.nprobe,
+				"train_iters": self.train_iters,
+				"seed": self.seed,
+			}
+		}
+
+	def _restore_extra(
+		self, arrays: Dict[str, np.ndarray], manifest: Dict, directory: Path
+	) -> None:
+		params = manifest.get("ivf", {}) or {}
+		self.nlist = int(params.get("nlist", self.nlist))
+		self.nprobe = int(params.get("nprobe", self.nprobe))
+		self.train_iters = int(params.get("train_iters", self.train_iters))
+		self.seed = int(params.get("seed", self.seed))
+		if "ivf_centroids" in arrays and "ivf_assign" in arrays:
+			self._centroids = arrays["ivf_centroids"].astype(np.float32, copy=False)
+			self._assign = arrays["ivf_assign"].astype(np.int32, copy=False)
+			self._assign_buf = None
+			self._build_lists()
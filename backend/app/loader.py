@@ -1,8 +1,91 @@
 from __future__ import annotations
 
+import hashlib
 import json
 from pathlib import Path
-from typing import Dict, List
+from typing import IO, Any, Dict, Iterator, List, Optional
+
+_JSONL_SUFFIXES = {".jsonl", ".ndjson"}
+
+
+def _clean_entry(item: Any) -> Optional[Dict]:
+	"""Validated ``{id, metadata: {text}}`` entry, or None if ``item`` is not one."""
+	if not isinstance(item, dict):
+		return None
+	id_ = item.get("id")
+	meta = item.get("metadata", {}) or {}
+	text = meta.get("text")
+	if not id_ or not isinstance(id_, str):
+		return None
+	if not text or not isinstance(text, str):
+		return None
+	# Other metadata fields are kept so searches can filter on them
+	return {"id": id_, "metadata": {**meta, "text": text}}
+
+
+def _iter_json_array(f: IO[str], read_size: int = 1 << 16) -> Iterator[Any]:
+	"""Yield the elements of a top-level JSON array without loading the whole file."""
+	decoder = json.JSONDecoder()
+	buf = ""
+	pos = 0
+	eof = False
+	started = False
+	while True:
+		# Skip whitespace and separators, refilling the buffer as needed
+		while True:
+			while pos < len(buf) and (buf[pos].isspace() or (started and buf[pos] == ",")):
+				pos += 1
+			if pos < len(buf) or eof:
+				break
+			chunk = f.read(read_size)
+			eof = not chunk
+			buf, pos = buf[pos:] + chunk, 0
+		if pos >= len(buf):
+			raise ValueError(
+				"blogs.json must be a list of entries" if not started else "unterminated JSON array"
+			)
+		if not started:
+			if buf[pos] != "[":
+				raise ValueError("blogs.json must be a list of entries")
+			started = True
+			pos += 1
+			continue
+		if buf[pos] == "]":
+			return
+		try:
+			item, end = decoder.raw_decode(buf, pos)
+		except json.JSONDecodeError:
+			if eof:
+				raise
+			# Element spans the buffer end: read more and retry
+			chunk = f.read(read_size)
+			eof = not chunk
+			buf, pos = buf[pos:] + chunk, 0
+			continue
+		yield item
+		pos = end
+
+
+def iter_blogs(path: Path) -> Iterator[Dict]:
+	"""Stream valid blog entries from a JSON array or a JSONL file.
+
+	Files ending in .jsonl/.ndjson hold one entry per line; anything else must
+	be a JSON array. Memory use does not depend on the file size.
+	"""
+	with path.open("r", encoding="utf-8") as f:
+		if path.suffix.lower() in _JSONL_SUFFIXES:
+			items: Iterator[Any] = (json.loads(line) for line in f if line.strip())
+		else:
+			items = _iter_json_array(f)
+		for item in items:
+			entry = _clean_entry(item)
+			if entry is not None:
+				yield entry
+
+
+def count_blogs(path: Path) -> int:
+	"""Number of valid entries, counted in one streaming pass."""
+	return sum(1 for _ in iter_blogs(path))
 
 
 def load_blogs(path: Path) -> List[Dict]:
@@ -10,20 +93,9 @@ def load_blogs(path: Path) -> List[Dict]:
 
 	Each entry must have keys: id (str), metadata (dict with key 'text').
 	"""
-	with path.open("r", encoding="utf-8") as f:
-		data = json.load(f)
-	if not isinstance(data, list):
-		raise ValueError("blogs.json must be a list of entries")
-	entries: List[Dict] = []
-	for i, item in enumerate(data):
-		if not isinstance(item, dict):
-			continue
-		id_ = item.get("id")
-		meta = item.get("metadata", {}) or {}
-		text = meta.get("text")
-		if not id_ or not isinstance(id_, str):
-			continue
-		if not text or not isinstance(text, str):
-			continue
-		entries.append({"id": id_, "metadata": {"text": text}})
-	return entries
+	return list(iter_blogs(path))
+
+
+def content_hash(text: str) -> str:
+	"""Stable hash of an entry's text, stored per row to detect changed entries."""
+	return hashlib.sha256(text.encode("utf-8")).hexdigest()
@@ -1,18 +1,54 @@
 from __future__ import annotations
 
+import hmac
 import logging
+import threading
+import time
 from pathlib import Path
 import json
 from datetime import datetime
-from typing import Optional
+from typing import Iterator, List, Literal, Optional, cast
 
-from fastapi import FastAPI, HTTPException
+import numpy as np
+from fastapi import BackgroundTasks, FastAPI, Header, HTTPException, Query
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import PlainTextResponse, Response, StreamingResponse
 
+from .batcher import EmbeddingBatcher
+from .bm25 import fuse_results
+from .cache import BoundLRUCache
 from .config import get_settings
 from .embeddings import EmbeddingService
-from .loader import load_blogs
-from .models import HealthResponse, SearchHit, SearchRequest, SearchResponse
+from .filters import Condition, parse_filter
+from .indexes import convert_index, load_index
+from .indexing import rebuild_index
+from .ivf import IVFVectorIndex
+from .metrics import (
+	REGISTRY,
+	Counter,
+	CounterFunc,
+	Gauge,
+	Histogram,
+	MetricsMiddleware,
+	stage,
+)
+from .models import (
+	BatchSearchRequest,
+	BatchSearchResponse,
+	DeleteDocumentsRequest,
+	DocumentsResponse,
+	HealthResponse,
+	PostsResponse,
+	ReloadResponse,
+	SearchHit,
+	SearchRequest,
+	SearchResponse,
+	UpsertDocumentsRequest,
+)
+from .pipeline import DeadlineExceeded, Overloaded, SearchPipeline
+from .preprocess import normalize_text
+from .reload import IndexDirWatcher, Signature, load_validated, manifest_signature
+from .shared_index import GenerationWatcher, load_generation
 from .vector_db import FlatVectorIndex
 
 logger = logging.getLogger(__name__)
@@ -28,23 +64,115 @@ app.add_middleware(
 	allow_methods=["*"],
 	allow_headers=["*"],
 )
+app.add_middleware(
+	MetricsMiddleware,
+	paths=lambda: [getattr(route, "path", "") for route in app.routes],
+	server_timing=lambda: settings.server_timing,
+)
 
 EMBEDDINGS: Optional[EmbeddingService] = None
+BATCHER: Optional[EmbeddingBatcher] = None
 INDEX: Optional[FlatVectorIndex] = None
+# Generation of INDEX: the published number in shared mode, else bumped on every reload
+INDEX_GENERATION: Optional[int] = None
+# Shared mode: the watcher that swaps in newer generations
+WATCHER: Optional[GenerationWatcher] = None
+# INDEX_WATCH: reloads the index when index_dir gets a new one
+DIR_WATCHER: Optional[IndexDirWatcher] = None
+# Manifest signature of the server's own last save, which must not trigger a reload
+_OWN_SAVE: Signature = None
+_RELOAD_LOCK = threading.Lock()
 ERROR_MESSAGE: Optional[str] = None
+# Admission limit and the bounded encode/score pools behind /search and /search/batch
+PIPELINE = SearchPipeline(
+	encode_threads=settings.search_encode_threads,
+	score_threads=settings.search_score_threads,
+	max_inflight=settings.search_max_inflight,
+	deadline_ms=settings.search_deadline_ms,
+)
+# normalized query -> embedding (bound to EMBEDDINGS) and
+# (index version, query, params) -> response (bound to INDEX)
+QUERY_CACHE: BoundLRUCache[np.ndarray] = BoundLRUCache(
+	settings.query_cache_size, settings.cache_ttl_s
+)
+RESULT_CACHE: BoundLRUCache[SearchResponse] = BoundLRUCache(
+	settings.result_cache_size, settings.cache_ttl_s
+)
+# Serializes index writers (document upserts/deletes and background maintenance)
+WRITE_LOCK = threading.Lock()
+_MAINTENANCE_SCHEDULED = threading.Event()
+# Row writes since the last save and when that save ran (guarded by WRITE_LOCK)
+_UNSAVED_WRITES = 0
+_LAST_SAVE = time.monotonic()
+
+SEARCHES: Counter = REGISTRY.register(
+	Counter(
+		"vsearch_search_queries_total",
+		"Queries searched, by endpoint, metric and mode",
+		["endpoint", "metric", "mode"],
+	)
+)
+SEARCH_K: Histogram = REGISTRY.register(
+	Histogram(
+		"vsearch_search_k",
+		"Requested k per search request",
+		# k is capped at 100 by the request models
+		buckets=(1, 5, 10, 20, 50, 100),
+	)
+)
+REGISTRY.register(
+	Gauge(
+		"vsearch_index_size",
+		"Live documents in the serving index",
+		lambda: INDEX.size() if INDEX is not None else None,
+	)
+)
+REGISTRY.register(
+	Gauge(
+		"vsearch_index_rows",
+		"Rows in the serving index, tombstones included",
+		lambda: len(INDEX._ids) if INDEX is not None else None,
+	)
+)
+REGISTRY.register(
+	Gauge("vsearch_index_generation", "Generation of the serving index", lambda: INDEX_GENERATION)
+)
+REGISTRY.register(
+	CounterFunc(
+		"vsearch_cache_events_total",
+		"Query and result cache hits, misses and evictions",
+		lambda: {
+			(name, event): cache.stats()[event]
+			for name, cache in (("query", QUERY_CACHE), ("result", RESULT_CACHE))
+			for event in ("hits", "misses", "evictions")
+		},
+		["cache", "event"],
+	)
+)
+REGISTRY.register(
+	Gauge(
+		"vsearch_search_pipeline",
+		"Search admission state: inflight/max_inflight now, "
+		"admitted/rejected/deadline_exceeded since start",
+		lambda: {(key,): value for key, value in PIPELINE.stats().items()},
+		["state"],
+	)
+)
 
 
 @app.on_event("startup")
 def startup_event() -> None:
-	global EMBEDDINGS, INDEX, ERROR_MESSAGE
+	global EMBEDDINGS, BATCHER, INDEX, INDEX_GENERATION, ERROR_MESSAGE
 	ERROR_MESSAGE = None
 	# Try to initialize embeddings. Do not crash the server if model fails.
 	try:
-		EMBEDDINGS = EmbeddingService(
-			settings.embed_model,
-			max_seq_length=settings.max_seq_length,
-			normalize_input=settings.normalize_input_text,
-		)
+		EMBEDDINGS = EmbeddingService.from_settings(settings)
+		if settings.embed_batch_window_ms > 0:
+			BATCHER = EmbeddingBatcher(
+				EMBEDDINGS,
+				window_ms=settings.embed_batch_window_ms,
+				max_batch=settings.embed_max_batch,
+			)
 	except Exception as e:  # surface error to API clients
 		EMBEDDINGS = None
 		ERROR_MESSAGE = (
@@ -53,29 +181,39 @@ def startup_event() -> None:
 		)
 		logger.error(ERROR_MESSAGE)
 
+	if settings.shared_index_dir is not None:
+		_attach_shared_index(settings.shared_index_dir)
+		return
+
 	index_dir = settings.index_dir
 	# Try to load an existing index (supports old and new layouts via FlatVectorIndex.load)
 	try:
-		INDEX = FlatVectorIndex.load(index_dir)
-		logger.info("Loaded index from %s", index_dir)
+		INDEX = load_index(index_dir, settings)
+		logger.info("Loaded %s index from %s", INDEX.index_type, index_dir)
+		if INDEX.index_type != settings.index_type:
+			INDEX = convert_index(INDEX, settings)
+			logger.info("Converted loaded index to %s", INDEX.index_type)
 		# Ensure new two-file format JSON exists; write if missing (non-destructive migration)
 		idx_json_path = index_dir / "index.json"
 		if not idx_json_path.exists():
 			try:
 				payload = {
 					"version": 1,
+					"index_type": INDEX.index_type,
 					"dimension": INDEX.dimension if hasattr(INDEX, "dimension") else 0,
 					"model": (EMBEDDINGS.model_name if EMBEDDINGS else settings.embed_model),
 					"default_metric": settings.default_metric,
 					"created_at": datetime.utcnow().isoformat() + "Z",
-					"ids": getattr(INDEX, "_ids", []),
-					"metadatas": getattr(INDEX, "_metadatas", []),
+					"ids": list(getattr(INDEX, "_ids", [])),
+					"metadatas": list(getattr(INDEX, "_metadatas", [])),
 				}
 				with idx_json_path.open("w", encoding="utf-8") as f:
 					json.dump(payload, f, ensure_ascii=False)
 				logger.info("Wrote %s for two-file index format", idx_json_path)
 			except Exception as e:
 				logger.warning("Failed to write index.json: %s", e)
+		INDEX_GENERATION = 1
+		_watch_index_dir()
 		return
 	except FileNotFoundError:
 		logger.info("No existing index found in %s; building from blog.json if possible", index_dir)
@@ -85,18 +223,158 @@ def startup_event() -> None:
 		logger.warning("Embedding model unavailable; skipping index build")
 		return
 	logger.info("Building index from %s", settings.blog_json_path)
-	entries = load_blogs(settings.blog_json_path)
-	if not entries:
-		raise RuntimeError("No blog entries found to index")
-	texts = [e["metadata"]["text"] for e in entries]
-	emb = EMBEDDINGS.encode(texts, batch_size=settings.batch_size, normalize=False)
-	if emb.ndim != 2:
-		raise RuntimeError("Embeddings must be 2D")
-	INDEX = FlatVectorIndex(dimension=int(emb.shape[1]))
-	for e, v in zip(entries, emb):
-		INDEX.insert(e["id"], v, e["metadata"])
-	INDEX.save(index_dir, model_name=EMBEDDINGS.model_name, default_metric=settings.default_metric)  # type: ignore[arg-type]
+	INDEX, _ = rebuild_index(settings, EMBEDDINGS)
+	INDEX_GENERATION = 1
 	logger.info("Index built with %d vectors", INDEX.size())
+	_watch_index_dir()
+
+
+def _switch_index(index: FlatVectorIndex, generation: int) -> None:
+	global INDEX, INDEX_GENERATION
+	# One reference assignment: requests that already took INDEX finish on the old one
+	INDEX = index
+	INDEX_GENERATION = generation
+
+
+def _attach_shared_index(root: Path) -> None:
+	"""Serve the generation published under ``root`` and follow newer ones."""
+	global WATCHER
+	try:
+		index, generation = load_generation(root, settings=settings)
+		_switch_index(index, generation)
+		logger.info(
+			"Attached to shared %s index generation %d in %s", index.index_type, generation, root
+		)
+	except FileNotFoundError:
+		logger.warning("No index generation published in %s yet; waiting for one", root)
+	WATCHER = GenerationWatcher(
+		root,
+		_switch_index,
+		current=INDEX_GENERATION,
+		interval_s=settings.shared_index_poll_s,
+		settings=settings,
+	)
+
+
+def _watch_index_dir() -> None:
+	global DIR_WATCHER
+	if settings.index_watch and DIR_WATCHER is None:
+		DIR_WATCHER = IndexDirWatcher(
+			settings.index_dir, _on_index_dir_change, interval_s=settings.index_watch_poll_s
+		)
+		logger.info("Watching %s for new indexes", settings.index_dir)
+
+
+def _encoder_dimension() -> Optional[int]:
+	get_dim = getattr(getattr(EMBEDDINGS, "model", None), "get_sentence_embedding_dimension", None)
+	return int(get_dim()) if callable(get_dim) and get_dim() else None
+
+
+def _reload_index_dir() -> ReloadResponse:
+	"""Load index_dir next to the serving index, validate it, then swap it in by reference.
+
+	Loading happens without any lock held, so searches and writes continue on
+	the current index meanwhile; requests that already took INDEX finish on it.
+	Raises FileNotFoundError/ValueError and keeps the current index on failure.
+	"""
+	global _UNSAVED_WRITES
+	with _RELOAD_LOCK:
+		model_name = EMBEDDINGS.model_name if EMBEDDINGS else None
+		index, manifest = load_validated(
+			settings.index_dir, settings, model_name, _encoder_dimension()
+		)
+		with WRITE_LOCK:
+			previous = INDEX_GENERATION
+			_switch_index(index, (previous or 0) + 1)
+			# The reloaded index is what is on disk
+			_UNSAVED_WRITES = 0
+		logger.info(
+			"Reloaded %s index from %s (saved %s): generation %s -> %s, %d rows",
+			index.index_type,
+			settings.index_dir,
+			manifest.get("created_at"),
+			previous,
+			INDEX_GENERATION,
+			index.size(),
+		)
+		return ReloadResponse(
+			source="index_dir",
+			reloaded=True,
+			previous_generation=previous,
+			generation=INDEX_GENERATION,
+			index_type=index.index_type,
+			size=index.size(),
+		)
+
+
+def _on_index_dir_change() -> None:
+	with WRITE_LOCK:
+		# Maintenance saves under WRITE_LOCK, so this comparison cannot race it
+		if manifest_signature(settings.index_dir) == _OWN_SAVE:
+			return
+	_reload_index_dir()
+
+
+@app.on_event("shutdown")
+def shutdown_event() -> None:
+	global BATCHER, WATCHER, DIR_WATCHER
+	if _UNSAVED_WRITES:
+		_maintain_index(flush=True)
+	if BATCHER is not None:
+		BATCHER.close()
+		BATCHER = None
+	if WATCHER is not None:
+		WATCHER.close()
+		WATCHER = None
+	if DIR_WATCHER is not None:
+		DIR_WATCHER.close()
+		DIR_WATCHER = None
+	PIPELINE.close()
+
+
+def _query_key(query: str, normalize: bool) -> tuple:
+	# Key on the text the encoder actually sees
+	text = normalize_text(query) if getattr(EMBEDDINGS, "normalize_input", True) else query
+	return (text, normalize)
+
+
+def _parse_filter(spec: Optional[dict]) -> tuple[List[Condition], Optional[str]]:
+	"""Parsed conditions and a canonical cache-key string for a request filter."""
+	try:
+		conditions = parse_filter(spec)
+	except ValueError as e:
+		raise HTTPException(status_code=400, detail=str(e)) from e
+	return conditions, (json.dumps(spec, sort_keys=True) if conditions else None)
+
+
+def _cached_query(query: str, normalize: bool) -> Optional[np.ndarray]:
+	QUERY_CACHE.bind(EMBEDDINGS)
+	return QUERY_CACHE.get(_query_key(query, normalize))
+
+
+def _embed_query(query: str, normalize: bool) -> np.ndarray:
+	assert EMBEDDINGS is not None
+	cached = _cached_query(query, normalize)
+	if cached is not None:
+		return cached
+	with stage("encode"):
+		vector: np.ndarray = EMBEDDINGS.encode([query], batch_size=1, normalize=normalize)[0]
+	QUERY_CACHE.put(_query_key(query, normalize), vector)
+	return vector
+
+
+async def _encode_query(query: str, normalize: bool, deadline: Optional[float]) -> np.ndarray:
+	batcher = BATCHER
+	if batcher is None or batcher.service is not EMBEDDINGS:
+		return await PIPELINE.encode(lambda: _embed_query(query, normalize), deadline)
+	# Coalesce with concurrent requests: the batcher thread encodes, the event loop
+	# waits, so no encode-pool thread is parked per query while its batch fills
+	with stage("encode"):
+		vector: np.ndarray = await PIPELINE.wait(
+			batcher.submit(query, normalize=normalize), deadline
+		)
+	QUERY_CACHE.put(_query_key(query, normalize), vector)
+	return vector
 
 
 @app.get("/health", response_model=HealthResponse)
@@ -104,37 +382,439 @@ def health() -> HealthResponse:
 	return HealthResponse()
 
 
-@app.get("/posts", response_model=SearchResponse)
-def list_posts() -> SearchResponse:
+@app.get("/posts", response_model=PostsResponse)
+def list_posts(
+	limit: Optional[int] = Query(None, ge=1),
+	offset: int = Query(0, ge=0),
+	cursor: Optional[str] = None,
+	format: Literal["json", "ndjson"] = "json",
+) -> PostsResponse | StreamingResponse:
+	"""Live records in row order: all of them, or one page of ``limit``.
+
+	``cursor`` (the ``next_cursor`` of the previous page) resumes at a row
+	position, so pages stay stable while documents are added or deleted;
+	``offset`` skips that many live records instead. ``format=ndjson`` streams
+	one ``{"id", "text", "score"}`` object per line, decoding rows as it goes.
+	"""
 	if ERROR_MESSAGE:
 		raise HTTPException(status_code=503, detail=ERROR_MESSAGE)
-	if INDEX is None:
+	index = INDEX
+	if index is None:
 		raise HTTPException(status_code=503, detail="index not ready")
-	# Access aligned ids and metadatas from the in-memory index
-	results = [
-		SearchHit(id=i, text=m.get("text", ""), score=0.0)
-		for i, m in zip(getattr(INDEX, "_ids", []), getattr(INDEX, "_metadatas", []))
-	]
-	return SearchResponse(results=results)
+	if cursor is not None and offset:
+		raise HTTPException(status_code=400, detail="pass either cursor or offset, not both")
+	if cursor is not None:
+		try:
+			start = int(cursor)
+		except ValueError:
+			start = -1
+		if start < 0:
+			raise HTTPException(status_code=400, detail="invalid cursor")
+	else:
+		start = index.skip_live(0, offset)
+	n = len(index._ids)
+	stop = n if limit is None else index.skip_live(start, limit)
+	next_cursor = str(stop) if stop < n else None
+	records = index.iter_records(start, stop)
+	if format == "ndjson":
+		headers = {"X-Total-Count": str(index.size())}
+		if next_cursor is not None:
+			headers["X-Next-Cursor"] = next_cursor
+		return StreamingResponse(
+			_ndjson_lines(records), media_type="application/x-ndjson", headers=headers
+		)
+	results = [SearchHit(id=i, text=m.get("text", ""), score=0.0) for i, m in records]
+	return PostsResponse(results=results, total=index.size(), next_cursor=next_cursor)
+
+
+def _ndjson_lines(records: Iterator, batch: int = 256) -> Iterator[str]:
+	lines: List[str] = []
+	for record_id, metadata in records:
+		hit = {"id": record_id, "text": metadata.get("text", ""), "score": 0.0}
+		lines.append(json.dumps(hit, ensure_ascii=False) + "\n")
+		if len(lines) >= batch:
+			yield "".join(lines)
+			lines = []
+	if lines:
+		yield "".join(lines)
+
+
+def _vector_search(
+	index: FlatVectorIndex,
+	vector: np.ndarray,
+	k: int,
+	metric: str,
+	normalize: bool,
+	nprobe: Optional[int],
+	conditions: List[Condition],
+) -> list:
+	if conditions:
+		return index.search_filtered(
+			vector,
+			k=k,
+			conditions=conditions,
+			metric=metric,  # type: ignore[arg-type]
+			normalize_scores=normalize,
+		)
+	if isinstance(index, IVFVectorIndex):
+		return index.search(vector, k=k, metric=metric, normalize_scores=normalize, nprobe=nprobe)  # type: ignore[arg-type]
+	return index.search(vector, k=k, metric=metric, normalize_scores=normalize)  # type: ignore[arg-type]
+
+
+def _run_search(
+	index: FlatVectorIndex,
+	req: SearchRequest,
+	vector: Optional[np.ndarray],
+	metric: str,
+	conditions: List[Condition],
+) -> list:
+	if req.mode == "lexical":
+		return index.search_lexical(req.query, k=req.k, conditions=conditions)
+	assert vector is not None
+	# Hybrid fuses two deeper candidate lists, then cuts to k
+	depth = max(req.k, settings.hybrid_candidates) if req.mode == "hybrid" else req.k
+	results = _vector_search(
+		index, vector, depth, metric, bool(req.normalize), req.nprobe, conditions
+	)
+	if req.mode == "hybrid":
+		lexical = index.search_lexical(req.query, k=depth, conditions=conditions)
+		results = fuse_results(results, lexical, k=req.k, fusion=req.fusion, alpha=req.alpha)
+	return results
+
+
+def _timed_search(
+	index: FlatVectorIndex,
+	req: SearchRequest,
+	vector: Optional[np.ndarray],
+	metric: str,
+	conditions: List[Condition],
+) -> list:
+	with stage("search"):
+		return _run_search(index, req, vector, metric, conditions)
+
+
+def _shed(e: Exception) -> HTTPException:
+	"""429 when the admission limit is full, 503 when a request ran out of time."""
+	if isinstance(e, Overloaded):
+		return HTTPException(
+			status_code=429, detail=f"search overloaded: {e}", headers={"Retry-After": "1"}
+		)
+	return HTTPException(status_code=503, detail=str(e), headers={"Retry-After": "1"})
+
+
+def _json_response(response: SearchResponse | BatchSearchResponse) -> Response:
+	# Rendered here rather than by FastAPI, so serialization is timed as a stage of the request
+	return Response(content=response.model_dump_json(), media_type="application/json")
 
 
 @app.post("/search", response_model=SearchResponse)
-def search(req: SearchRequest) -> SearchResponse:
+async def search(req: SearchRequest) -> Response:
 	if not req.query:
 		raise HTTPException(status_code=400, detail="query must not be empty")
 	if ERROR_MESSAGE:
 		raise HTTPException(status_code=503, detail=ERROR_MESSAGE)
-	if INDEX is None or EMBEDDINGS is None:
+	index = INDEX
+	if index is None or EMBEDDINGS is None:
+		raise HTTPException(status_code=503, detail="index not ready")
+	metric = req.metric or settings.default_metric
+	SEARCHES.inc("search", metric, req.mode)
+	SEARCH_K.observe(req.k)
+	conditions, filter_key = _parse_filter(req.filter)
+	with stage("normalize"):
+		query_key = _query_key(req.query, bool(req.normalize))
+	# Version in the key: results computed before a concurrent insert never match afterwards
+	result_key = (
+		index.version,
+		query_key,
+		req.k,
+		metric,
+		req.nprobe,
+		filter_key,
+		req.mode,
+		(req.fusion, req.alpha) if req.mode == "hybrid" else None,
+	)
+	RESULT_CACHE.bind(index)
+	cached = RESULT_CACHE.get(result_key)
+	if cached is not None:
+		with stage("serialize"):
+			return _json_response(cached)
+	deadline = PIPELINE.deadline(req.timeout_ms)
+	normalize = bool(req.normalize)
+	try:
+		with PIPELINE.admit():
+			vector = None
+			if req.mode != "lexical":
+				vector = _cached_query(req.query, normalize)
+				if vector is None:
+					vector = await _encode_query(req.query, normalize, deadline)
+			results = await PIPELINE.score(
+				lambda: _timed_search(index, req, vector, metric, conditions), deadline
+			)
+	except (Overloaded, DeadlineExceeded) as e:
+		raise _shed(e) from e
+	except ValueError as e:
+		raise HTTPException(status_code=400, detail=str(e)) from e
+	with stage("serialize"):
+		hits = [
+			SearchHit(id=r[0], text=r[2].get("text", ""), score=r[1])
+			for r in results
+		]
+		response = SearchResponse(results=hits)
+		body = _json_response(response)
+	# Dropped if a reload or write replaced or changed the index while this request ran
+	RESULT_CACHE.put(result_key, response, owner=index)
+	return body
+
+
+def _encode_missing(queries: List[str], keys: list, cached: list, normalize: bool) -> np.ndarray:
+	assert EMBEDDINGS is not None
+	missing = [i for i, v in enumerate(cached) if v is None]
+	if missing:
+		# One encode call for every query not already cached
+		with stage("encode"):
+			fresh = EMBEDDINGS.encode(
+				[queries[i] for i in missing], batch_size=settings.batch_size, normalize=normalize
+			)
+		for i, v in zip(missing, fresh):
+			cached[i] = v
+			QUERY_CACHE.put(keys[i], v)
+	return np.vstack(cached)
+
+
+def _run_search_batch(
+	index: FlatVectorIndex,
+	req: BatchSearchRequest,
+	emb: np.ndarray,
+	metric: str,
+	conditions: List[Condition],
+) -> list:
+	normalize = bool(req.normalize)
+	with stage("search"):
+		return _search_rows(index, req, emb, metric, conditions, normalize)
+
+
+def _search_rows(
+	index: FlatVectorIndex,
+	req: BatchSearchRequest,
+	emb: np.ndarray,
+	metric: str,
+	conditions: List[Condition],
+	normalize: bool,
+) -> list:
+	if conditions:
+		return [
+			index.search_filtered(
+				v,
+				k=req.k,
+				conditions=conditions,
+				metric=metric,  # type: ignore[arg-type]
+				normalize_scores=normalize,
+			)
+			for v in emb
+		]
+	if isinstance(index, IVFVectorIndex):
+		return index.search_batch(
+			emb,
+			k=req.k,
+			metric=metric,  # type: ignore[arg-type]
+			normalize_scores=normalize,
+			nprobe=req.nprobe,
+		)
+	return index.search_batch(emb, k=req.k, metric=metric, normalize_scores=normalize)  # type: ignore[arg-type]
+
+
+@app.post("/search/batch", response_model=BatchSearchResponse)
+async def search_batch(req: BatchSearchRequest) -> Response:
+	if not all(req.queries):
+		raise HTTPException(status_code=400, detail="queries must not be empty")
+	if ERROR_MESSAGE:
+		raise HTTPException(status_code=503, detail=ERROR_MESSAGE)
+	index = INDEX
+	if index is None or EMBEDDINGS is None:
 		raise HTTPException(status_code=503, detail="index not ready")
 	metric = req.metric or settings.default_metric
-	emb = EMBEDDINGS.encode([req.query], batch_size=1, normalize=bool(req.normalize))
-	vector = emb[0]
+	normalize = bool(req.normalize)
+	SEARCHES.inc("search_batch", metric, "vector", amount=len(req.queries))
+	SEARCH_K.observe(req.k)
+	conditions, _ = _parse_filter(req.filter)
+	with stage("normalize"):
+		keys = [_query_key(q, normalize) for q in req.queries]
+	QUERY_CACHE.bind(EMBEDDINGS)
+	cached = [QUERY_CACHE.get(key) for key in keys]
+	deadline = PIPELINE.deadline(req.timeout_ms)
 	try:
-		results = INDEX.search(vector, k=req.k, metric=metric, normalize_scores=bool(req.normalize))  # type: ignore[arg-type]
+		with PIPELINE.admit():
+			if any(v is None for v in cached):
+				emb = await PIPELINE.encode(
+					lambda: _encode_missing(req.queries, keys, cached, normalize), deadline
+				)
+			else:
+				emb = np.vstack(cast(List[np.ndarray], cached))
+			batches = await PIPELINE.score(
+				lambda: _run_search_batch(index, req, emb, metric, conditions), deadline
+			)
+	except (Overloaded, DeadlineExceeded) as e:
+		raise _shed(e) from e
 	except ValueError as e:
-		raise HTTPException(status_code=400, detail=str(e))
-	hits = [
-		SearchHit(id=r[0], text=r[2].get("text", ""), score=r[1])
-		for r in results
-	]
-	return SearchResponse(results=hits)
+		raise HTTPException(status_code=400, detail=str(e)) from e
+	with stage("serialize"):
+		response = BatchSearchResponse(
+			results=[
+				SearchResponse(
+					results=[
+						SearchHit(id=r[0], text=r[2].get("text", ""), score=r[1]) for r in results
+					]
+				)
+				for results in batches
+			]
+		)
+		return _json_response(response)
+
+
+@app.get("/metrics", response_class=PlainTextResponse)
+def metrics() -> PlainTextResponse:
+	"""Counters, gauges and stage histograms in the Prometheus text format."""
+	return PlainTextResponse(
+		REGISTRY.render(), media_type="text/plain; version=0.0.4; charset=utf-8"
+	)
+
+
+@app.get("/stats")
+def stats() -> dict:
+	return {
+		"embedding_batcher": BATCHER.stats.snapshot() if BATCHER is not None else None,
+		"query_cache": QUERY_CACHE.stats(),
+		"result_cache": RESULT_CACHE.stats(),
+		"index_generation": INDEX_GENERATION,
+		"search_pipeline": PIPELINE.stats(),
+	}
+
+
+def _persist_due() -> bool:
+	every = settings.persist_after_writes
+	interval = settings.persist_interval_s
+	return 0 < every <= _UNSAVED_WRITES or 0.0 < interval <= time.monotonic() - _LAST_SAVE
+
+
+def _maintain_index(flush: bool = False) -> None:
+	"""Compact the index when enough rows are tombstoned, and persist it when it was
+	compacted or its unsaved writes reach ``persist_after_writes``/``persist_interval_s``.
+
+	A save rewrites the whole index, so it is not repeated for every write batch;
+	``flush`` persists any unsaved writes regardless (at shutdown). Compaction runs
+	on a clone and is swapped in by reference, so in-flight searches finish on the
+	previous object.
+	"""
+	global INDEX, _OWN_SAVE, _UNSAVED_WRITES, _LAST_SAVE
+	_MAINTENANCE_SCHEDULED.clear()
+	with WRITE_LOCK:
+		index = INDEX
+		if index is None:
+			return
+		compacted = index.tombstone_ratio() >= settings.compact_tombstone_ratio > 0.0
+		if compacted:
+			index = index.clone()
+			dropped = index.compact()
+			INDEX = index
+			logger.info("Compacted index: dropped %d tombstoned rows", dropped)
+		elif not (_UNSAVED_WRITES and (flush or _persist_due())):
+			return
+		model_name = EMBEDDINGS.model_name if EMBEDDINGS else settings.embed_model
+		index.save(
+			settings.index_dir,
+			model_name=model_name,
+			default_metric=settings.default_metric,
+			layout=settings.index_format,  # type: ignore[arg-type]
+		)
+		_OWN_SAVE = manifest_signature(settings.index_dir)
+		_UNSAVED_WRITES = 0
+		_LAST_SAVE = time.monotonic()
+
+
+def _schedule_maintenance(background: BackgroundTasks) -> None:
+	# Coalesce: one pending run covers every write made before it starts
+	if not _MAINTENANCE_SCHEDULED.is_set():
+		_MAINTENANCE_SCHEDULED.set()
+		background.add_task(_maintain_index)
+
+
+def _require_writable() -> None:
+	if settings.shared_index_dir is not None:
+		raise HTTPException(
+			status_code=409,
+			detail="index is shared read-only across workers; publish a new generation instead",
+		)
+
+
+def _require_admin(token: Optional[str]) -> None:
+	# Admin endpoints are off unless a token is configured
+	if not settings.admin_token:
+		raise HTTPException(
+			status_code=403, detail="admin endpoints are disabled; set ADMIN_TOKEN to enable them"
+		)
+	if not hmac.compare_digest(token or "", settings.admin_token):
+		raise HTTPException(status_code=401, detail="missing or wrong X-Admin-Token")
+
+
+@app.post("/admin/reload", response_model=ReloadResponse)
+def reload_index(x_admin_token: Optional[str] = Header(default=None)) -> ReloadResponse:
+	"""Swap in the index saved in index_dir (or the newest shared generation) without a restart."""
+	_require_admin(x_admin_token)
+	if settings.shared_index_dir is not None:
+		previous = INDEX_GENERATION
+		reloaded = WATCHER.poll() if WATCHER is not None else False
+		index = INDEX
+		return ReloadResponse(
+			source="shared",
+			reloaded=reloaded,
+			previous_generation=previous,
+			generation=INDEX_GENERATION,
+			index_type=index.index_type if index is not None else None,
+			size=index.size() if index is not None else 0,
+		)
+	try:
+		return _reload_index_dir()
+	except FileNotFoundError as e:
+		raise HTTPException(status_code=404, detail=str(e)) from e
+	except (ValueError, KeyError, OSError) as e:
+		# Validation or loading failed: the current index keeps serving
+		raise HTTPException(status_code=409, detail=f"reload rejected: {e}") from e
+
+
+@app.post("/documents", response_model=DocumentsResponse)
+def upsert_documents(req: UpsertDocumentsRequest, background: BackgroundTasks) -> DocumentsResponse:
+	_require_writable()
+	if ERROR_MESSAGE:
+		raise HTTPException(status_code=503, detail=ERROR_MESSAGE)
+	if INDEX is None or EMBEDDINGS is None:
+		raise HTTPException(status_code=503, detail="index not ready")
+	# Embed only the changed texts, in one call
+	emb = EMBEDDINGS.encode(
+		[d.text for d in req.documents], batch_size=settings.batch_size, normalize=False
+	)
+	global _UNSAVED_WRITES
+	with WRITE_LOCK:
+		try:
+			for d, v in zip(req.documents, emb):
+				INDEX.upsert(d.id, v, {**d.metadata, "text": d.text})
+				_UNSAVED_WRITES += 1
+		except ValueError as e:
+			raise HTTPException(status_code=400, detail=str(e)) from e
+		size = INDEX.size()
+	_schedule_maintenance(background)
+	return DocumentsResponse(upserted=len(req.documents), size=size)
+
+
+@app.delete("/documents", response_model=DocumentsResponse)
+def delete_documents(req: DeleteDocumentsRequest, background: BackgroundTasks) -> DocumentsResponse:
+	_require_writable()
+	if INDEX is None:
+		raise HTTPException(status_code=503, detail="index not ready")
+	global _UNSAVED_WRITES
+	with WRITE_LOCK:
+		missing = [i for i in req.ids if not INDEX.delete(i)]
+		_UNSAVED_WRITES += len(req.ids) - len(missing)
+		size = INDEX.size()
+	if len(missing) < len(req.ids):
+		_schedule_maintenance(background)
+	return DocumentsResponse(deleted=len(req.ids) - len(missing), missing=missing, size=size)
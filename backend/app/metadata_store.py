@@ -0,0 +1,339 @@
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+from pathlib import Path
+from typing import (
+	Any,
+	Callable,
+	Dict,
+	Generic,
+	Iterable,
+	Iterator,
+	List,
+	Optional,
+	Tuple,
+	TypeVar,
+	Union,
+)
+
+import numpy as np
+
+T = TypeVar("T")
+
+# Columnar row files written next to the index arrays:
+#   ids.bin / ids_offsets.npy     UTF-8 ids, row i = blob[offsets[i]:offsets[i+1]]
+#   meta.bin / meta_offsets.npy   one compact JSON object per row, same scheme
+#   id_hash.npy / id_row.npy      sorted 64-bit id hashes and the live row of each
+ROWS_FORMAT = "columnar"
+_chunk_rows = 65536
+
+
+def _decode_id(raw: bytes) -> str:
+	return raw.decode("utf-8")
+
+
+def _encode_id(record_id: str) -> bytes:
+	return record_id.encode("utf-8")
+
+
+def _decode_meta(raw: bytes) -> Dict[str, Any]:
+	metadata: Dict[str, Any] = json.loads(raw)
+	return metadata
+
+
+def _encode_meta(metadata: Dict[str, Any]) -> bytes:
+	return json.dumps(metadata, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+def id_hash(record_id: str) -> int:
+	return int.from_bytes(hashlib.blake2b(_encode_id(record_id), digest_size=8).digest(), "little")
+
+
+class BlobRows(Generic[T]):
+	"""List-like column whose persisted rows live in one memory-mapped byte blob.
+
+	- Row ``i`` is ``blob[offsets[i]:offsets[i+1]]``, decoded only when accessed,
+		so a search touches the bytes of its top-k rows and nothing else
+	- Rows appended after load are kept decoded in a Python ``tail``
+	- ``copy`` shares the blob; ``take`` gathers a subset into a new in-memory blob
+	"""
+
+	def __init__(
+		self,
+		blob: np.ndarray,
+		offsets: np.ndarray,
+		decode: Callable[[bytes], T],
+		encode: Callable[[T], bytes],
+		tail: Optional[List[T]] = None,
+	) -> None:
+		self._blob = blob
+		self._offsets = offsets
+		self._decode = decode
+		self._encode = encode
+		self._base = int(offsets.shape[0]) - 1
+		self._tail: List[T] = tail if tail is not None else []
+
+	def __len__(self) -> int:
+		return self._base + len(self._tail)
+
+	def __getitem__(self, i: Any) -> T:
+		if isinstance(i, slice):
+			raise TypeError("BlobRows does not support slicing")
+		row = int(i)
+		if row < 0:
+			row += len(self)
+		if 0 <= row < self._base:
+			return self._decode(self._blob[self._offsets[row]:self._offsets[row + 1]].tobytes())
+		if self._base <= row < len(self):
+			return self._tail[row - self._base]
+		raise IndexError("row index out of range")
+
+	def __iter__(self) -> Iterator[T]:
+		# Decode a block of rows per blob read instead of one slice per row
+		for start in range(0, self._base, _chunk_rows):
+			offsets = self._offsets[start:min(start + _chunk_rows, self._base) + 1].tolist()
+			block = self._blob[offsets[0]:offsets[-1]].tobytes()
+			base = offsets[0]
+			for lo, hi in zip(offsets[:-1], offsets[1:]):
+				yield self._decode(block[lo - base:hi - base])
+		yield from self._tail
+
+	def __eq__(self, other: object) -> bool:
+		if isinstance(other, (list, tuple, BlobRows)):
+			return len(self) == len(other) and all(a == b for a, b in zip(self, other))
+		return NotImplemented
+
+	def append(self, item: T) -> None:
+		self._tail.append(item)
+
+	def extend(self, items: Iterable[T]) -> None:
+		self._tail.extend(items)
+
+	def copy(self) -> "BlobRows[T]":
+		return BlobRows(self._blob, self._offsets, self._decode, self._encode, list(self._tail))
+
+	def take(self, rows: np.ndarray) -> "BlobRows[T]":
+		"""New column holding ``rows`` (ascending) in order, without decoding the blob rows."""
+		rows = np.asarray(rows, dtype=np.int64)
+		base_rows = rows[rows < self._base]
+		offsets = np.zeros((base_rows.shape[0] + 1,), dtype=np.int64)
+		parts: List[np.ndarray] = []
+		for start in range(0, base_rows.shape[0], _chunk_rows):
+			chunk = base_rows[start:start + _chunk_rows]
+			lo = np.asarray(self._offsets[chunk], dtype=np.int64)
+			lens = np.asarray(self._offsets[chunk + 1], dtype=np.int64) - lo
+			out_start = np.concatenate([[0], np.cumsum(lens)[:-1]])
+			# Byte j of the gathered chunk comes from lo[row] + (j - out_start[row])
+			gather = np.arange(int(lens.sum()), dtype=np.int64) + np.repeat(lo - out_start, lens)
+			parts.append(np.asarray(self._blob[gather], dtype=np.uint8))
+			offsets[start + 1:start + 1 + chunk.shape[0]] = offsets[start] + np.cumsum(lens)
+		blob = np.concatenate(parts) if parts else np.empty((0,), dtype=np.uint8)
+		tail = [self._tail[i - self._base] for i in rows[rows >= self._base].tolist()]
+		return BlobRows(blob, offsets, self._decode, self._encode, tail)
+
+	def iter_encoded(self) -> Iterator[bytes]:
+		"""Encoded rows in order; blob rows pass through without a decode/encode round trip."""
+		for start in range(0, self._base, _chunk_rows):
+			offsets = self._offsets[start:min(start + _chunk_rows, self._base) + 1].tolist()
+			block = self._blob[offsets[0]:offsets[-1]].tobytes()
+			base = offsets[0]
+			for lo, hi in zip(offsets[:-1], offsets[1:]):
+				yield block[lo - base:hi - base]
+		for item in self._tail:
+			yield self._encode(item)
+
+
+# A row column: a plain list, or blob-backed once loaded from the columnar files
+Rows = Union[List[T], BlobRows[T]]
+
+
+def take_rows(column: Rows[T], rows: np.ndarray) -> Rows[T]:
+	"""``column`` restricted to ``rows`` (ascending), keeping blob-backed columns blob-backed."""
+	if isinstance(column, BlobRows):
+		return column.take(rows)
+	return [column[i] for i in rows.tolist()]
+
+
+def copy_rows(column: Rows[T]) -> Rows[T]:
+	if isinstance(column, BlobRows):
+		return column.copy()
+	return list(column)
+
+
+class IdLookup:
+	"""id -> live row over persisted sorted id hashes, plus an overlay for later changes.
+
+	Loading costs two small arrays instead of one dict entry per id; a lookup is
+	a binary search whose candidate rows are confirmed against the stored ids.
+	"""
+
+	def __init__(self, ids: Rows[str], hashes: np.ndarray, rows: np.ndarray) -> None:
+		self._ids = ids
+		self._hashes = hashes
+		self._rows = rows
+		self._overlay: Dict[str, int] = {}
+		self._removed: set = set()
+
+	def _base_get(self, record_id: str) -> Optional[int]:
+		h = np.uint64(id_hash(record_id))
+		lo = int(np.searchsorted(self._hashes, h, side="left"))
+		hi = int(np.searchsorted(self._hashes, h, side="right"))
+		for j in range(lo, hi):
+			row = int(self._rows[j])
+			if self._ids[row] == record_id:
+				return row
+		return None
+
+	def get(self, record_id: str, default: Optional[int] = None) -> Optional[int]:
+		if record_id in self._overlay:
+			return self._overlay[record_id]
+		if record_id in self._removed:
+			return default
+		row = self._base_get(record_id)
+		return default if row is None else row
+
+	def __contains__(self, record_id: object) -> bool:
+		return isinstance(record_id, str) and self.get(record_id) is not None
+
+	def __setitem__(self, record_id: str, row: int) -> None:
+		self._overlay[record_id] = int(row)
+		self._removed.discard(record_id)
+
+	def pop(self, record_id: str, default: Optional[int] = None) -> Optional[int]:
+		row = self.get(record_id)
+		if row is None:
+			return default
+		self._overlay.pop(record_id, None)
+		self._removed.add(record_id)
+		return row
+
+	def items(self) -> Iterator[Tuple[str, int]]:
+		for row in np.sort(self._rows).tolist():
+			record_id = self._ids[row]
+			if record_id not in self._overlay and record_id not in self._removed:
+				yield record_id, row
+		yield from self._overlay.items()
+
+	def copy(self) -> "IdLookup":
+		other = IdLookup(self._ids, self._hashes, self._rows)
+		other._overlay = dict(self._overlay)
+		other._removed = set(self._removed)
+		return other
+
+
+class _BlobWriter:
+	"""Write one column's encoded rows to ``name.bin`` as they arrive; ``close`` adds offsets."""
+
+	def __init__(self, directory: Path, name: str, n: int) -> None:
+		self.directory = directory
+		self.name = name
+		self._offsets = np.zeros((n + 1,), dtype=np.int64)
+		self._rows = 0
+		self._pos = 0
+		self._tmp_path = directory / f"{name}.bin.tmp"
+		self._file = self._tmp_path.open("wb")
+
+	def write(self, encoded: Iterable[bytes]) -> None:
+		for raw in encoded:
+			self._file.write(raw)
+			self._pos += len(raw)
+			self._rows += 1
+			self._offsets[self._rows] = self._pos
+
+	def close(self) -> None:
+		self._file.close()
+		# Rename, not truncate: live memmaps of the previous blob stay valid
+		os.replace(self._tmp_path, self.directory / f"{self.name}.bin")
+		offsets_tmp = self.directory / f"{self.name}_offsets.npy.tmp"
+		with offsets_tmp.open("wb") as f:
+			np.save(f, self._offsets[: self._rows + 1])
+		os.replace(offsets_tmp, self.directory / f"{self.name}_offsets.npy")
+
+
+def _write_blob(directory: Path, name: str, encoded: Iterable[bytes], n: int) -> None:
+	writer = _BlobWriter(directory, name, n)
+	writer.write(encoded)
+	writer.close()
+
+
+class RowsWriter:
+	"""Write ids and metadatas to their columnar files in ``directory`` one batch at a time.
+
+	For builds that should not hold every row in Python: ``close`` returns
+	the columns memory-mapped, as ``load_rows`` would (without an id table).
+	"""
+
+	def __init__(self, directory: Path, n: int) -> None:
+		directory.mkdir(parents=True, exist_ok=True)
+		self.directory = directory
+		self._ids = _BlobWriter(directory, "ids", n)
+		self._metadatas = _BlobWriter(directory, "meta", n)
+
+	def extend(self, ids: Iterable[str], metadatas: Iterable[Dict[str, Any]]) -> None:
+		self._ids.write(_encode_id(record_id) for record_id in ids)
+		self._metadatas.write(_encode_meta(metadata) for metadata in metadatas)
+
+	def close(self) -> Tuple[BlobRows[str], BlobRows[Dict[str, Any]]]:
+		self._ids.close()
+		self._metadatas.close()
+		ids = _load_blob(self.directory, "ids", _decode_id, _encode_id)
+		metadatas = _load_blob(self.directory, "meta", _decode_meta, _encode_meta)
+		if len(ids) != len(metadatas):
+			raise ValueError("ids and metadatas differ in length")
+		return ids, metadatas
+
+
+def _encoded(column: Rows[T], encode: Callable[[T], bytes]) -> Iterable[bytes]:
+	if isinstance(column, BlobRows):
+		return column.iter_encoded()
+	return (encode(item) for item in column)
+
+
+def save_rows(
+	directory: Path, ids: Rows[str], metadatas: Rows[Dict], deleted: np.ndarray
+) -> None:
+	"""Write ids, metadatas and the id hash table of the live rows (``deleted``: ``(N,)`` mask)."""
+	n = len(ids)
+	_write_blob(directory, "ids", _encoded(ids, _encode_id), n)
+	_write_blob(directory, "meta", _encoded(metadatas, _encode_meta), n)
+	live = np.flatnonzero(~deleted[:n]).astype(np.int64)
+	hashes = np.fromiter(
+		(id_hash(record_id) for row, record_id in enumerate(ids) if not deleted[row]),
+		dtype=np.uint64,
+		count=live.shape[0],
+	)
+	order = np.argsort(hashes, kind="stable")
+	for name, array in (("id_hash", hashes[order]), ("id_row", live[order])):
+		tmp_path = directory / f"{name}.npy.tmp"
+		with tmp_path.open("wb") as f:
+			np.save(f, array)
+		os.replace(tmp_path, directory / f"{name}.npy")
+
+
+def _load_blob(
+	directory: Path, name: str, decode: Callable[[bytes], T], encode: Callable[[T], bytes]
+) -> BlobRows[T]:
+	offsets = np.load(str(directory / f"{name}_offsets.npy"), mmap_mode="r")
+	blob_path = directory / f"{name}.bin"
+	if blob_path.stat().st_size == 0:
+		# mmap cannot map an empty file
+		blob = np.empty((0,), dtype=np.uint8)
+	else:
+		blob = np.memmap(str(blob_path), dtype=np.uint8, mode="r")
+	return BlobRows(blob, offsets, decode, encode)
+
+
+def load_rows(directory: Path) -> Tuple[BlobRows[str], BlobRows[Dict[str, Any]], IdLookup]:
+	"""Memory-map the columnar row files written by ``save_rows``."""
+	ids = _load_blob(directory, "ids", _decode_id, _encode_id)
+	metadatas = _load_blob(directory, "meta", _decode_meta, _encode_meta)
+	if len(ids) != len(metadatas):
+		raise ValueError("ids and metadatas differ in length")
+	lookup = IdLookup(
+		ids,
+		np.load(str(directory / "id_hash.npy"), mmap_mode="r"),
+		np.load(str(directory / "id_row.npy"), mmap_mode="r"),
+	)
+	return ids, metadatas, lookup
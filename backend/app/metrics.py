@@ -0,0 +1,312 @@
+from __future__ import annotations
+
+import bisect
+import contextlib
+import contextvars
+import math
+import threading
+import time
+from typing import (
+	Any,
+	Awaitable,
+	Callable,
+	Dict,
+	Iterable,
+	Iterator,
+	List,
+	MutableMapping,
+	Optional,
+	Sequence,
+	Tuple,
+)
+
+# Latency buckets in seconds, from sub-millisecond scoring to multi-second encodes
+DEFAULT_BUCKETS = (
+	0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025,
+	0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0,
+)
+
+Labels = Tuple[str, ...]
+
+
+def _escape(value: str) -> str:
+	return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _fmt(value: float) -> str:
+	if math.isinf(value):
+		return "+Inf" if value > 0 else "-Inf"
+	return repr(float(value)) if value != int(value) else str(int(value))
+
+
+class _Metric:
+	kind = "untyped"
+
+	def __init__(self, name: str, help: str, labelnames: Sequence[str] = ()) -> None:
+		self.name = name
+		self.help = help
+		self.labelnames = tuple(labelnames)
+		self._lock = threading.Lock()
+
+	def _labels(self, labels: Labels, extra: Iterable[Tuple[str, str]] = ()) -> str:
+		pairs = list(zip(self.labelnames, labels)) + list(extra)
+		if not pairs:
+			return ""
+		return "{" + ",".join(f'{k}="{_escape(str(v))}"' for k, v in pairs) + "}"
+
+	def samples(self) -> List[str]:
+		raise NotImplementedError
+
+	def render(self) -> List[str]:
+		return [
+			f"# HELP {self.name} {self.help}",
+			f"# TYPE {self.name} {self.kind}",
+			*self.samples(),
+		]
+
+
+class Counter(_Metric):
+	kind = "counter"
+
+	def __init__(self, name: str, help: str, labelnames: Sequence[str] = ()) -> None:
+		super().__init__(name, help, labelnames)
+		self._values: Dict[Labels, float] = {}
+
+	def inc(self, *labels: str, amount: float = 1.0) -> None:
+		with self._lock:
+			self._values[labels] = self._values.get(labels, 0.0) + amount
+
+	def value(self, *labels: str) -> float:
+		with self._lock:
+			return self._values.get(labels, 0.0)
+
+	def samples(self) -> List[str]:
+		with self._lock:
+			items = sorted(self._values.items())
+		return [f"{self.name}{self._labels(labels)} {_fmt(v)}" for labels, v in items]
+
+
+class Histogram(_Metric):
+	"""Cumulative-bucket histogram; ``observe`` is one bisect plus a few additions under a lock."""
+
+	kind = "histogram"
+
+	def __init__(
+		self,
+		name: str,
+		help: str,
+		labelnames: Sequence[str] = (),
+		buckets: Sequence[float] = DEFAULT_BUCKETS,
+	) -> None:
+		super().__init__(name, help, labelnames)
+		self.buckets = tuple(sorted(float(b) for b in buckets))
+		# labels -> [per-bucket counts (+Inf last), sum]
+		self._series: Dict[Labels, Tuple[List[int], List[float]]] = {}
+
+	def observe(self, value: float, *labels: str) -> None:
+		i = bisect.bisect_left(self.buckets, value)
+		with self._lock:
+			series = self._series.get(labels)
+			if series is None:
+				series = self._series[labels] = ([0] * (len(self.buckets) + 1), [0.0])
+			series[0][i] += 1
+			series[1][0] += value
+
+	def count(self, *labels: str) -> int:
+		with self._lock:
+			series = self._series.get(labels)
+			return sum(series[0]) if series is not None else 0
+
+	def samples(self) -> List[str]:
+		with self._lock:
+			items = sorted((labels, (list(c), s[0])) for labels, (c, s) in self._series.items())
+		out: List[str] = []
+		for labels, (counts, total) in items:
+			running = 0
+			for bound, n in zip((*self.buckets, math.inf), counts):
+				running += n
+				out.append(
+					f"{self.name}_bucket{self._labels(labels, [('le', _fmt(bound))])} {running}"
+				)
+			out.append(f"{self.name}_sum{self._labels(labels)} {_fmt(total)}")
+			out.append(f"{self.name}_count{self._labels(labels)} {running}")
+		return out
+
+
+class Gauge(_Metric):
+	"""Value read at scrape time from ``fn`` (a number, or ``{label tuple: number}``)."""
+
+	kind = "gauge"
+
+	def __init__(
+		self, name: str, help: str, fn: Callable[[], Any], labelnames: Sequence[str] = ()
+	) -> None:
+		super().__init__(name, help, labelnames)
+		self.fn = fn
+
+	def samples(self) -> List[str]:
+		value = self.fn()
+		if value is None:
+			return []
+		if isinstance(value, dict):
+			return [
+				f"{self.name}{self._labels(labels)} {_fmt(v)}"
+				for labels, v in sorted(value.items())
+			]
+		return [f"{self.name} {_fmt(value)}"]
+
+
+class CounterFunc(Gauge):
+	"""Counter whose totals are kept elsewhere and read at scrape time from ``fn``."""
+
+	kind = "counter"
+
+
+class Registry:
+	def __init__(self) -> None:
+		self._metrics: Dict[str, _Metric] = {}
+		self._lock = threading.Lock()
+
+	def register(self, metric: _Metric) -> Any:
+		with self._lock:
+			# Re-registering (module reloads in tests) replaces the previous definition
+			self._metrics[metric.name] = metric
+		return metric
+
+	def render(self) -> str:
+		"""Prometheus text exposition format (0.0.4)."""
+		with self._lock:
+			metrics = list(self._metrics.values())
+		lines: List[str] = []
+		for metric in metrics:
+			lines.extend(metric.render())
+		return "\n".join(lines) + "\n"
+
+
+REGISTRY = Registry()
+STAGE_SECONDS: Histogram = REGISTRY.register(
+	Histogram("vsearch_stage_duration_seconds", "Time spent per request stage", ["stage"])
+)
+REQUESTS: Counter = REGISTRY.register(
+	Counter("vsearch_http_requests_total", "HTTP requests by route and status", ["path", "status"])
+)
+ERRORS: Counter = REGISTRY.register(
+	Counter(
+		"vsearch_http_errors_total",
+		"HTTP responses >= 400, or unhandled exceptions (status=\"exception\")",
+		["path", "status"],
+	)
+)
+REQUEST_SECONDS: Histogram = REGISTRY.register(
+	Histogram(
+		"vsearch_http_request_duration_seconds",
+		"Time until the response is sent or the request fails",
+		["path"],
+	)
+)
+
+
+class RequestTimings:
+	"""Stage durations (seconds) of one request, accumulated per stage name."""
+
+	def __init__(self) -> None:
+		self.start = time.perf_counter()
+		self.stages: Dict[str, float] = {}
+
+	def add(self, name: str, seconds: float) -> None:
+		self.stages[name] = self.stages.get(name, 0.0) + seconds
+
+	def server_timing(self) -> str:
+		parts = [f"{name};dur={seconds * 1000.0:.3f}" for name, seconds in self.stages.items()]
+		parts.append(f"total;dur={(time.perf_counter() - self.start) * 1000.0:.3f}")
+		return ", ".join(parts)
+
+
+_current: contextvars.ContextVar[Optional[RequestTimings]] = contextvars.ContextVar(
+	"request_timings", default=None
+)
+
+
+@contextlib.contextmanager
+def stage(name: str) -> Iterator[None]:
+	"""Time a block as stage ``name`` of the current request; a no-op outside requests.
+
+	Index code can wrap its hot loops with this: callers that are not serving
+	an HTTP request (scripts, benchmarks) pay one context-variable lookup.
+	"""
+	timings = _current.get()
+	if timings is None:
+		yield
+		return
+	t0 = time.perf_counter()
+	try:
+		yield
+	finally:
+		seconds = time.perf_counter() - t0
+		timings.add(name, seconds)
+		STAGE_SECONDS.observe(seconds, name)
+
+
+Scope = MutableMapping[str, Any]
+Message = MutableMapping[str, Any]
+Receive = Callable[[], Awaitable[Message]]
+Send = Callable[[Message], Awaitable[None]]
+ASGIApp = Callable[[Scope, Receive, Send], Awaitable[None]]
+
+
+class MetricsMiddleware:
+	"""Pure ASGI middleware: request counters and latency, plus an optional Server-Timing header.
+
+	``paths`` bounds the ``path`` label; anything else is counted as "other".
+	``server_timing`` is checked per request, so the setting can change at runtime.
+	"""
+
+	def __init__(
+		self,
+		app: ASGIApp,
+		paths: Callable[[], Iterable[str]],
+		server_timing: Callable[[], bool] = lambda: False,
+	) -> None:
+		self.app = app
+		self._paths = paths
+		self._known: Optional[frozenset] = None
+		self.server_timing = server_timing
+
+	def _label(self, path: str) -> str:
+		if self._known is None:
+			self._known = frozenset(self._paths())
+		return path if path in self._known else "other"
+
+	async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+		if scope["type"] != "http":
+			await self.app(scope, receive, send)
+			return
+		timings = RequestTimings()
+		token = _current.set(timings)
+		path = self._label(scope.get("path", ""))
+		status = {"code": 500}
+
+		async def send_with_metrics(message: Message) -> None:
+			if message["type"] == "http.response.start":
+				status["code"] = int(message["status"])
+				if self.server_timing():
+					headers = list(message.get("headers", []))
+					headers.append((b"server-timing", timings.server_timing().encode("latin-1")))
+					message = {**message, "headers": headers}
+			await send(message)
+
+		raised = False
+		try:
+			await self.app(scope, receive, send_with_metrics)
+		except Exception:
+			raised = True
+			ERRORS.inc(path, "exception")
+			raise
+		finally:
+			_current.reset(token)
+			REQUEST_SECONDS.observe(time.perf_counter() - timings.start, path)
+			code = str(status["code"])
+			REQUESTS.inc(path, code)
+			# An exception is already counted once above, not again as its 500
+			if status["code"] >= 400 and not raised:
+				ERRORS.inc(path, code)
@@ -1,6 +1,6 @@
 from __future__ import annotations
 
-from typing import Literal, Optional
+from typing import Any, Dict, Literal, Optional
 
 from pydantic import BaseModel, Field, field_validator
 
@@ -13,6 +13,18 @@ class SearchRequest(BaseModel):
 	k: int = Field(default=10, ge=1, le=100)
 	metric: Optional[Metric] = None
 	normalize: Optional[bool] = False
+	nprobe: Optional[int] = Field(default=None, ge=1, le=4096)
+	# {"field": value | [values] | {"gte": x, "lt": y}}; all conditions must hold
+	filter: Optional[Dict[str, Any]] = None
+	# vector = embeddings only, lexical = BM25 only, hybrid = both fused
+	mode: Literal["vector", "lexical", "hybrid"] = "vector"
+	fusion: Literal["rrf", "weighted"] = "rrf"
+	alpha: float = Field(
+		default=0.5, ge=0.0, le=1.0, description="Vector weight for weighted fusion"
+	)
+	timeout_ms: Optional[float] = Field(
+		default=None, gt=0.0, le=60000.0, description="Overrides SEARCH_DEADLINE_MS"
+	)
 
 	@field_validator("query")
 	@classmethod
@@ -20,6 +32,23 @@ class SearchRequest(BaseModel):
 		return v.strip()
 
 
+class BatchSearchRequest(BaseModel):
+	queries: list[str] = Field(min_length=1, max_length=1000)
+	k: int = Field(default=10, ge=1, le=100)
+	metric: Optional[Metric] = None
+	normalize: Optional[bool] = False
+	nprobe: Optional[int] = Field(default=None, ge=1, le=4096)
+	filter: Optional[Dict[str, Any]] = None
+	timeout_ms: Optional[float] = Field(
+		default=None, gt=0.0, le=60000.0, description="Overrides SEARCH_DEADLINE_MS"
+	)
+
+	@field_validator("queries")
+	@classmethod
+	def strip_queries(cls, v: list[str]) -> list[str]:
+		return [q.strip() for q in v]
+
+
 class SearchHit(BaseModel):
 	id: str
 	text: str
@@ -30,5 +59,46 @@ class SearchResponse(BaseModel):
 	results: list[SearchHit]
 
 
+class PostsResponse(BaseModel):
+	results: list[SearchHit]
+	# Live records in the index; pass ``next_cursor`` back as ``cursor`` for the next page
+	total: int
+	next_cursor: Optional[str] = None
+
+
+class BatchSearchResponse(BaseModel):
+	results: list[SearchResponse]
+
+
+class DocumentIn(BaseModel):
+	id: str = Field(min_length=1)
+	text: str = Field(min_length=1)
+	metadata: Dict[str, Any] = Field(default_factory=dict)
+
+
+class UpsertDocumentsRequest(BaseModel):
+	documents: list[DocumentIn] = Field(min_length=1, max_length=1000)
+
+
+class DeleteDocumentsRequest(BaseModel):
+	ids: list[str] = Field(min_length=1, max_length=1000)
+
+
+class DocumentsResponse(BaseModel):
+	upserted: int = 0
+	deleted: int = 0
+	missing: list[str] = Field(default_factory=list)
+	size: int
+
+
+class ReloadResponse(BaseModel):
+	source: Literal["index_dir", "shared"]
+	reloaded: bool
+	previous_generation: Optional[int] = None
+	generation: Optional[int] = None
+	index_type: Optional[str] = None
+	size: int = 0
+
+
 class HealthResponse(BaseModel):
 	status: str = "ok"
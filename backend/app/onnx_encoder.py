@@ -0,0 +1,236 @@
+from __future__ import annotations
+
+import inspect
+import json
+import logging
+import os
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# Written next to the exported graph; the encoder needs nothing else from the original model
+CONFIG_FILE = "encoder.json"
+MODEL_FILE = "model.onnx"
+QUANTIZED_FILE = "model.int8.onnx"
+
+
+def export_dir(root: Path, model_name: str) -> Path:
+	return root / model_name.replace("/", "__")
+
+
+def export_model(model_name: str, directory: Path, max_seq_length: Optional[int] = None) -> Path:
+	"""Export the transformer of ``model_name`` to ``directory/model.onnx`` plus its tokenizer.
+
+	Pooling and normalization run in NumPy at encode time, so only the
+	SentenceTransformer layouts Transformer -> Pooling (cls, mean or max) ->
+	optional Normalize are supported; anything else raises ValueError. Needs
+	torch and sentence-transformers, which serving with the result does not.
+	"""
+	import torch
+	from sentence_transformers import SentenceTransformer
+	from sentence_transformers.models import Normalize, Pooling, Transformer
+
+	st = SentenceTransformer(model_name, device="cpu")
+	modules = list(st)
+	if not modules or not isinstance(modules[0], Transformer):
+		raise ValueError(f"{model_name}: first module is not a Transformer")
+	pooling = next((m for m in modules if isinstance(m, Pooling)), None)
+	unsupported = [type(m).__name__ for m in modules[1:] if not isinstance(m, (Pooling, Normalize))]
+	if pooling is None or unsupported:
+		raise ValueError(
+			f"{model_name}: cannot export modules {unsupported or ['(no Pooling)']} to ONNX"
+		)
+	weighted = getattr(pooling, "pooling_mode_weightedmean_tokens", False)
+	flags = {
+		"cls": pooling.pooling_mode_cls_token,
+		"mean": pooling.pooling_mode_mean_tokens,
+		"max": pooling.pooling_mode_max_tokens,
+		"other": pooling.pooling_mode_mean_sqrt_len_tokens or weighted,
+	}
+	modes = [mode for mode, on in flags.items() if on]
+	if len(modes) != 1 or modes[0] == "other":
+		raise ValueError(
+			f"{model_name}: only a single cls, mean or max pooling mode can be exported"
+		)
+
+	transformer: Any = modules[0]
+	tokenizer = transformer.tokenizer
+	seq_len = int(max_seq_length or transformer.max_seq_length or 512)
+	directory.mkdir(parents=True, exist_ok=True)
+	tokenizer.save_pretrained(str(directory))
+	if not (directory / "tokenizer.json").exists():
+		raise ValueError(f"{model_name}: needs a fast tokenizer (tokenizer.json) for ONNX serving")
+
+	sample = tokenizer(["export"], return_tensors="pt")
+	input_names = [
+		name for name in ("input_ids", "attention_mask", "token_type_ids") if name in sample
+	]
+	model = transformer.auto_model.eval()
+
+	class _Hidden(torch.nn.Module):
+		# Positional inputs in ``input_names`` order, last hidden state out
+		def __init__(self) -> None:
+			super().__init__()
+			self.model = model
+
+		def forward(self, *inputs: Any) -> Any:
+			return self.model(**dict(zip(input_names, inputs))).last_hidden_state
+
+	dynamic = {name: {0: "batch", 1: "sequence"} for name in input_names}
+	dynamic["last_hidden_state"] = {0: "batch", 1: "sequence"}
+	tmp = directory / (MODEL_FILE + ".tmp")
+	# The TorchScript exporter handles the dynamic axes; newer torch defaults to the dynamo one
+	dynamo = "dynamo" in inspect.signature(torch.onnx.export).parameters
+	legacy: Dict[str, Any] = {"dynamo": False} if dynamo else {}
+	with torch.no_grad():
+		torch.onnx.export(
+			_Hidden(),
+			tuple(sample[name] for name in input_names),
+			str(tmp),
+			input_names=input_names,
+			output_names=["last_hidden_state"],
+			dynamic_axes=dynamic,
+			opset_version=17,
+			**legacy,
+		)
+	os.replace(tmp, directory / MODEL_FILE)
+	config = {
+		"model": model_name,
+		"inputs": input_names,
+		"pooling": modes[0],
+		"normalize": any(isinstance(m, Normalize) for m in modules),
+		"max_seq_length": seq_len,
+		"dimension": int(st.get_sentence_embedding_dimension() or 0),
+		"pad_token": tokenizer.pad_token,
+	}
+	# Written last: its presence marks a complete export
+	(directory / CONFIG_FILE).write_text(json.dumps(config, indent=2), encoding="utf-8")
+	logger.info("Exported %s to %s", model_name, directory / MODEL_FILE)
+	return directory / MODEL_FILE
+
+
+def quantize_model(directory: Path) -> Path:
+	"""Dynamic int8 quantization of ``model.onnx``: int8 weights, per-batch activation scales."""
+	from onnxruntime.quantization import QuantType, quantize_dynamic
+
+	out = directory / QUANTIZED_FILE
+	tmp = directory / (QUANTIZED_FILE + ".tmp")
+	quantize_dynamic(str(directory / MODEL_FILE), str(tmp), weight_type=QuantType.QInt8)
+	os.replace(tmp, out)
+	logger.info("Quantized %s to %s", directory / MODEL_FILE, out)
+	return out
+
+
+def read_config(directory: Path) -> Dict[str, Any]:
+	try:
+		with (directory / CONFIG_FILE).open("r", encoding="utf-8") as f:
+			config: Dict[str, Any] = json.load(f)
+			return config
+	except FileNotFoundError:
+		return {}
+
+
+def ensure_export(
+	model_name: str, root: Path, quantize: bool = False, max_seq_length: Optional[int] = None
+) -> Path:
+	"""Directory of ``model_name``'s export under ``root``; exports (and quantizes) if missing."""
+	directory = export_dir(root, model_name)
+	if read_config(directory).get("model") != model_name:
+		export_model(model_name, directory, max_seq_length)
+	if quantize and not (directory / QUANTIZED_FILE).exists():
+		quantize_model(directory)
+	return directory
+
+
+class OnnxEncoder:
+	"""SentenceTransformer-compatible ``encode`` over an ONNX Runtime session.
+
+	Imports only onnxruntime and tokenizers, so a server using it starts
+	without loading torch.
+	"""
+
+	def __init__(
+		self,
+		directory: Path,
+		quantized: bool = False,
+		threads: int = 0,
+		max_seq_length: Optional[int] = None,
+	) -> None:
+		import onnxruntime as ort
+		from tokenizers import Tokenizer
+
+		self.directory = directory
+		self.config = read_config(directory)
+		if not self.config:
+			raise FileNotFoundError(f"no ONNX export in {directory}")
+		self.max_seq_length = int(max_seq_length or self.config["max_seq_length"])
+		self.tokenizer = Tokenizer.from_file(str(directory / "tokenizer.json"))
+		self.tokenizer.enable_truncation(self.max_seq_length)
+		# Batches are padded in _run, to the longest sequence they contain
+		self.tokenizer.no_padding()
+		pad_id = self.tokenizer.token_to_id(self.config.get("pad_token") or "[PAD]")
+		self.pad_id = pad_id if pad_id is not None else 0
+		options = ort.SessionOptions()
+		options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+		if threads > 0:
+			options.intra_op_num_threads = int(threads)
+		path = directory / (QUANTIZED_FILE if quantized else MODEL_FILE)
+		self.session = ort.InferenceSession(str(path), options, providers=["CPUExecutionProvider"])
+		self.inputs: List[str] = list(self.config["inputs"])
+
+	def get_sentence_embedding_dimension(self) -> int:
+		return int(self.config["dimension"])
+
+	def tokenize(self, texts: List[str]) -> List[Any]:
+		"""Truncated, unpadded encodings (``len(e)`` is the token count) for ``embed_tokens``."""
+		encodings: List[Any] = self.tokenizer.encode_batch(texts)
+		return encodings
+
+	def embed_tokens(self, encodings: List[Any]) -> np.ndarray:
+		"""Pooled (and, if the model normalizes, unit-length) embeddings of a batch of encodings."""
+		longest = max(len(e.ids) for e in encodings)
+		feeds = {
+			name: np.zeros((len(encodings), longest), dtype=np.int64)
+			for name in ("input_ids", "attention_mask", "token_type_ids")
+		}
+		feeds["input_ids"].fill(self.pad_id)
+		for row, e in enumerate(encodings):
+			n = len(e.ids)
+			feeds["input_ids"][row, :n] = e.ids
+			feeds["attention_mask"][row, :n] = 1
+			feeds["token_type_ids"][row, :n] = e.type_ids
+		hidden = np.asarray(self.session.run(None, {name: feeds[name] for name in self.inputs})[0])
+		mask = feeds["attention_mask"][:, :, None].astype(np.float32)
+		pooling = self.config["pooling"]
+		if pooling == "cls":
+			out = hidden[:, 0]
+		elif pooling == "max":
+			out = np.where(mask > 0, hidden, -1e9).max(axis=1)
+		else:
+			out = (hidden * mask).sum(axis=1) / np.clip(mask.sum(axis=1), 1e-9, None)
+		out = out.astype(np.float32, copy=False)
+		if self.config.get("normalize"):
+			out /= np.clip(np.linalg.norm(out, axis=1, keepdims=True), 1e-12, None)
+		return out
+
+	def encode(
+		self,
+		sentences: Iterable[str],
+		batch_size: int = 32,
+		normalize_embeddings: bool = False,
+		**_: Any,
+	) -> np.ndarray:
+		texts = list(sentences)
+		dim = self.get_sentence_embedding_dimension()
+		out = np.empty((len(texts), dim), dtype=np.float32)
+		# Longest first, like SentenceTransformer.encode, so each batch pads to similar lengths
+		order = np.argsort([-len(t) for t in texts], kind="stable")
+		for start in range(0, len(texts), max(1, batch_size)):
+			rows = order[start : start + batch_size]
+			out[rows] = self.embed_tokens(self.tokenize([texts[i] for i in rows]))
+		if normalize_embeddings:
+			out /= np.clip(np.linalg.norm(out, axis=1, keepdims=True), 1e-12, None)
+		return out
@@ -0,0 +1,212 @@
+from __future__ import annotations
+
+import hashlib
+import itertools
+import json
+import logging
+import multiprocessing as mp
+import os
+import shutil
+import sys
+from collections import deque
+from multiprocessing.pool import AsyncResult
+from pathlib import Path
+from typing import Any, Callable, Deque, Dict, Iterable, Iterator, List, Optional, Tuple
+
+import numpy as np
+
+from .config import Settings
+from .embeddings import EmbeddingService
+from .indexing import _chunks, _encode, _reusable_rows, _split_chunk
+from .loader import content_hash
+from .vector_db import FlatVectorIndex
+
+logger = logging.getLogger(__name__)
+
+PLAN_FILE = "plan.json"
+VECTORS_FILE = "embedded.npy"
+
+# Per worker process: its encoder and the settings it was built from
+_WORKER: Dict[str, Any] = {}
+
+# (shard number, dataset rows, texts, digest of the shard's ids and hashes)
+Shard = Tuple[int, List[int], List[str], str]
+
+
+def _write_json(path: Path, data: Dict[str, Any]) -> None:
+	tmp = path.with_suffix(path.suffix + ".tmp")
+	tmp.write_text(json.dumps(data, sort_keys=True), encoding="utf-8")
+	os.replace(tmp, path)
+
+
+def _read_json(path: Path) -> Dict[str, Any]:
+	try:
+		data: Dict[str, Any] = json.loads(path.read_text(encoding="utf-8"))
+		return data
+	except (FileNotFoundError, ValueError):
+		return {}
+
+
+def _init_worker(settings: Settings, threads: int, factory: Callable[[Settings], Any]) -> None:
+	if threads > 0:
+		# Read by torch/onnxruntime when they load, which happens in ``factory``
+		os.environ["OMP_NUM_THREADS"] = str(threads)
+		settings = settings.model_copy(update={"onnx_threads": threads})
+	_WORKER["settings"] = settings
+	_WORKER["embeddings"] = factory(settings)
+	torch = sys.modules.get("torch")
+	if threads > 0 and torch is not None:
+		torch.set_num_threads(threads)
+
+
+def _dimension() -> int:
+	return int(_encode(_WORKER["embeddings"], ["dimension probe"], _WORKER["settings"]).shape[1])
+
+
+def _embed_shard(task: Tuple[Shard, Path]) -> Tuple[int, int]:
+	(number, rows, texts, digest), work_dir = task
+	emb = _encode(_WORKER["embeddings"], texts, _WORKER["settings"])
+	out = np.load(work_dir / VECTORS_FILE, mmap_mode="r+")
+	out[np.asarray(rows)] = emb
+	out.flush()
+	del out
+	# Written after the rows are flushed: a checkpoint always means complete rows
+	_write_json(work_dir / f"shard-{number:06d}.json", {"digest": digest, "rows": len(rows)})
+	return number, len(rows)
+
+
+def plan_shards(
+	entries: Iterable[Dict],
+	settings: Settings,
+	existing: Optional[FlatVectorIndex] = None,
+) -> Iterator[Shard]:
+	"""The rows ``build_index`` would embed, one shard per ``embed_chunk_size`` dataset chunk.
+
+	A shard holds exactly the texts the serial build passes to one encode
+	call, so both paths form the same encoder batches.
+	"""
+	reusable = _reusable_rows(existing)
+	start = 0
+	for number, chunk in enumerate(_chunks(entries, settings.embed_chunk_size)):
+		hashes = [content_hash(e["metadata"]["text"]) for e in chunk]
+		_, _, embed_at, _ = _split_chunk(chunk, hashes, reusable)
+		if embed_at:
+			key = "\n".join(f"{chunk[i]['id']}\t{hashes[i]}" for i in embed_at)
+			texts = [chunk[i]["metadata"]["text"] for i in embed_at]
+			digest = hashlib.sha1(key.encode("utf-8")).hexdigest()
+			yield number, [start + i for i in embed_at], texts, digest
+		start += len(chunk)
+
+
+def embed_parallel(
+	entries: Iterable[Dict],
+	settings: Settings,
+	workers: int,
+	threads_per_worker: int = 0,
+	existing: Optional[FlatVectorIndex] = None,
+	work_dir: Optional[Path] = None,
+	factory: Callable[[Settings], Any] = EmbeddingService.from_settings,
+	count: Optional[int] = None,
+) -> Tuple[np.ndarray, int]:
+	"""Embed the rows ``build_index`` would embed on ``workers`` processes.
+
+	Returns the vectors and the number of shards resumed from checkpoints.
+
+	Each worker loads its own encoder via ``factory`` with ``threads_per_worker``
+	intra-op threads (0 = library default) and writes its shards' rows into one
+	memory-mapped ``(count, dim)`` array in ``work_dir``, indexed by dataset row,
+	then records a per-shard checkpoint. Rerunning with the same dataset, model
+	and batching settings skips every checkpointed shard; any other change
+	starts over. Pass the result to ``build_index(..., encoded=...)``.
+
+	With ``count`` given, ``entries`` may be a one-pass iterator: shards are
+	planned as it is read and at most ``2 * workers`` are in flight, so the
+	texts held at once are bounded like those of a streamed serial build.
+	"""
+	if count is None:
+		entries = list(entries)
+		count = len(entries)
+	work_dir = work_dir or settings.index_dir / ".build-parallel"
+	plan = {
+		"model": settings.embed_model,
+		"backend": settings.encoder_backend,
+		"onnx_quantize": settings.onnx_quantize,
+		"count": count,
+		"chunk_size": settings.embed_chunk_size,
+		"token_budget": settings.embed_token_budget,
+		"batch_size": settings.batch_size,
+		"max_seq_length": settings.max_seq_length,
+		"normalize_input_text": settings.normalize_input_text,
+	}
+	vectors = work_dir / VECTORS_FILE
+	previous = _read_json(work_dir / PLAN_FILE)
+	stale = {k: v for k, v in previous.items() if k != "dimension"} != plan
+	if previous and (stale or not vectors.exists()):
+		logger.info("Discarding checkpoints in %s from a different build", work_dir)
+		previous = {}
+	if not previous:
+		shutil.rmtree(work_dir, ignore_errors=True)
+
+	resumed = 0
+
+	def pending() -> Iterator[Shard]:
+		nonlocal resumed
+		for shard in plan_shards(entries, settings, existing):
+			number, _, _, digest = shard
+			checkpoint = work_dir / f"shard-{number:06d}.json"
+			if previous and _read_json(checkpoint).get("digest") == digest:
+				resumed += 1
+				continue
+			yield shard
+
+	todo = pending()
+	first = next(todo, None)
+	if first is None:
+		if not resumed:
+			# Every row is reused from ``existing``; build_index reads nothing from here
+			return np.empty((count, 0), dtype=np.float32), 0
+		logger.info("All %d shards resumed from %s", resumed, work_dir)
+		return np.load(vectors, mmap_mode="r"), resumed
+	work_dir.mkdir(parents=True, exist_ok=True)
+
+	ctx = mp.get_context("spawn")  # torch and tokenizers are not fork-safe
+	with ctx.Pool(workers, _init_worker, (settings, threads_per_worker, factory)) as pool:
+		if not previous:
+			dimension = pool.apply(_dimension)
+			out = np.lib.format.open_memmap(
+				vectors, mode="w+", dtype=np.float32, shape=(count, dimension)
+			)
+			del out
+			_write_json(work_dir / PLAN_FILE, {**plan, "dimension": dimension})
+		in_flight: Deque["AsyncResult[Tuple[int, int]]"] = deque()
+		embedded = 0
+		rows = 0
+
+		def collect() -> None:
+			nonlocal embedded, rows
+			number, n = in_flight.popleft().get()
+			embedded += 1
+			rows += n
+			logger.info(
+				"Shard %d done (%d rows; %d shards embedded, %d resumed)",
+				number,
+				n,
+				embedded,
+				resumed,
+			)
+
+		for shard in itertools.chain([first], todo):
+			in_flight.append(pool.apply_async(_embed_shard, ((shard, work_dir),)))
+			if len(in_flight) >= 2 * workers:
+				collect()
+		while in_flight:
+			collect()
+	logger.info(
+		"Embedded %d rows in %d shards on %d workers (%d shards resumed from %s)",
+		rows,
+		embedded,
+		workers,
+		resumed,
+		work_dir,
+	)
+	return np.load(vectors, mmap_mode="r"), resumed
@@ -0,0 +1,133 @@
+from __future__ import annotations
+
+import asyncio
+import contextlib
+import contextvars
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Callable, Dict, Iterator, Optional, TypeVar
+
+T = TypeVar("T")
+
+
+class Overloaded(Exception):
+	"""Raised when a request arrives while ``max_inflight`` requests are already admitted."""
+
+
+class DeadlineExceeded(Exception):
+	"""Raised when a request's deadline passes before (or while) a stage runs."""
+
+
+class SearchPipeline:
+	"""Admission control plus bounded executors for the async search path.
+
+	- At most ``max_inflight`` requests are admitted (running or queued for a
+		stage); further ones are rejected at once instead of waiting
+	- Model inference and index scoring run on separate fixed-size thread pools,
+		so a burst of slow encodes cannot starve scoring and the event loop stays free
+	- Each stage checks the request deadline before it starts: work that waited
+		in a pool queue past its deadline is dropped instead of computed and discarded
+	"""
+
+	def __init__(
+		self,
+		encode_threads: int = 2,
+		score_threads: int = 4,
+		max_inflight: int = 64,
+		deadline_ms: float = 0.0,
+	) -> None:
+		self.max_inflight = int(max_inflight)
+		self.deadline_ms = float(deadline_ms)
+		self.encode_threads = max(1, int(encode_threads))
+		self.score_threads = max(1, int(score_threads))
+		# Created on first use and dropped by ``close``, so a restarted app gets fresh pools
+		self._pools: Dict[str, ThreadPoolExecutor] = {}
+		self._lock = threading.Lock()
+		self.inflight: int = 0
+		self.admitted: int = 0
+		self.rejected: int = 0
+		self.deadline_exceeded: int = 0
+
+	def deadline(self, timeout_ms: Optional[float] = None) -> Optional[float]:
+		"""Monotonic deadline for a request (``timeout_ms`` overrides the default; 0 = none)."""
+		ms = self.deadline_ms if timeout_ms is None else float(timeout_ms)
+		return time.monotonic() + ms / 1000.0 if ms > 0 else None
+
+	@contextlib.contextmanager
+	def admit(self) -> Iterator[None]:
+		with self._lock:
+			if self.max_inflight > 0 and self.inflight >= self.max_inflight:
+				self.rejected += 1
+				raise Overloaded(f"{self.inflight} search requests in flight")
+			self.inflight += 1
+			self.admitted += 1
+		try:
+			yield
+		finally:
+			with self._lock:
+				self.inflight -= 1
+
+	def _pool(self, name: str, threads: int) -> ThreadPoolExecutor:
+		with self._lock:
+			pool = self._pools.get(name)
+			if pool is None:
+				pool = self._pools[name] = ThreadPoolExecutor(
+					threads, thread_name_prefix=f"search-{name}"
+				)
+			return pool
+
+	async def _run(
+		self, pool: ThreadPoolExecutor, fn: Callable[[], T], deadline: Optional[float]
+	) -> T:
+		def guarded() -> T:
+			if deadline is not None and time.monotonic() >= deadline:
+				raise DeadlineExceeded("deadline passed while queued")
+			return fn()
+
+		# Run in a copy of the caller's context so stage timings reach its request
+		future = asyncio.get_running_loop().run_in_executor(
+			pool, contextvars.copy_context().run, guarded
+		)
+		return await self._await(future, deadline)
+
+	async def _await(self, future: "asyncio.Future[T]", deadline: Optional[float]) -> T:
+		try:
+			if deadline is None:
+				return await future
+			# Cancelling a queued pool item removes it; a running one finishes unobserved
+			return await asyncio.wait_for(future, timeout=max(deadline - time.monotonic(), 0.0))
+		except (asyncio.TimeoutError, DeadlineExceeded):
+			with self._lock:
+				self.deadline_exceeded += 1
+			raise DeadlineExceeded("search deadline exceeded") from None
+
+	async def encode(self, fn: Callable[[], T], deadline: Optional[float] = None) -> T:
+		return await self._run(self._pool("encode", self.encode_threads), fn, deadline)
+
+	async def score(self, fn: Callable[[], T], deadline: Optional[float] = None) -> T:
+		return await self._run(self._pool("score", self.score_threads), fn, deadline)
+
+	async def wait(self, future: "Future[T]", deadline: Optional[float] = None) -> T:
+		"""Await work already handed to another thread (e.g. the embedding batcher) on the loop.
+
+		No pool thread is held while it waits; past the deadline the future is
+		cancelled, which drops it if it has not started.
+		"""
+		return await self._await(asyncio.wrap_future(future), deadline)
+
+	def stats(self) -> Dict[str, int]:
+		with self._lock:
+			return {
+				"inflight": self.inflight,
+				"max_inflight": self.max_inflight,
+				"admitted": self.admitted,
+				"rejected": self.rejected,
+				"deadline_exceeded": self.deadline_exceeded,
+			}
+
+	def close(self) -> None:
+		with self._lock:
+			pools, self._pools = self._pools, {}
+		for pool in pools.values():
+			pool.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,103 @@
+from __future__ import annotations
+
+from typing import Dict, Optional
+
+import numpy as np
+
+from .ivf import assign_nearest, kmeans
+from .quantized import QuantizedVectorIndex
+from .vector_db import FlatVectorIndex
+
+
+class PQVectorIndex(QuantizedVectorIndex):
+	"""Product-quantized index: ``m`` uint8 codes per row instead of float rows.
+
+	- Each of the ``m`` subvectors is quantized against its own 256-entry codebook
+	- Queries are scored with asymmetric distance: one ``(m, 256)`` table of
+		query/codeword inner products, summed over each row's codes
+	- Re-ranking and ``vectors.npy`` persistence come from ``QuantizedVectorIndex``
+	"""
+
+	index_type = "pq"
+
+	def __init__(
+		self, dimension: int, m: int = 8, rerank: int = 0, train_iters: int = 20, seed: int = 0
+	) -> None:
+		super().__init__(dimension, rerank=rerank)
+		if self.dimension % int(m) != 0:
+			raise ValueError(f"dimension {self.dimension} is not divisible by pq m={m}")
+		self.m: int = int(m)
+		self.dsub: int = self.dimension // self.m
+		self.train_iters: int = int(train_iters)
+		self.seed: int = int(seed)
+		self._codebooks: Optional[np.ndarray] = None  # (m, ksub, dsub)
+		self._codes = np.empty((0, self.m), dtype=np.uint8)
+
+	@classmethod
+	def _create_for_load(cls, dimension: int, manifest: Dict) -> "PQVectorIndex":
+		params = manifest.get("pq", {}) or {}
+		return cls(
+			dimension,
+			m=int(params.get("m", 8)),
+			train_iters=int(params.get("train_iters", 20)),
+			seed=int(params.get("seed", 0)),
+		)
+
+	@property
+	def trained(self) -> bool:
+		return self._codebooks is not None
+
+	def train(self) -> None:
+		"""(Re)train the per-subspace codebooks on all stored vectors and re-encode."""
+		FlatVectorIndex._materialize(self)
+		vectors = self._all_vectors()
+		if vectors.shape[0] == 0:
+			raise ValueError("cannot train PQ index without vectors")
+		ksub = min(256, vectors.shape[0])
+		books = [
+			kmeans(
+				self._subvectors(vectors, j),
+				ksub,
+				iters=self.train_iters,
+				seed=self.seed + j,
+				max_train_points=256 * ksub,
+			)
+			for j in range(self.m)
+		]
+		self._codebooks = np.stack(books).astype(np.float32, copy=False)
+		self._codes = self._encode(vectors)
+
+	def _subvectors(self, x: np.ndarray, j: int) -> np.ndarray:
+		return np.asarray(x[:, j * self.dsub:(j + 1) * self.dsub], dtype=np.float32)
+
+	def _encode(self, x: np.ndarray) -> np.ndarray:
+		assert self._codebooks is not None
+		codes = np.empty((x.shape[0], self.m), dtype=np.uint8)
+		for j in range(self.m):
+			codes[:, j] = assign_nearest(self._subvectors(x, j), self._codebooks[j])
+		return codes
+
+	def _approx_inner_products(self, q: np.ndarray, codes: np.ndarray) -> np.ndarray:
+		"""Approximate ``rows @ q`` from ``codes`` via a per-query lookup table."""
+		codebooks = self._codebooks
+		assert codebooks is not None
+		table = np.einsum("jkd,jd->jk", codebooks, q.reshape(self.m, self.dsub))
+		ips: np.ndarray = table[np.arange(self.m), codes].sum(axis=1)
+		return ips
+
+	def _quantizer_arrays(self) -> Dict[str, np.ndarray]:
+		return {"codebooks": self._codebooks} if self._codebooks is not None else {}
+
+	def _restore_quantizer(self, arrays: Dict[str, np.ndarray]) -> None:
+		if "codebooks" in arrays:
+			self._codebooks = arrays["codebooks"].astype(np.float32, copy=False)
+
+	def _extra_manifest(self) -> Dict:
+		return {
+			"pq": {
+				"m": self.m,
+				"rerank": self.rerank,
+				"train_iters": self.train_iters,
+				"seed": self.seed,
+			}
+		}
@@ -0,0 +1,300 @@
+from __future__ import annotations
+
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from .vector_db import (
+	FlatVectorIndex,
+	IndexLayout,
+	Metric,
+	atomic_save_npy,
+	scores_from_inner_products,
+)
+
+
+class QuantizedVectorIndex(FlatVectorIndex):
+	"""Base of the indexes that scan compact per-row codes instead of float32 rows.
+
+	- Subclasses provide ``train``, ``_encode`` and ``_approx_inner_products``,
+		plus their quantizer parameters as ``_quantizer_arrays``
+	- Rows inserted after training are encoded on the next search, into a
+		capacity-doubled codes buffer, so no insert re-copies the existing codes
+	- The top ``rerank`` candidates can be re-scored exactly; after ``save``/``load``
+		the full vectors are memory-mapped from ``vectors.npy`` instead of held in RAM,
+		and rows inserted later are buffered after the mapping rather than copying it
+	"""
+
+	_store_normed = False
+
+	def __init__(self, dimension: int, rerank: int = 0) -> None:
+		super().__init__(dimension)
+		self.rerank: int = int(rerank)
+		# One row of codes per encoded row; subclasses set the width and dtype.
+		# After encoding new rows this is a ``[:N]`` view of ``_codes_buf``
+		self._codes: np.ndarray = np.empty((0, 0), dtype=np.uint8)
+		self._codes_buf: Optional[np.ndarray] = None
+		# float32 rows [0, B) memory-mapped from vectors.npy after save/load; while set,
+		# ``_vectors`` (and its buffer) holds only the rows [B, N) inserted since
+		self._mapped: Optional[np.ndarray] = None
+
+	@property
+	def trained(self) -> bool:
+		raise NotImplementedError
+
+	def train(self) -> None:
+		"""(Re)fit the quantizer on all stored vectors and re-encode."""
+		raise NotImplementedError
+
+	def _encode(self, x: np.ndarray) -> np.ndarray:
+		"""Codes of the ``(M, D)`` float32 rows ``x``."""
+		raise NotImplementedError
+
+	def _approx_inner_products(self, q: np.ndarray, codes: np.ndarray) -> np.ndarray:
+		"""Approximate ``rows @ q`` for the rows encoded in ``codes``."""
+		raise NotImplementedError
+
+	def _quantizer_arrays(self) -> Dict[str, np.ndarray]:
+		"""Fitted quantizer parameters, persisted as ``<index_type>_<name>``."""
+		return {}
+
+	def _restore_quantizer(self, arrays: Dict[str, np.ndarray]) -> None:
+		"""Restore the parameters written by ``_quantizer_arrays`` (keys without prefix)."""
+
+	def _mapped_rows(self) -> int:
+		return int(self._mapped.shape[0]) if self._mapped is not None else 0
+
+	def _reserve(self, rows: int) -> None:
+		"""Like ``FlatVectorIndex._reserve``, but only the rows past ``_mapped`` are buffered."""
+		if self._mapped is None:
+			super()._reserve(rows)
+			return
+		assert self._vectors is not None and self._sqnorms is not None
+		base = self._mapped.shape[0]
+		n = len(self._ids)
+		need = n + rows
+		buf = self._vectors_buf
+		if buf is None or buf.shape[0] < need - base or self._vectors.base is not buf:
+			buf = np.empty((max(need - base, 2 * (n - base), 16), self.dimension), dtype=np.float32)
+			buf[: n - base] = self._vectors[: n - base]
+			self._vectors_buf = buf
+		norms_buf = self._sqnorms_buf
+		if norms_buf is None or norms_buf.shape[0] < need or self._sqnorms.base is not norms_buf:
+			norms_buf = np.empty((max(need, 2 * n, 16),), dtype=np.float32)
+			norms_buf[:n] = self._sqnorms[:n]
+			self._sqnorms_buf = norms_buf
+		self._publish(n)
+
+	def _publish(self, n: int) -> None:
+		assert self._vectors_buf is not None and self._sqnorms_buf is not None
+		self._vectors = self._vectors_buf[: n - self._mapped_rows()]
+		self._sqnorms = self._sqnorms_buf[:n]
+
+	def _write_rows(self, start: int, vectors: np.ndarray, norms: np.ndarray) -> None:
+		assert self._vectors_buf is not None and self._sqnorms_buf is not None
+		end = start + vectors.shape[0]
+		base = self._mapped_rows()
+		self._vectors_buf[start - base:end - base] = vectors
+		self._sqnorms_buf[start:end] = norms**2
+
+	def _split_rows(self) -> Tuple[Optional[np.ndarray], np.ndarray, np.ndarray]:
+		"""``(mapped, buffered, sqnorms)``: rows ``[0, B)`` and ``[B, N)``, trimmed like ``_rows``.
+
+		``_vectors`` is read before ``_mapped`` and ``save`` assigns them in the
+		opposite order, so a search racing it sees either layout whole.
+		"""
+		vectors, mapped, sqnorms = self._vectors, self._mapped, self._sqnorms
+		assert vectors is not None and sqnorms is not None
+		base = int(mapped.shape[0]) if mapped is not None else 0
+		n = min(base + vectors.shape[0], sqnorms.shape[0])
+		return mapped, vectors[: max(n - base, 0)], sqnorms[:n]
+
+	def _row_count(self) -> int:
+		return int(self._split_rows()[2].shape[0])
+
+	def _vector_rows(self, rows: np.ndarray) -> np.ndarray:
+		mapped, buffered, _ = self._split_rows()
+		if mapped is None:
+			picked: np.ndarray = buffered[rows]
+			return picked
+		base = mapped.shape[0]
+		out = np.empty((rows.shape[0], self.dimension), dtype=np.float32)
+		in_mapped = rows < base
+		out[in_mapped] = mapped[rows[in_mapped]]
+		out[~in_mapped] = buffered[rows[~in_mapped] - base]
+		return out
+
+	def _all_vectors(self) -> np.ndarray:
+		mapped, buffered, _ = self._split_rows()
+		if mapped is None:
+			return buffered
+		return np.concatenate([mapped, buffered]) if buffered.shape[0] else mapped
+
+	def _scores(
+		self,
+		q: np.ndarray,
+		norm_q: float,
+		metric: Metric,
+		normalize_scores: bool,
+		rows: Optional[np.ndarray] = None,
+		mask_deleted: bool = True,
+	) -> np.ndarray:
+		mapped, buffered, all_sqnorms = self._split_rows()
+		if rows is not None:
+			ips = self._vector_rows(rows) @ q
+			sqnorms = all_sqnorms[rows]
+		elif mapped is not None:
+			ips = np.concatenate([mapped @ q, buffered @ q])
+			sqnorms = all_sqnorms
+		else:
+			ips, sqnorms = buffered @ q, all_sqnorms
+		scores = scores_from_inner_products(ips, sqnorms, norm_q, metric, normalize_scores)
+		return self._apply_tombstones(scores, rows) if mask_deleted else scores
+
+	def _materialize(self) -> None:
+		super()._materialize()
+		n = self._row_count()
+		if n == 0 or self._codes.shape[0] == n:
+			return
+		with self._lock:
+			start = self._codes.shape[0]
+			if start >= n:
+				return
+			if not self.trained:
+				self.train()
+				return
+			self._append_codes(self._encode(self._vector_rows(np.arange(start, n))))
+
+	def _append_codes(self, codes: np.ndarray) -> None:
+		"""Publish ``codes`` after the current ones, doubling the buffer when it is full.
+
+		Codes held outside the buffer (trained, loaded, compacted or shared with a
+		clone) are copied in once, like the float32 rows in ``_reserve``.
+		"""
+		n = self._codes.shape[0]
+		need = n + codes.shape[0]
+		buf = self._codes_buf
+		if buf is None or buf.shape[0] < need or self._codes.base is not buf:
+			buf = np.empty((max(need, 2 * n, 16), self._codes.shape[1]), dtype=self._codes.dtype)
+			buf[:n] = self._codes
+			self._codes_buf = buf
+		# Rows past the published view are invisible to concurrent searches until reassigned
+		buf[n:need] = codes
+		self._codes = buf[:need]
+
+	def clone(self) -> FlatVectorIndex:
+		with self._lock:
+			other = super().clone()
+			assert isinstance(other, QuantizedVectorIndex)
+			# Both sides may append codes; the clone copies into its own buffer first
+			other._codes_buf = None
+			return other
+
+	def _compact_extra(self, keep: np.ndarray) -> None:
+		# ``compact`` gathered every kept row into ``_vectors``
+		self._mapped = None
+		self._codes = self._codes[keep[: self._codes.shape[0]]]
+
+	def search(
+		self,
+		query: np.ndarray,
+		k: int,
+		metric: Metric = "cosine",
+		normalize_scores: bool = False,
+		rerank: Optional[int] = None,
+	) -> List[Tuple[str, float, Dict]]:
+		self._materialize()
+		q, norm_q = self._prepare_query(query)
+		# One snapshot: a concurrent insert may grow the norms before its rows are encoded
+		codes = self._codes
+		if not self.trained or codes.shape[0] == 0:
+			return []
+		assert self._sqnorms is not None
+		sqnorms = self._sqnorms[: codes.shape[0]]
+		approx = scores_from_inner_products(
+			self._approx_inner_products(q, codes), sqnorms, norm_q, metric, normalize_scores
+		)
+		approx = self._apply_tombstones(approx)
+		n_rerank = self.rerank if rerank is None else int(rerank)
+		if n_rerank <= 0:
+			idx = self._top_k(approx, k)
+			return [(self._ids[i], float(approx[i]), self._metadatas[i]) for i in idx]
+		# Exact re-rank of the best candidates against the (memory-mapped) float32 vectors
+		rows = np.sort(self._top_k(approx, max(k, n_rerank)))
+		exact = self._scores(q, norm_q, metric, normalize_scores, rows=rows)
+		idx = self._top_k(exact, k)
+		return [
+			(self._ids[rows[i]], float(exact[i]), self._metadatas[rows[i]])
+			for i in idx
+		]
+
+	def search_batch(
+		self,
+		queries: np.ndarray,
+		k: int,
+		metric: Metric = "cosine",
+		normalize_scores: bool = False,
+		rerank: Optional[int] = None,
+	) -> List[List[Tuple[str, float, Dict]]]:
+		return self._search_each(
+			queries, k, metric=metric, normalize_scores=normalize_scores, rerank=rerank
+		)
+
+	def memory_bytes(self) -> int:
+		"""Resident bytes of the arrays used for scoring (codes, quantizer params, norms)."""
+		self._materialize()
+		assert self._sqnorms is not None
+		params = sum(a.nbytes for a in self._quantizer_arrays().values())
+		return int(self._codes.nbytes + params + self._sqnorms.nbytes)
+
+	def compression_ratio(self) -> float:
+		"""Flat-index resident bytes (vectors, normed, sqnorms) over this index's resident bytes."""
+		flat_bytes = self.size() * (2 * self.dimension + 1) * 4
+		return flat_bytes / max(self.memory_bytes(), 1)
+
+	def save(
+		self, directory: Path, model_name: str, default_metric: Metric, layout: IndexLayout = "npz"
+	) -> None:
+		with self._lock:
+			self._materialize()
+			# Write the full rows for re-ranking, then swap the in-RAM copy for a memmap
+			directory.mkdir(parents=True, exist_ok=True)
+			atomic_save_npy(directory / "vectors.npy", self._all_vectors())
+			super().save(directory, model_name, default_metric, layout=layout)
+			self._mapped = np.load(str(directory / "vectors.npy"), mmap_mode="r")
+			self._vectors = np.empty((0, self.dimension), dtype=np.float32)
+			self._vectors_buf = None
+
+	def _persisted_arrays(self) -> Dict[str, np.ndarray]:
+		# The float32 rows live in vectors.npy, not with the codes
+		assert self._sqnorms is not None
+		arrays = {"sqnorms": self._sqnorms, **self._extra_arrays()}
+		if self._n_deleted:
+			arrays["deleted"] = self._deleted_mask(len(self._ids))
+		return arrays
+
+	def _extra_arrays(self) -> Dict[str, np.ndarray]:
+		if not self.trained:
+			return {}
+		arrays = {"codes": self._codes, **self._quantizer_arrays()}
+		return {f"{self.index_type}_{name}": array for name, array in arrays.items()}
+
+	def _restore_extra(
+		self, arrays: Dict[str, np.ndarray], manifest: Dict, directory: Path
+	) -> None:
+		params = manifest.get(self.index_type, {}) or {}
+		self.rerank = int(params.get("rerank", self.rerank))
+		prefix = f"{self.index_type}_"
+		stored = {
+			name[len(prefix) :]: array for name, array in arrays.items() if name.startswith(prefix)
+		}
+		if "codes" in stored:
+			self._restore_quantizer(stored)
+			self._codes = stored["codes"].astype(self._codes.dtype, copy=False)
+		vectors_path = directory / "vectors.npy"
+		if self._vectors is None:
+			if not vectors_path.exists():
+				raise FileNotFoundError(f"vectors.npy is missing for {self.index_type} index")
+			self._mapped = np.load(str(vectors_path), mmap_mode="r")
+			self._vectors = np.empty((0, self.dimension), dtype=np.float32)
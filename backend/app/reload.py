@@ -0,0 +1,99 @@
+from __future__ import annotations
+
+import logging
+import threading
+from pathlib import Path
+from typing import Callable, Dict, Optional, Tuple
+
+from .config import Settings
+from .indexes import convert_index, load_index, read_manifest
+from .vector_db import FlatVectorIndex
+
+logger = logging.getLogger(__name__)
+
+# (inode, mtime_ns, size) of index.json; ``save`` replaces it last, so a change means a complete
+# new index
+Signature = Optional[Tuple[int, int, int]]
+
+
+def manifest_signature(directory: Path) -> Signature:
+	try:
+		st = (directory / "index.json").stat()
+	except FileNotFoundError:
+		return None
+	return (st.st_ino, st.st_mtime_ns, st.st_size)
+
+
+def load_validated(
+	directory: Path,
+	settings: Settings,
+	model_name: Optional[str],
+	dimension: Optional[int] = None,
+) -> Tuple[FlatVectorIndex, Dict]:
+	"""Load the index in ``directory`` and check it against its manifest and the serving model.
+
+	Raises ValueError when the manifest names another model than ``model_name``,
+	when its dimension disagrees with the arrays or with ``dimension`` (the
+	encoder's), or when the row arrays and ids differ in length (a save that was
+	still in progress). The index is converted to the configured type.
+	"""
+	manifest = read_manifest(directory)
+	if not manifest:
+		raise FileNotFoundError(f"no index.json in {directory}")
+	index = load_index(directory, settings)
+	if model_name is not None and manifest.get("model") not in (None, model_name):
+		raise ValueError(
+			f"index was built with model '{manifest.get('model')}', serving '{model_name}'"
+		)
+	if int(manifest.get("dimension", index.dimension)) != index.dimension:
+		raise ValueError(
+			f"manifest dimension {manifest.get('dimension')} != array dimension {index.dimension}"
+		)
+	if dimension is not None and index.dimension != dimension:
+		raise ValueError(f"index dimension {index.dimension} != encoder dimension {dimension}")
+	assert index._sqnorms is not None
+	n = len(index._ids)
+	if index._sqnorms.shape[0] != n or manifest.get("count", n) != n:
+		raise ValueError("index rows and ids differ in length; was it saved while being read?")
+	if index.index_type != settings.index_type:
+		index = convert_index(index, settings)
+	# Build derived structures (IVF lists, codes, graph) here rather than on the first search
+	index._materialize()
+	return index, manifest
+
+
+class IndexDirWatcher:
+	"""Poll ``index_dir/index.json`` and call ``on_change`` when a new index was saved there."""
+
+	def __init__(
+		self, directory: Path, on_change: Callable[[], None], interval_s: float = 2.0
+	) -> None:
+		self.directory = directory
+		self.on_change = on_change
+		self.interval_s = max(float(interval_s), 0.01)
+		self._seen: Signature = manifest_signature(directory)
+		self._lock = threading.Lock()
+		self._stop = threading.Event()
+		self._thread = threading.Thread(target=self._run, name="index-dir-watcher", daemon=True)
+		self._thread.start()
+
+	def poll(self) -> bool:
+		"""Call ``on_change`` if the manifest changed since last seen; returns True if it did."""
+		signature = manifest_signature(self.directory)
+		with self._lock:
+			if signature is None or signature == self._seen:
+				return False
+			self._seen = signature
+		self.on_change()
+		return True
+
+	def _run(self) -> None:
+		while not self._stop.wait(self.interval_s):
+			try:
+				self.poll()
+			except Exception as e:  # keep serving the current index
+				logger.error("Index reload after change in %s failed: %s", self.directory, e)
+
+	def close(self) -> None:
+		self._stop.set()
+		self._thread.join(timeout=5.0)
@@ -0,0 +1,187 @@
+from __future__ import annotations
+
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Optional, Tuple, Union
+
+import numpy as np
+
+from .vector_db import FlatVectorIndex, Metric, scores_from_inner_products
+
+
+class ShardedVectorIndex(FlatVectorIndex):
+	"""Exact flat index whose scan is split into contiguous row shards.
+
+	- Each search scores ``shards`` row ranges in parallel on a thread pool
+		(NumPy releases the GIL inside the matmul) and keeps a top-k per shard
+	- Per-shard candidates are merged into the global top-k, so results are the
+		rows ``FlatVectorIndex`` returns (scores equal up to float32 rounding)
+	- Storage, tombstones and persistence are those of the flat index; small
+		indexes (< ``min_shard_rows`` rows per shard) are scanned in one piece
+	"""
+
+	index_type = "sharded"
+	min_shard_rows: int = 4096
+
+	def __init__(self, dimension: int, shards: int = 0, threads: int = 0) -> None:
+		super().__init__(dimension)
+		self._pool: Optional[ThreadPoolExecutor] = None
+		self._pool_lock = threading.Lock()
+		self.configure(shards, threads)
+
+	def configure(self, shards: int = 0, threads: int = 0) -> None:
+		"""Set the shard count and pool size (0 = CPU count); a running pool is replaced."""
+		with self._pool_lock:
+			self.threads: int = int(threads) or (os.cpu_count() or 1)
+			self.shards: int = int(shards) or self.threads
+			pool, self._pool = self._pool, None
+		if pool is not None:
+			pool.shutdown(wait=False)
+
+	@classmethod
+	def _create_for_load(cls, dimension: int, manifest: Dict) -> "ShardedVectorIndex":
+		params = manifest.get("sharded", {}) or {}
+		return cls(dimension, shards=int(params.get("shards", 0)))
+
+	def _executor(self) -> ThreadPoolExecutor:
+		if self._pool is None:
+			with self._pool_lock:
+				if self._pool is None:
+					self._pool = ThreadPoolExecutor(
+						max_workers=self.threads, thread_name_prefix="search-shard"
+					)
+		return self._pool
+
+	def _bounds(self, n: int) -> List[Tuple[int, int]]:
+		"""Contiguous ``[start, end)`` row ranges, at most ``shards`` of them."""
+		count = max(1, min(self.shards, n // max(self.min_shard_rows, 1)))
+		edges = np.linspace(0, n, count + 1).astype(np.int64)
+		return [(int(a), int(b)) for a, b in zip(edges[:-1], edges[1:]) if b > a]
+
+	def _map(self, fn: Callable[[int, int], Any], bounds: List[Tuple[int, int]]) -> list:
+		if len(bounds) == 1:
+			return [fn(*bounds[0])]
+		return list(self._executor().map(lambda ab: fn(*ab), bounds))
+
+	def _shard_scores(
+		self,
+		q: np.ndarray,
+		norm_q: Union[float, np.ndarray],
+		metric: Metric,
+		normalize_scores: bool,
+		rows: Tuple[np.ndarray, Optional[np.ndarray], np.ndarray],
+		deleted: Optional[np.ndarray],
+		start: int,
+		end: int,
+	) -> np.ndarray:
+		"""Scores of rows ``[start, end)``; ``q`` is ``(D,)`` or a ``(Q, D)`` batch."""
+		vectors, normed, sqnorms = rows
+		batch = q.ndim == 2
+		sq = sqnorms[None, start:end] if batch else sqnorms[start:end]
+		if metric == "cosine" and normed is not None:
+			cos = (q / (norm_q + 1e-12)) @ normed[start:end].T
+			scores = scores_from_inner_products(None, sq, norm_q, metric, normalize_scores, cos=cos)
+		else:
+			scores = scores_from_inner_products(
+				q @ vectors[start:end].T, sq, norm_q, metric, normalize_scores
+			)
+		if deleted is not None:
+			scores = np.where(deleted[start:end], -np.inf, scores)
+		return scores
+
+	@staticmethod
+	def _merge(rows: np.ndarray, scores: np.ndarray, k: int) -> Tuple[np.ndarray, np.ndarray]:
+		"""Global top-k of concatenated shard candidates, by score desc then row."""
+		keep = scores > -np.inf
+		rows, scores = rows[keep], scores[keep]
+		order = np.lexsort((rows, -scores))[:k]
+		return rows[order], scores[order]
+
+	def search(
+		self, query: np.ndarray, k: int, metric: Metric = "cosine", normalize_scores: bool = False
+	) -> List[Tuple[str, float, Dict]]:
+		self._materialize()
+		q, norm_q = self._prepare_query(query)
+		rows = self._rows()
+		n = rows[0].shape[0]
+		bounds = self._bounds(n)
+		if len(bounds) <= 1:
+			return super().search(query, k=k, metric=metric, normalize_scores=normalize_scores)
+		deleted = self._deleted_mask(n) if self._n_deleted else None
+
+		def shard_top(start: int, end: int) -> Tuple[np.ndarray, np.ndarray]:
+			scores = self._shard_scores(
+				q, norm_q, metric, normalize_scores, rows, deleted, start, end
+			)
+			idx = self._top_k(scores, k)
+			return idx + start, scores[idx]
+
+		parts = self._map(shard_top, bounds)
+		top_rows, top_scores = self._merge(
+			np.concatenate([p[0] for p in parts]), np.concatenate([p[1] for p in parts]), k
+		)
+		return [
+			(self._ids[i], float(s), self._metadatas[i])
+			for i, s in zip(top_rows.tolist(), top_scores.tolist())
+		]
+
+	def search_batch(
+		self,
+		queries: np.ndarray,
+		k: int,
+		metric: Metric = "cosine",
+		normalize_scores: bool = False,
+		max_chunk_bytes: int = 64 * 1024 * 1024,
+	) -> List[List[Tuple[str, float, Dict]]]:
+		self._materialize()
+		rows = self._rows()
+		n = rows[0].shape[0]
+		bounds = self._bounds(n)
+		if len(bounds) <= 1:
+			return super().search_batch(
+				queries,
+				k=k,
+				metric=metric,
+				normalize_scores=normalize_scores,
+				max_chunk_bytes=max_chunk_bytes,
+			)
+		Q = np.asarray(queries, dtype=np.float32)
+		if Q.ndim != 2:
+			raise ValueError("queries must be 2D")
+		if Q.shape[1] != self.dimension:
+			raise ValueError(f"query dim {Q.shape[1]} != index dim {self.dimension}")
+		norms_q = np.linalg.norm(Q, axis=1)
+		if np.any(norms_q == 0.0):
+			raise ValueError("zero query vector")
+		deleted = self._deleted_mask(n) if self._n_deleted else None
+
+		# Every shard scores a (chunk, shard rows) block; together they stay under max_chunk_bytes
+		chunk = max(1, int(max_chunk_bytes) // max(n * 4, 1))
+		out: List[List[Tuple[str, float, Dict]]] = []
+		for qs in range(0, Q.shape[0], chunk):
+			q = Q[qs:qs + chunk]
+			nq = norms_q[qs:qs + chunk, None]
+
+			def shard_top(
+				start: int, end: int, q: np.ndarray = q, nq: np.ndarray = nq
+			) -> Tuple[np.ndarray, np.ndarray]:
+				scores = self._shard_scores(
+					q, nq, metric, normalize_scores, rows, deleted, start, end
+				)
+				idx = self._top_k_rows(scores, k)
+				return idx + start, np.take_along_axis(scores, idx, axis=1)
+
+			parts = self._map(shard_top, bounds)
+			cand_rows = np.concatenate([p[0] for p in parts], axis=1)
+			cand_scores = np.concatenate([p[1] for p in parts], axis=1)
+			for r, s in zip(cand_rows, cand_scores):
+				top_rows, top_scores = self._merge(r, s, k)
+				out.append([
+					(self._ids[i], float(sc), self._metadatas[i])
+					for i, sc in zip(top_rows.tolist(), top_scores.tolist())
+				])
+		return out
+
+	def _extra_manifest(self) -> Dict:
+		return {"sharded": {"shards": self.shards}}
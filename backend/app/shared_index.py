@@ -0,0 +1,143 @@
+from __future__ import annotations
+
+import logging
+import os
+import shutil
+import threading
+from pathlib import Path
+from typing import Callable, List, Optional, Tuple
+
+from .config import Settings
+from .indexes import load_index
+from .vector_db import FlatVectorIndex, Metric
+
+logger = logging.getLogger(__name__)
+
+# Shared layout: <root>/gen-00000001/ ... one npy-layout index per generation,
+# <root>/CURRENT holds the number of the generation workers should serve.
+CURRENT_FILE = "CURRENT"
+
+
+def generation_dir(root: Path, generation: int) -> Path:
+	return root / f"gen-{generation:08d}"
+
+
+def read_generation(root: Path) -> Optional[int]:
+	"""Generation named by ``CURRENT``, or None if nothing was published yet."""
+	try:
+		return int((root / CURRENT_FILE).read_text(encoding="utf-8").strip())
+	except (FileNotFoundError, ValueError):
+		return None
+
+
+def publish_index(
+	index: FlatVectorIndex,
+	root: Path,
+	model_name: str,
+	default_metric: Metric,
+	keep: int = 2,
+) -> int:
+	"""Write ``index`` as the next generation under ``root`` and make it current.
+
+	Arrays are written in the npy layout, so every worker that loads the
+	generation memory-maps the same files and shares their pages (put ``root``
+	on a tmpfs such as /dev/shm to keep them in RAM). ``CURRENT`` is replaced
+	only after the generation is complete; the newest ``keep`` generations are
+	kept so workers still switching over can finish loading.
+	"""
+	root.mkdir(parents=True, exist_ok=True)
+	generation = max([read_generation(root) or 0, *_generations(root)]) + 1
+	target = generation_dir(root, generation)
+	staging = target.with_name(target.name + ".tmp")
+	shutil.rmtree(staging, ignore_errors=True)
+	index.save(staging, model_name=model_name, default_metric=default_metric, layout="npy")
+	os.replace(staging, target)
+	tmp_current = root / (CURRENT_FILE + ".tmp")
+	tmp_current.write_text(f"{generation}\n", encoding="utf-8")
+	os.replace(tmp_current, root / CURRENT_FILE)
+	# Workers that still map an unlinked generation keep valid pages until they switch
+	for old in _generations(root)[: -max(keep, 1)]:
+		shutil.rmtree(generation_dir(root, old), ignore_errors=True)
+	logger.info("Published index generation %d to %s", generation, root)
+	return generation
+
+
+def _generations(root: Path) -> List[int]:
+	gens: List[int] = []
+	for p in root.glob("gen-*"):
+		if p.is_dir() and not p.name.endswith(".tmp"):
+			try:
+				gens.append(int(p.name[len("gen-"):]))
+			except ValueError:
+				continue
+	return sorted(gens)
+
+
+def load_generation(
+	root: Path,
+	generation: Optional[int] = None,
+	settings: Optional[Settings] = None,
+) -> Tuple[FlatVectorIndex, int]:
+	"""Attach to the current (or the given) generation; arrays are memory-mapped read-only.
+
+	``settings`` supplies the search-time tunables, as for ``load_index``.
+	"""
+	if generation is None:
+		generation = read_generation(root)
+	if generation is None:
+		raise FileNotFoundError(f"no index generation published in {root}")
+	return load_index(generation_dir(root, generation), settings), generation
+
+
+class GenerationWatcher:
+	"""Poll ``CURRENT`` and hand each newly published generation to ``on_change``.
+
+	The callback receives the fully loaded index, so swapping a global
+	reference in it switches every later request over at once.
+	"""
+
+	def __init__(
+		self,
+		root: Path,
+		on_change: Callable[[FlatVectorIndex, int], None],
+		current: Optional[int] = None,
+		interval_s: float = 1.0,
+		settings: Optional[Settings] = None,
+	) -> None:
+		self.root = root
+		self.settings = settings
+		self.on_change = on_change
+		self.generation = current
+		self.interval_s = max(float(interval_s), 0.01)
+		self._stop = threading.Event()
+		self._thread = threading.Thread(
+			target=self._run, name="index-generation-watcher", daemon=True
+		)
+		self._thread.start()
+
+	def poll(self) -> bool:
+		"""Load and switch to a new generation if one was published; returns True on switch."""
+		generation = read_generation(self.root)
+		if generation is None or generation == self.generation:
+			return False
+		try:
+			index, generation = load_generation(self.root, generation, self.settings)
+		except (FileNotFoundError, ValueError) as e:
+			# Superseded and removed before we got to it; the next poll sees the newer one
+			logger.warning("Could not load index generation %s: %s", generation, e)
+			return False
+		previous, self.generation = self.generation, generation
+		self.on_change(index, generation)
+		logger.info("Switched index generation %s -> %d", previous, generation)
+		return True
+
+	def _run(self) -> None:
+		while not self._stop.wait(self.interval_s):
+			try:
+				self.poll()
+			except Exception as e:  # keep serving the current generation
+				logger.error("Index generation poll failed: %s", e)
+
+	def close(self) -> None:
+		self._stop.set()
+		self._thread.join(timeout=5.0)
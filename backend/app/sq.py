@@ -0,0 +1,93 @@
+from __future__ import annotations
+
+from typing import Dict, Literal, Optional
+
+import numpy as np
+
+from .quantized import QuantizedVectorIndex
+from .vector_db import FlatVectorIndex
+
+SQDtype = Literal["float16", "int8"]
+
+
+class SQVectorIndex(QuantizedVectorIndex):
+	"""Scalar-quantized index: every row stored as float16 or int8 instead of float32.
+
+	- float16 halves the scanned bytes; int8 quarters them, with a per-dimension
+		``scale``/``offset`` fitted to the value range on first use
+	- Scans decode one block of rows at a time, so no float32 copy of the corpus
+		is ever built; cosine comes from the inner products and float32 ``sqnorms``
+	- Re-ranking and ``vectors.npy`` persistence come from ``QuantizedVectorIndex``
+	"""
+
+	index_type = "sq"
+	scan_chunk_rows: int = 65536
+
+	def __init__(self, dimension: int, dtype: SQDtype = "int8", rerank: int = 0) -> None:
+		super().__init__(dimension, rerank=rerank)
+		if dtype not in ("float16", "int8"):
+			raise ValueError(f"unsupported sq dtype: {dtype}")
+		self.dtype: SQDtype = dtype
+		self._codes = np.empty((0, self.dimension), dtype=np.dtype(dtype))
+		# int8 only: x ~= codes * scale + offset, per dimension
+		self._scale: Optional[np.ndarray] = None
+		self._offset: Optional[np.ndarray] = None
+
+	@classmethod
+	def _create_for_load(cls, dimension: int, manifest: Dict) -> "SQVectorIndex":
+		params = manifest.get("sq", {}) or {}
+		return cls(dimension, dtype=params.get("dtype", "int8"))
+
+	@property
+	def trained(self) -> bool:
+		return self.dtype == "float16" or self._scale is not None
+
+	def train(self) -> None:
+		"""(Re)fit the int8 scale/offset on all stored vectors and re-encode."""
+		FlatVectorIndex._materialize(self)
+		vectors = self._all_vectors()
+		if vectors.shape[0] == 0:
+			raise ValueError("cannot train SQ index without vectors")
+		if self.dtype == "int8":
+			lo = np.min(vectors, axis=0).astype(np.float32)
+			hi = np.max(vectors, axis=0).astype(np.float32)
+			self._offset = (hi + lo) / 2.0
+			self._scale = np.maximum((hi - lo) / 254.0, 1e-12).astype(np.float32)
+		self._codes = self._encode(vectors)
+
+	def _encode(self, x: np.ndarray) -> np.ndarray:
+		x = np.asarray(x, dtype=np.float32)
+		if self.dtype == "float16":
+			return x.astype(np.float16)
+		assert self._scale is not None and self._offset is not None
+		# Rows added after training may fall outside the fitted range; clip them
+		codes: np.ndarray = np.clip(np.rint((x - self._offset) / self._scale), -127, 127)
+		return codes.astype(np.int8)
+
+	def _approx_inner_products(self, q: np.ndarray, codes: np.ndarray) -> np.ndarray:
+		"""``rows @ q`` computed from ``codes``, decoding ``scan_chunk_rows`` rows at a time."""
+		if self.dtype == "int8":
+			assert self._scale is not None and self._offset is not None
+			qs = (q * self._scale).astype(np.float32)
+			const = float(self._offset @ q)
+		else:
+			qs, const = q, 0.0
+		n = codes.shape[0]
+		out = np.empty((n,), dtype=np.float32)
+		for start in range(0, n, self.scan_chunk_rows):
+			block = codes[start:start + self.scan_chunk_rows].astype(np.float32)
+			out[start:start + block.shape[0]] = block @ qs
+		return out + const
+
+	def _quantizer_arrays(self) -> Dict[str, np.ndarray]:
+		if self._scale is None or self._offset is None:
+			return {}
+		return {"scale": self._scale, "offset": self._offset}
+
+	def _restore_quantizer(self, arrays: Dict[str, np.ndarray]) -> None:
+		if "scale" in arrays and "offset" in arrays:
+			self._scale = np.asarray(arrays["scale"], dtype=np.float32)
+			self._offset = np.asarray(arrays["offset"], dtype=np.float32)
+
+	def _extra_manifest(self) -> Dict:
+		return {"sq": {"dtype": self.dtype, "rerank": self.rerank}}
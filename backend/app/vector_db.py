@@ -1,14 +1,96 @@
 from __future__ import annotations
 
+import copy
 import json
+import os
+import threading
 from dataclasses import dataclass
 from datetime import datetime
 from pathlib import Path
-from typing import Dict, Iterable, List, Literal, Optional, Tuple
+from typing import (
+	Any,
+	Dict,
+	Iterable,
+	Iterator,
+	List,
+	Literal,
+	Optional,
+	Sequence,
+	Tuple,
+	Union,
+)
 
 import numpy as np
 
+from .bm25 import BM25Index
+from .filters import Condition, MetadataColumns
+from .metadata_store import (
+	ROWS_FORMAT,
+	IdLookup,
+	Rows,
+	copy_rows,
+	load_rows,
+	save_rows,
+	take_rows,
+)
+from .metrics import stage
+
 Metric = Literal["cosine", "dot", "euclidean"]
+# npz: one compressed data.npz, decompressed into memory on load
+# npy: one raw <name>.npy per array, memory-mapped read-only on load
+IndexLayout = Literal["npz", "npy"]
+
+
+def atomic_save_npy(path: Path, array: np.ndarray) -> None:
+	"""Write ``array`` as .npy via rename so live memmaps of the old file stay valid."""
+	tmp_path = path.with_name(path.name + ".tmp")
+	with tmp_path.open("wb") as f:
+		np.save(f, np.ascontiguousarray(array))
+	os.replace(tmp_path, path)
+
+
+def scores_from_inner_products(
+	ip: Optional[np.ndarray],
+	sqnorms: np.ndarray,
+	norm_q: Union[float, np.ndarray],
+	metric: Metric,
+	normalize_scores: bool,
+	cos: Optional[np.ndarray] = None,
+) -> np.ndarray:
+	"""Turn inner products ``rows @ q`` into ranking scores (higher is better).
+
+	``cos`` may be passed for cosine when it was computed directly from
+	normalized rows; otherwise it is derived from ``ip`` and the row norms.
+	For a batch, ``ip`` is ``(Q, N)``, ``sqnorms`` ``(1, N)`` and ``norm_q`` ``(Q, 1)``.
+	"""
+	scores: np.ndarray
+	if metric == "cosine":
+		if cos is None:
+			assert ip is not None
+			cos = ip / (np.sqrt(sqnorms) * (norm_q + 1e-12) + 1e-12)
+		scores = cos  # in [-1,1]
+		if normalize_scores:
+			scores = 0.5 * (scores + 1.0)  # -> [0,1]
+	elif metric == "dot":
+		assert ip is not None
+		scores = ip
+		if normalize_scores:
+			# convert to cosine-like by dividing by norms, then map to [0,1]
+			norms = np.sqrt(sqnorms) * (norm_q + 1e-12)
+			scores = 0.5 * (scores / (norms + 1e-12) + 1.0)
+	elif metric == "euclidean":
+		assert ip is not None
+		# lower distance is better
+		d2 = sqnorms + (norm_q**2) - 2.0 * ip
+		if normalize_scores:
+			# map distance to similarity [0,1]
+			scores = 1.0 / (1.0 + np.sqrt(np.maximum(d2, 0.0)))
+		else:
+			# use negative squared distance as score for ranking
+			scores = -d2
+	else:
+		raise ValueError(f"unknown metric: {metric}")
+	return scores
 
 
 @dataclass
@@ -22,25 +104,103 @@ class FlatVectorIndex:
 	"""Simple flat index for dense vectors.
 
 	- Insert and bulk insert records
+	- Upsert/delete by id: replaced and deleted rows are tombstoned and masked
+		out of search until ``compact`` rewrites the arrays without them
 	- Search top-k by cosine, dot, or euclidean distance
 	- Persist/Load to/from disk
+
+	Searches may run concurrently; writers (insert/upsert/delete/compact) must be
+	serialized by the caller.
 	"""
 
+	index_type: str = "flat"
+	# Subclasses with compact storage can skip the normalized copy; cosine is
+	# then derived from ``vectors`` and ``sqnorms``.
+	_store_normed: bool = True
+
 	def __init__(self, dimension: int) -> None:
 		self.dimension: int = int(dimension)
-		self._ids: List[str] = []
-		self._metadatas: List[Dict] = []
-		self._vectors_list: List[np.ndarray] = []
-		self._normed_list: List[np.ndarray] = []
-		self._sqnorm_list: List[float] = []
+		# Plain lists, or blob-backed columns after ``load`` (rows decoded on access)
+		self._ids: Rows[str] = []
+		self._metadatas: Rows[Dict] = []
 
+		# Row arrays; after inserts these are ``[:N]`` views of the buffers below
 		self._vectors: Optional[np.ndarray] = None
 		self._normed: Optional[np.ndarray] = None
 		self._sqnorms: Optional[np.ndarray] = None
-		self._dirty: bool = False
+		# Capacity-doubled append buffers (amortized O(1) inserts)
+		self._vectors_buf: Optional[np.ndarray] = None
+		self._normed_buf: Optional[np.ndarray] = None
+		self._sqnorms_buf: Optional[np.ndarray] = None
+		# Bumped on every mutation so caches of search results can tell they are stale
+		self.version: int = 0
+		# Tombstone bitmap (capacity-doubled; rows >= len(_ids) are unused)
+		self._deleted: np.ndarray = np.zeros((0,), dtype=bool)
+		self._n_deleted: int = 0
+		# id -> row of its live version; the persisted hash table after load, else built lazily
+		self._id_to_row: Optional[Union[Dict[str, int], IdLookup]] = None
+		# Columnar metadata for filtered search; built on first use, then kept in sync
+		self._columns: Optional[MetadataColumns] = None
+		# BM25 postings over metadata["text"]; persisted as bm25.npz, else built on first use
+		self._bm25: Optional[BM25Index] = None
+		self._lock = threading.RLock()
 
 	def size(self) -> int:
-		return len(self._ids)
+		"""Number of live (not deleted) records."""
+		return len(self._ids) - self._n_deleted
+
+	def tombstone_ratio(self) -> float:
+		return self._n_deleted / len(self._ids) if self._ids else 0.0
+
+	def _id_map(self) -> Union[Dict[str, int], IdLookup]:
+		if self._id_to_row is None:
+			self._id_to_row = {}
+			for row, record_id in enumerate(self._ids):
+				if not self._is_deleted(row):
+					self._id_to_row[record_id] = row
+		return self._id_to_row
+
+	def _is_deleted(self, row: int) -> bool:
+		return row < self._deleted.shape[0] and bool(self._deleted[row])
+
+	def __contains__(self, record_id: object) -> bool:
+		return record_id in self._id_map()
+
+	def iter_records(
+		self, start: int = 0, stop: Optional[int] = None
+	) -> Iterator[Tuple[str, Dict]]:
+		"""Yield ``(id, metadata)`` of live records in row order (only rows ``[start, stop)``)."""
+		if start == 0 and stop is None:
+			for row, (record_id, metadata) in enumerate(zip(self._ids, self._metadatas)):
+				if not self._is_deleted(row):
+					yield record_id, metadata
+			return
+		stop = len(self._ids) if stop is None else min(stop, len(self._ids))
+		for row in range(start, stop):
+			if not self._is_deleted(row):
+				yield self._ids[row], self._metadatas[row]
+
+	def skip_live(self, start: int, count: int, chunk_rows: int = 65536) -> int:
+		"""Row just past the first ``count`` live rows at or after ``start`` (or the row count).
+
+		Scans the tombstone bitmap a chunk at a time, so paging never builds an
+		array over all rows.
+		"""
+		n = len(self._ids)
+		if self._n_deleted == 0:
+			return min(start + count, n)
+		row = start
+		while row < n and count > 0:
+			stop = min(row + chunk_rows, n)
+			deleted = np.zeros((stop - row,), dtype=bool)
+			m = max(0, min(stop, self._deleted.shape[0]) - row)
+			deleted[:m] = self._deleted[row:row + m]
+			live = np.flatnonzero(~deleted)
+			if live.shape[0] >= count:
+				return row + int(live[count - 1]) + 1
+			count -= live.shape[0]
+			row = stop
+		return min(row, n)
 
 	@staticmethod
 	def _as_f32(vector: np.ndarray) -> np.ndarray:
@@ -53,34 +213,249 @@ class FlatVectorIndex:
 		v = self._as_f32(vector)
 		if v.shape[0] != self.dimension:
 			raise ValueError(f"vector dim {v.shape[0]} != index dim {self.dimension}")
-		norm = np.linalg.norm(v)
-		if norm == 0.0:
+		self._append_rows([record_id], [metadata], v[None, :])
+
+	def bulk_insert(
+		self,
+		records: Union[Iterable[VectorRecord], Sequence[str]],
+		vectors: Optional[np.ndarray] = None,
+		metadatas: Optional[Sequence[Dict]] = None,
+	) -> None:
+		"""Insert many rows with one vectorized normalization pass.
+
+		Either ``bulk_insert(records)`` with ``VectorRecord`` items, or
+		``bulk_insert(ids, vectors, metadatas)`` with a ``(N, D)`` array.
+		"""
+		if vectors is None:
+			recs: List[VectorRecord] = list(records)  # type: ignore[arg-type]
+			if not recs:
+				return
+			ids = [r.id for r in recs]
+			metas = [r.metadata for r in recs]
+			vectors = np.stack([self._as_f32(r.vector) for r in recs])
+		else:
+			ids = list(records)  # type: ignore[arg-type]
+			metas = list(metadatas) if metadatas is not None else [{} for _ in ids]
+		V = np.asarray(vectors, dtype=np.float32)
+		if V.ndim != 2:
+			raise ValueError("vectors must be 2D")
+		if V.shape[1] != self.dimension:
+			raise ValueError(f"vector dim {V.shape[1]} != index dim {self.dimension}")
+		if not (len(ids) == len(metas) == V.shape[0]):
+			raise ValueError("ids, vectors and metadatas differ in length")
+		if V.shape[0]:
+			self._append_rows(ids, metas, V)
+
+	def _reserve(self, rows: int) -> None:
+		"""Make room for ``rows`` more rows, doubling the buffers when they are full.
+
+		Rows already held outside the buffers (loaded memmaps, adopted or
+		compacted arrays, buffers shared with a clone) are copied in once here.
+		"""
+		n = len(self._ids)
+		need = n + rows
+		buf = self._vectors_buf
+		if (
+			buf is not None
+			and buf.shape[0] >= need
+			and self._vectors is not None
+			and self._vectors.base is buf
+		):
+			return
+		cap = max(need, 2 * n, 16)
+		vectors_buf = np.empty((cap, self.dimension), dtype=np.float32)
+		sqnorms_buf = np.empty((cap,), dtype=np.float32)
+		if self._vectors is not None and self._sqnorms is not None:
+			vectors_buf[:n] = self._vectors[:n]
+			sqnorms_buf[:n] = self._sqnorms[:n]
+		self._vectors_buf, self._sqnorms_buf = vectors_buf, sqnorms_buf
+		if self._store_normed:
+			normed_buf = np.empty((cap, self.dimension), dtype=np.float32)
+			if self._normed is not None:
+				normed_buf[:n] = self._normed[:n]
+			elif self._vectors is not None:
+				normed_buf[:n] = vectors_buf[:n] / (np.sqrt(sqnorms_buf[:n])[:, None] + 1e-12)
+			self._normed_buf = normed_buf
+		self._publish(n)
+
+	def _publish(self, n: int) -> None:
+		"""Point the row arrays at the first ``n`` buffered rows."""
+		assert self._vectors_buf is not None and self._sqnorms_buf is not None
+		self._vectors = self._vectors_buf[:n]
+		self._sqnorms = self._sqnorms_buf[:n]
+		if self._store_normed:
+			assert self._normed_buf is not None
+			self._normed = self._normed_buf[:n]
+
+	def _append_rows(self, ids: List[str], metadatas: List[Dict], vectors: np.ndarray) -> None:
+		"""Append a validated ``(M, D)`` float32 block; norms are computed in one pass."""
+		norms = np.linalg.norm(vectors, axis=1)
+		if np.any(norms == 0.0):
 			raise ValueError("zero vector cannot be inserted")
-		nv = v / (norm + 1e-12)
-		self._ids.append(record_id)
-		self._metadatas.append(metadata)
-		self._vectors_list.append(v)
-		self._normed_list.append(nv)
-		self._sqnorm_list.append(float(norm**2))
-		self._dirty = True
-
-	def bulk_insert(self, records: Iterable[VectorRecord]) -> None:
-		for rec in records:
-			self.insert(rec.id, rec.vector, rec.metadata)
+		with self._lock:
+			self._reserve(vectors.shape[0])
+			start = len(self._ids)
+			end = start + vectors.shape[0]
+			# Rows past the published views are invisible to concurrent searches until _publish
+			self._write_rows(start, vectors, norms)
+			if self._id_to_row is not None:
+				for i, record_id in enumerate(ids):
+					self._id_to_row[record_id] = start + i
+			self._ids.extend(ids)
+			self._metadatas.extend(metadatas)
+			if self._columns is not None:
+				self._columns.extend(metadatas)
+			if self._bm25 is not None:
+				self._bm25.add(m.get("text", "") for m in metadatas)
+			self._publish(end)
+			self.version += 1
+
+	def _write_rows(self, start: int, vectors: np.ndarray, norms: np.ndarray) -> None:
+		"""Write rows ``start, start + 1, ...`` into the buffers reserved for them."""
+		assert self._vectors_buf is not None and self._sqnorms_buf is not None
+		end = start + vectors.shape[0]
+		self._vectors_buf[start:end] = vectors
+		self._sqnorms_buf[start:end] = norms**2
+		if self._store_normed:
+			assert self._normed_buf is not None
+			self._normed_buf[start:end] = vectors / (norms[:, None] + 1e-12)
+
+	def _tombstone(self, row: int) -> None:
+		if row >= self._deleted.shape[0]:
+			grown = np.zeros((max(row + 1, 2 * self._deleted.shape[0], 16),), dtype=bool)
+			grown[: self._deleted.shape[0]] = self._deleted
+			self._deleted = grown
+		if not self._deleted[row]:
+			self._deleted[row] = True
+			self._n_deleted += 1
+
+	def upsert(self, record_id: str, vector: np.ndarray, metadata: Dict) -> None:
+		"""Insert ``record_id``, tombstoning its previous row if it exists."""
+		with self._lock:
+			previous = self._id_map().get(record_id)
+			self.insert(record_id, vector, metadata)
+			if previous is not None:
+				self._tombstone(previous)
+
+	def delete(self, record_id: str) -> bool:
+		"""Tombstone ``record_id``; returns False if it is not in the index."""
+		with self._lock:
+			row = self._id_map().pop(record_id, None)
+			if row is None:
+				return False
+			self._tombstone(row)
+			self.version += 1
+			return True
+
+	def clone(self) -> "FlatVectorIndex":
+		"""Shallow copy sharing the row arrays; ``compact`` on it leaves ``self`` untouched."""
+		with self._lock:
+			other = copy.copy(self)
+			other._ids = copy_rows(self._ids)
+			other._metadatas = copy_rows(self._metadatas)
+			# Both sides may append; the clone copies into its own buffers on first insert
+			other._vectors_buf = other._normed_buf = other._sqnorms_buf = None
+			other._deleted = self._deleted.copy()
+			other._id_to_row = self._id_to_row.copy() if self._id_to_row is not None else None
+			other._columns = None
+			other._bm25 = None
+			other._lock = threading.RLock()
+			return other
+
+	def compact(self) -> int:
+		"""Rewrite the arrays without tombstoned rows; returns the number of rows dropped.
+
+		New arrays are allocated rather than filtered in place, so clones that
+		share the old arrays keep serving searches while this runs.
+		"""
+		with self._lock:
+			FlatVectorIndex._materialize(self)
+			assert self._sqnorms is not None
+			dropped = self._n_deleted
+			if dropped == 0:
+				return 0
+			n = len(self._ids)
+			keep = np.ones((n,), dtype=bool)
+			keep[: min(n, self._deleted.shape[0])] = ~self._deleted[:n]
+			rows = np.flatnonzero(keep)
+			self._vectors = self._vector_rows(rows)
+			if self._normed is not None:
+				self._normed = self._normed[rows]
+			self._sqnorms = self._sqnorms[rows]
+			self._ids = take_rows(self._ids, rows)
+			self._metadatas = take_rows(self._metadatas, rows)
+			self._deleted = np.zeros((0,), dtype=bool)
+			self._n_deleted = 0
+			self._id_to_row = None
+			self._columns = None
+			self._bm25 = None
+			self._compact_extra(keep)
+			self.version += 1
+			self._materialize()
+			return dropped
+
+	def _compact_extra(self, keep: np.ndarray) -> None:
+		"""Drop subclass per-row state for rows where ``keep`` is False."""
+
+	def _apply_tombstones(
+		self, scores: np.ndarray, rows: Optional[np.ndarray] = None
+	) -> np.ndarray:
+		"""Set scores of deleted rows to -inf (``scores`` is over all rows or over ``rows``)."""
+		if self._n_deleted == 0:
+			return scores
+		if rows is None:
+			deleted = self._deleted_mask(scores.shape[-1])
+		else:
+			deleted = self._deleted_mask(len(self._ids))[rows]
+		return np.where(deleted, -np.inf, scores)
+
+	def _deleted_mask(self, n: int) -> np.ndarray:
+		mask = np.zeros((n,), dtype=bool)
+		m = min(n, self._deleted.shape[0])
+		mask[:m] = self._deleted[:m]
+		return mask
 
 	def _materialize(self) -> None:
-		if not self._dirty and self._vectors is not None:
-			return
-		if not self._vectors_list:
-			self._vectors = np.empty((0, self.dimension), dtype=np.float32)
-			self._normed = np.empty((0, self.dimension), dtype=np.float32)
-			self._sqnorms = np.empty((0,), dtype=np.float32)
-			self._dirty = False
+		"""Ensure the row arrays exist; subclasses also bring their structures up to date.
+
+		Rows are written in place on insert, so this never rebuilds the matrix.
+		"""
+		if self._vectors is not None and (self._normed is not None or not self._store_normed):
 			return
-		self._vectors = np.vstack(self._vectors_list).astype(np.float32, copy=False)
-		self._normed = np.vstack(self._normed_list).astype(np.float32, copy=False)
-		self._sqnorms = np.asarray(self._sqnorm_list, dtype=np.float32)
-		self._dirty = False
+		with self._lock:
+			if self._vectors is None or self._sqnorms is None:
+				self._vectors = np.empty((0, self.dimension), dtype=np.float32)
+				self._sqnorms = np.empty((0,), dtype=np.float32)
+			if self._store_normed and self._normed is None:
+				self._normed = self._vectors / (np.sqrt(self._sqnorms)[:, None] + 1e-12)
+
+	def _rows(self) -> Tuple[np.ndarray, Optional[np.ndarray], np.ndarray]:
+		"""``(vectors, normed, sqnorms)`` trimmed to a common length.
+
+		A concurrent insert republishes the views one by one; trimming keeps a
+		search consistent without taking the lock.
+		"""
+		vectors, normed, sqnorms = self._vectors, self._normed, self._sqnorms
+		assert vectors is not None and sqnorms is not None
+		n = min(
+			vectors.shape[0],
+			sqnorms.shape[0],
+			normed.shape[0] if normed is not None else vectors.shape[0],
+		)
+		return vectors[:n], normed[:n] if normed is not None else None, sqnorms[:n]
+
+	def _row_count(self) -> int:
+		"""Rows a search sees (the common length of ``_rows``)."""
+		return int(self._rows()[2].shape[0])
+
+	def _vector_rows(self, rows: np.ndarray) -> np.ndarray:
+		"""float32 vectors of ``rows``."""
+		picked: np.ndarray = self._rows()[0][rows]
+		return picked
+
+	def _all_vectors(self) -> np.ndarray:
+		"""float32 vectors of every row, in row order (possibly a memmap)."""
+		return self._rows()[0]
 
 	def _top_k(self, scores: np.ndarray, k: int) -> np.ndarray:
 		k = min(k, scores.size)
@@ -89,69 +464,327 @@ class FlatVectorIndex:
 		idx = np.argpartition(scores, -k)[-k:]
 		# sort selected indices by score desc
 		order = np.argsort(scores[idx])[::-1]
-		return idx[order]
+		idx = idx[order]
+		# tombstoned rows score -inf; never return them even if fewer than k remain
+		live: np.ndarray = idx[scores[idx] > -np.inf]
+		return live
 
-	def search(self, query: np.ndarray, k: int, metric: Metric = "cosine", normalize_scores: bool = False) -> List[Tuple[str, float, Dict]]:
-		self._materialize()
-		assert self._vectors is not None and self._normed is not None and self._sqnorms is not None
+	def _prepare_query(self, query: np.ndarray) -> Tuple[np.ndarray, float]:
 		q = self._as_f32(query)
 		if q.shape[0] != self.dimension:
 			raise ValueError(f"query dim {q.shape[0]} != index dim {self.dimension}")
-		norm_q = np.linalg.norm(q)
+		norm_q = float(np.linalg.norm(q))
 		if norm_q == 0.0:
 			raise ValueError("zero query vector")
+		return q, norm_q
+
+	def _scores(
+		self,
+		q: np.ndarray,
+		norm_q: float,
+		metric: Metric,
+		normalize_scores: bool,
+		rows: Optional[np.ndarray] = None,
+		mask_deleted: bool = True,
+	) -> np.ndarray:
+		"""Score ``q`` against all rows, or only ``rows`` when given (higher is better).
 
-		if metric == "cosine":
+		Deleted rows score -inf unless ``mask_deleted`` is False.
+		"""
+		all_vectors, all_normed, all_sqnorms = self._rows()
+		sqnorms = all_sqnorms if rows is None else all_sqnorms[rows]
+		if metric == "cosine" and all_normed is not None:
+			normed = all_normed if rows is None else all_normed[rows]
 			qn = q / (norm_q + 1e-12)
-			scores = self._normed @ qn  # in [-1,1]
-			if normalize_scores:
-				scores = 0.5 * (scores + 1.0)  # -> [0,1]
-		elif metric == "dot":
-			scores = self._vectors @ q
-			if normalize_scores:
-				# convert to cosine-like by dividing by norms, then map to [0,1]
-				norms = np.sqrt(self._sqnorms) * (norm_q + 1e-12)
-				cos = scores / (norms + 1e-12)
-				scores = 0.5 * (cos + 1.0)
-		elif metric == "euclidean":
-			# lower distance is better
-			d2 = self._sqnorms + (norm_q**2) - 2.0 * (self._vectors @ q)
-			if normalize_scores:
-				# map distance to similarity [0,1]
-				scores = 1.0 / (1.0 + np.sqrt(np.maximum(d2, 0.0)))
-			else:
-				# use negative squared distance as score for ranking
-				scores = -d2
+			scores = scores_from_inner_products(
+				None, sqnorms, norm_q, metric, normalize_scores, cos=normed @ qn
+			)
 		else:
-			raise ValueError(f"unknown metric: {metric}")
+			vectors = all_vectors if rows is None else all_vectors[rows]
+			scores = scores_from_inner_products(
+				vectors @ q, sqnorms, norm_q, metric, normalize_scores
+			)
+		return self._apply_tombstones(scores, rows) if mask_deleted else scores
 
-		idx = self._top_k(scores, k)
+	def search(
+		self, query: np.ndarray, k: int, metric: Metric = "cosine", normalize_scores: bool = False
+	) -> List[Tuple[str, float, Dict]]:
+		self._materialize()
+		q, norm_q = self._prepare_query(query)
+		with stage("score"):
+			scores = self._scores(q, norm_q, metric, normalize_scores)
+		with stage("topk"):
+			idx = self._top_k(scores, k)
 		return [
 			(self._ids[i], float(scores[i]), self._metadatas[i])
 			for i in idx
 		]
 
-	def save(self, directory: Path, model_name: str, default_metric: Metric) -> None:
-		directory.mkdir(parents=True, exist_ok=True)
+	def metadata_columns(self) -> MetadataColumns:
+		"""Columnar metadata of all rows, built on first call and extended on insert."""
+		if self._columns is None:
+			with self._lock:
+				if self._columns is None:
+					self._columns = MetadataColumns.from_metadatas(self._metadatas)
+		return self._columns
+
+	def lexical_index(self) -> BM25Index:
+		"""BM25 index over every row's text, built on first call and extended on insert."""
+		if self._bm25 is None:
+			with self._lock:
+				if self._bm25 is None:
+					self._bm25 = BM25Index.from_texts(m.get("text", "") for m in self._metadatas)
+		return self._bm25
+
+	def search_lexical(
+		self,
+		query: str,
+		k: int,
+		conditions: Optional[List[Condition]] = None,
+	) -> List[Tuple[str, float, Dict]]:
+		"""Top-k live rows by BM25 score; rows sharing no term with ``query`` are never returned."""
+		n = len(self._ids)
+		scores = self.lexical_index().score(query, n)
+		allowed = scores > 0.0
+		if conditions:
+			allowed &= self.metadata_columns().mask(conditions, n)
+		if self._n_deleted:
+			allowed &= ~self._deleted_mask(n)
+		scores = np.where(allowed, scores, -np.inf)
+		idx = self._top_k(scores, k)
+		return [(self._ids[i], float(scores[i]), self._metadatas[i]) for i in idx]
+
+	def search_filtered(
+		self,
+		query: np.ndarray,
+		k: int,
+		conditions: List[Condition],
+		metric: Metric = "cosine",
+		normalize_scores: bool = False,
+	) -> List[Tuple[str, float, Dict]]:
+		"""Exact top-k among live rows whose metadata matches every condition.
+
+		The filter mask is applied before top-k selection, so up to ``k`` hits
+		come back however selective the filter is. Approximate subclasses use
+		this too: the scan runs over their float32 rows, restricted to matches.
+		"""
+		self._materialize()
+		q, norm_q = self._prepare_query(query)
+		n = self._row_count()
+		allowed = self.metadata_columns().mask(conditions, n)
+		if self._n_deleted:
+			allowed &= ~self._deleted_mask(n)
+		rows = np.flatnonzero(allowed)
+		if rows.size * 4 >= n:
+			# Dense filter: one masked scan beats gathering most of the matrix
+			scores = np.where(
+				allowed,
+				self._scores(q, norm_q, metric, normalize_scores, mask_deleted=False),
+				-np.inf,
+			)
+			idx = self._top_k(scores, k)
+			return [(self._ids[i], float(scores[i]), self._metadatas[i]) for i in idx]
+		scores = self._scores(q, norm_q, metric, normalize_scores, rows=rows, mask_deleted=False)
+		idx = self._top_k(scores, k)
+		return [(self._ids[rows[i]], float(scores[i]), self._metadatas[rows[i]]) for i in idx]
+
+	@staticmethod
+	def _top_k_rows(scores: np.ndarray, k: int) -> np.ndarray:
+		"""Row-wise ``_top_k`` over a 2-D ``(Q, N)`` score matrix; returns ``(Q, k)`` columns."""
+		k = min(k, scores.shape[1])
+		if k <= 0:
+			return np.empty((scores.shape[0], 0), dtype=np.int64)
+		part = np.argpartition(scores, -k, axis=1)[:, -k:]
+		order = np.argsort(np.take_along_axis(scores, part, axis=1), axis=1)[:, ::-1]
+		return np.take_along_axis(part, order, axis=1)
+
+	def _search_each(
+		self, queries: np.ndarray, k: int, **kwargs: Any
+	) -> List[List[Tuple[str, float, Dict]]]:
+		"""``search`` once per row of ``queries``, for ``search_batch`` of approximate indexes.
+
+		IVF probes, HNSW beams and quantized re-ranking score a different candidate
+		set for every query, so there is no shared ``(Q, N)`` score matrix to batch.
+		"""
+		return [self.search(q, k=k, **kwargs) for q in np.asarray(queries, dtype=np.float32)]
+
+	def search_batch(
+		self,
+		queries: np.ndarray,
+		k: int,
+		metric: Metric = "cosine",
+		normalize_scores: bool = False,
+		max_chunk_bytes: int = 64 * 1024 * 1024,
+	) -> List[List[Tuple[str, float, Dict]]]:
+		"""Search a ``(Q, D)`` batch with one matrix product per chunk of queries.
+
+		Queries are processed in chunks so the ``(chunk, N)`` float32 score matrix
+		stays under ``max_chunk_bytes``.
+		"""
 		self._materialize()
-		assert self._vectors is not None and self._normed is not None and self._sqnorms is not None
-		(np.savez_compressed)(
-			str(directory / "data.npz"),
-			vectors=self._vectors,
-			normed=self._normed,
-			sqnorms=self._sqnorms,
+		vectors, normed, all_sqnorms = self._rows()
+		Q = np.asarray(queries, dtype=np.float32)
+		if Q.ndim != 2:
+			raise ValueError("queries must be 2D")
+		if Q.shape[1] != self.dimension:
+			raise ValueError(f"query dim {Q.shape[1]} != index dim {self.dimension}")
+		norms_q = np.linalg.norm(Q, axis=1)
+		if np.any(norms_q == 0.0):
+			raise ValueError("zero query vector")
+
+		n = vectors.shape[0]
+		chunk = max(1, int(max_chunk_bytes) // max(n * 4, 1))
+		sqnorms = all_sqnorms[None, :]
+		out: List[List[Tuple[str, float, Dict]]] = []
+		for start in range(0, Q.shape[0], chunk):
+			q = Q[start:start + chunk]
+			nq = norms_q[start:start + chunk, None]
+			if metric == "cosine" and normed is not None:
+				cos = (q / (nq + 1e-12)) @ normed.T
+				scores = scores_from_inner_products(
+					None, sqnorms, nq, metric, normalize_scores, cos=cos
+				)
+			else:
+				scores = scores_from_inner_products(
+					q @ vectors.T, sqnorms, nq, metric, normalize_scores
+				)
+			scores = self._apply_tombstones(scores)
+			top = self._top_k_rows(scores, k)
+			top_scores = np.take_along_axis(scores, top, axis=1)
+			for rows, row_scores in zip(top.tolist(), top_scores.tolist()):
+				out.append([
+					(self._ids[i], s, self._metadatas[i])
+					for i, s in zip(rows, row_scores)
+					if s > -np.inf
+				])
+		return out
+
+	def _persisted_arrays(self) -> Dict[str, np.ndarray]:
+		"""Arrays written to data.npz: the dense rows plus any subclass extras."""
+		assert self._vectors is not None and self._sqnorms is not None
+		arrays = {"vectors": self._vectors, "sqnorms": self._sqnorms}
+		if self._normed is not None:
+			arrays["normed"] = self._normed
+		if self._n_deleted:
+			arrays["deleted"] = self._deleted_mask(len(self._ids))
+		return {**arrays, **self._extra_arrays()}
+
+	def _extra_arrays(self) -> Dict[str, np.ndarray]:
+		"""Additional arrays persisted in data.npz by index subclasses."""
+		return {}
+
+	def _extra_manifest(self) -> Dict:
+		"""Additional manifest fields persisted in index.json by index subclasses."""
+		return {}
+
+	def _restore_extra(
+		self, arrays: Dict[str, np.ndarray], manifest: Dict, directory: Path
+	) -> None:
+		"""Restore subclass state from the arrays and manifest written by ``save``."""
+
+	@classmethod
+	def _create_for_load(cls, dimension: int, manifest: Dict) -> "FlatVectorIndex":
+		"""Construct an empty instance for ``load``; subclasses read ctor args from the manifest."""
+		return cls(dimension=dimension)
+
+	def _copy_from(self, other: "FlatVectorIndex") -> None:
+		"""Adopt the rows of another index without re-inserting them one by one."""
+		other._materialize()
+		assert other._sqnorms is not None
+		self._adopt_rows(
+			copy_rows(other._ids),
+			copy_rows(other._metadatas),
+			other._all_vectors(),
+			other._sqnorms,
+			other._normed,
 		)
+
+	def _adopt_rows(
+		self,
+		ids: Rows[str],
+		metadatas: Rows[Dict],
+		vectors: np.ndarray,
+		sqnorms: np.ndarray,
+		normed: Optional[np.ndarray] = None,
+	) -> None:
+		"""Take prebuilt row arrays (possibly memmaps) as this empty index's rows, uncopied."""
+		if self._ids:
+			raise ValueError("can only adopt rows into an empty index")
+		if vectors.ndim != 2 or vectors.shape[1] != self.dimension:
+			raise ValueError(f"vectors must have shape (N, {self.dimension})")
+		if not (len(ids) == len(metadatas) == vectors.shape[0] == sqnorms.shape[0]):
+			raise ValueError("ids, metadatas and row arrays differ in length")
+		if np.any(sqnorms == 0.0):
+			raise ValueError("zero vector cannot be inserted")
+		with self._lock:
+			self._ids = ids
+			self._metadatas = metadatas
+			self._vectors = vectors
+			self._sqnorms = sqnorms
+			self._normed = normed if self._store_normed else None
+			if self._store_normed and self._normed is None:
+				self._normed = vectors / (np.sqrt(sqnorms)[:, None] + 1e-12)
+			self._vectors_buf = self._normed_buf = self._sqnorms_buf = None
+			self._id_to_row = None
+			self._columns = None
+			self._bm25 = None
+			self.version += 1
+
+	def save(
+		self, directory: Path, model_name: str, default_metric: Metric, layout: IndexLayout = "npz"
+	) -> None:
+		directory.mkdir(parents=True, exist_ok=True)
+		self._materialize()
+		arrays = self._persisted_arrays()
+		if layout == "npy":
+			for name, array in arrays.items():
+				atomic_save_npy(directory / f"{name}.npy", array)
+		elif layout == "npz":
+			# Via rename, so a reload never reads a half-written archive
+			tmp_path = directory / "data.tmp.npz"
+			np.savez_compressed(str(tmp_path), **arrays)
+			os.replace(tmp_path, directory / "data.npz")
+		else:
+			raise ValueError(f"unknown index layout: {layout}")
+		# BM25 is built lazily on the first lexical search; an unbuilt one is not built
+		# just to be saved, and an older bm25.npz would no longer match these rows
+		bm25 = self._bm25
+		if bm25 is not None:
+			bm25.save(directory / "bm25.npz")
+		else:
+			(directory / "bm25.npz").unlink(missing_ok=True)
+		save_rows(directory, self._ids, self._metadatas, self._deleted_mask(len(self._ids)))
 		index_json = {
 			"version": 1,
+			"index_type": self.index_type,
+			"format": layout,
+			"arrays": sorted(arrays),
 			"dimension": self.dimension,
 			"model": model_name,
 			"default_metric": default_metric,
 			"created_at": datetime.utcnow().isoformat() + "Z",
-			"ids": self._ids,
-			"metadatas": self._metadatas,
+			"rows": ROWS_FORMAT,
+			"count": len(self._ids),
+			**self._extra_manifest(),
 		}
-		with (directory / "index.json").open("w", encoding="utf-8") as f:
+		# Manifest last: readers only see the new arrays once it is replaced
+		tmp_path = directory / "index.json.tmp"
+		with tmp_path.open("w", encoding="utf-8") as f:
 			json.dump(index_json, f, ensure_ascii=False)
+		os.replace(tmp_path, directory / "index.json")
+
+	@staticmethod
+	def _load_arrays(directory: Path, manifest: Dict) -> Dict[str, np.ndarray]:
+		if manifest.get("format", "npz") == "npy":
+			return {
+				name: np.load(str(directory / f"{name}.npy"), mmap_mode="r")
+				for name in manifest.get("arrays", [])
+			}
+		data_path = directory / "data.npz"
+		if not data_path.exists():
+			raise FileNotFoundError("data.npz is missing")
+		with np.load(str(data_path)) as z:
+			return {name: z[name] for name in z.files}
 
 	@classmethod
 	def load(cls, directory: Path) -> "FlatVectorIndex":
@@ -162,20 +795,22 @@ class FlatVectorIndex:
 		meta_path = directory / "metadatas.json"
 		man_path = directory / "manifest.json"
 
-		if not data_path.exists():
+		if not data_path.exists() and not index_path.exists():
 			raise FileNotFoundError("data.npz is missing")
 
-		with np.load(str(data_path)) as z:
-			vectors = z["vectors"].astype(np.float32, copy=False)
-			normed = z["normed"].astype(np.float32, copy=False)
-			sqnorms = z["sqnorms"].astype(np.float32, copy=False)
-
+		ids: Rows[str]
+		metadatas: Rows[Dict]
+		lookup: Optional[IdLookup] = None
 		# Prefer new single JSON manifest
 		if index_path.exists():
 			with index_path.open("r", encoding="utf-8") as f:
 				idx_json = json.load(f)
-			ids: List[str] = idx_json.get("ids", [])
-			metadatas: List[Dict] = idx_json.get("metadatas", [])
+			if idx_json.get("rows") == ROWS_FORMAT:
+				ids, metadatas, lookup = load_rows(directory)
+			else:
+				# Manifests written before the columnar row files carry the rows inline
+				ids = idx_json.pop("ids", [])
+				metadatas = idx_json.pop("metadatas", [])
 		else:
 			# Older layout: separate files
 			if not (ids_path.exists() and meta_path.exists() and man_path.exists()):
@@ -184,17 +819,41 @@ class FlatVectorIndex:
 				ids = json.load(f)
 			with meta_path.open("r", encoding="utf-8") as f:
 				metadatas = json.load(f)
+			with man_path.open("r", encoding="utf-8") as f:
+				idx_json = json.load(f)
 
-		if vectors.ndim != 2:
-			raise ValueError("vectors must be 2D")
-		idx = cls(dimension=vectors.shape[1])
+		arrays = cls._load_arrays(directory, idx_json)
+		vectors = arrays.pop("vectors", None)
+		normed = arrays.pop("normed", None)
+		sqnorms = arrays.pop("sqnorms").astype(np.float32, copy=False)
+		deleted = arrays.pop("deleted", None)
+		if vectors is not None:
+			vectors = vectors.astype(np.float32, copy=False)
+			if vectors.ndim != 2:
+				raise ValueError("vectors must be 2D")
+			dimension = int(vectors.shape[1])
+		else:
+			# Subclasses may keep the dense rows outside data.npz
+			dimension = int(idx_json["dimension"])
+		idx = cls._create_for_load(dimension, idx_json)
 		idx._vectors = vectors
-		idx._normed = normed
+		idx._normed = (
+			normed.astype(np.float32, copy=False)
+			if normed is not None and idx._store_normed
+			else None
+		)
 		idx._sqnorms = sqnorms
 		idx._ids = ids
 		idx._metadatas = metadatas
-		idx._vectors_list = []
-		idx._normed_list = []
-		idx._sqnorm_list = []
-		idx._dirty = False
+		if deleted is not None:
+			idx._deleted = np.array(deleted, dtype=bool)
+			idx._n_deleted = int(idx._deleted.sum())
+		idx._id_to_row = lookup
+		idx._restore_extra(arrays, idx_json, directory)
+		bm25_path = directory / "bm25.npz"
+		if bm25_path.exists():
+			bm25 = BM25Index.load(bm25_path)
+			# Stale when the rows were rewritten by something that did not update bm25.npz
+			if bm25.n_docs == len(ids):
+				idx._bm25 = bm25
 		return idx
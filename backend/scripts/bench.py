@@ -1,26 +1,711 @@
+"""Benchmark suite for the vector search service.
+
+Subcommands (results are printed as a table; ``--json PATH`` also writes them
+as JSON, ``--json -`` to stdout, so runs can be diffed over time):
+
+  search      Build every requested index type over a synthetic corpus (or the
+              persisted index) and report p50/p95/p99 latency, QPS, batch QPS
+              and recall@k against exact search, per metric.
+  http        Concurrent load against the FastAPI app: in-process over ASGI,
+              on a local uvicorn started here, or at --url (e.g. ``make dev``).
+  interleave  Alternate single-row inserts and searches on a flat index.
+  encode      Corpus encode throughput (texts/sec): fixed batches in input
+              order vs length-sorted batches sized by a token budget.
+"""
 from __future__ import annotations
 
+import argparse
+import asyncio
+import hashlib
+import json
+import os
+import platform
+import subprocess
+import sys
+import threading
 import time
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
 import numpy as np
 
-from backend.app.config import get_settings
-from backend.app.embeddings import EmbeddingService
+from backend.app.config import Settings, get_settings
+from backend.app.indexes import INDEX_TYPES, convert_index, load_index
 from backend.app.vector_db import FlatVectorIndex
 
+METRICS = ("cosine", "dot", "euclidean")
+
+
+# ---------------------------------------------------------------- data
+
+
+def synthetic_corpus(
+    n: int, dim: int, n_queries: int, clusters: int = 64, seed: int = 0
+) -> Tuple[np.ndarray, np.ndarray]:
+    """``(n, dim)`` rows and ``(n_queries, dim)`` held-out queries from one Gaussian mixture.
+
+    Clustered data is closer to real embeddings than i.i.d. noise, which makes
+    every approximate index look either perfect or useless.
+    """
+    rng = np.random.default_rng(seed)
+    centers = rng.normal(size=(clusters, dim)).astype(np.float32)
+
+    def draw(m: int) -> np.ndarray:
+        noise = rng.normal(size=(m, dim)).astype(np.float32)
+        return centers[rng.integers(0, clusters, size=m)] + 0.5 * noise
+
+    return draw(n), draw(n_queries)
+
+
+def persisted_corpus(n_queries: int, seed: int = 0) -> Tuple[np.ndarray, np.ndarray]:
+    """Live rows of the persisted index, with queries as slightly perturbed rows."""
+    index = load_index(get_settings().index_dir)
+    index._materialize()
+    rows = np.asarray(index._all_vectors(), dtype=np.float32)
+    if index._n_deleted:
+        rows = rows[~index._deleted_mask(rows.shape[0])]
+    rng = np.random.default_rng(seed)
+    picks = rng.choice(rows.shape[0], size=min(n_queries, rows.shape[0]), replace=False)
+    noise = rng.normal(scale=0.01, size=(picks.shape[0], rows.shape[1])).astype(np.float32)
+    queries = rows[picks] + noise
+    return rows, queries
+
+
+def latency_summary(seconds: Sequence[float]) -> Dict[str, float]:
+    ms = np.asarray(seconds, dtype=np.float64) * 1000.0
+    if ms.size == 0:
+        return {"p50_ms": 0.0, "p95_ms": 0.0, "p99_ms": 0.0, "mean_ms": 0.0, "max_ms": 0.0}
+    p50, p95, p99 = np.percentile(ms, [50, 95, 99])
+    return {
+        "p50_ms": float(p50),
+        "p95_ms": float(p95),
+        "p99_ms": float(p99),
+        "mean_ms": float(ms.mean()),
+        "max_ms": float(ms.max()),
+    }
+
+
+def environment() -> Dict[str, Any]:
+    try:
+        commit = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True,
+            text=True,
+            timeout=5,
+            check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.SubprocessError):
+        commit = None
+    return {
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "git_commit": commit,
+    }
+
+
+def write_report(
+    path: Optional[str], suite: str, args: argparse.Namespace, results: List[Dict[str, Any]]
+) -> None:
+    if not path:
+        return
+    params = {k: v for k, v in vars(args).items() if k not in ("json", "func")}
+    report = {
+        "suite": suite,
+        "created_at": datetime.utcnow().isoformat() + "Z",
+        "environment": environment(),
+        "params": params,
+        "results": results,
+    }
+    text = json.dumps(report, indent=2, default=str)
+    if path == "-":
+        print(text)
+    else:
+        Path(path).write_text(text + "\n", encoding="utf-8")
+        print(f"wrote {path}", file=sys.stderr)
+
+
+def print_table(rows: List[Dict[str, Any]], columns: Sequence[str]) -> None:
+    def fmt(v: Any) -> str:
+        if isinstance(v, float):
+            return f"{v:.3f}" if abs(v) < 1000 else f"{v:.0f}"
+        return "-" if v is None else str(v)
+
+    cells = [[fmt(r.get(c)) for c in columns] for r in rows]
+    widths = [
+        max(len(c), *(len(row[i]) for row in cells)) if cells else len(c)
+        for i, c in enumerate(columns)
+    ]
+    print("  ".join(c.rjust(w) for c, w in zip(columns, widths)), file=sys.stderr)
+    for row in cells:
+        print("  ".join(v.rjust(w) for v, w in zip(row, widths)), file=sys.stderr)
+
+
+# ---------------------------------------------------------------- index suite
 
-def main() -> None:
-    settings = get_settings()
-    index = FlatVectorIndex.load(settings.index_dir)
-    emb = EmbeddingService(settings.embed_model, device=settings.device)
-    q = "language models for enterprise"
-    v = emb.encode([q])[0]
+
+def bench_settings(args: argparse.Namespace) -> Settings:
+    """Settings from the environment with ``--set`` overrides applied (validated like env vars)."""
+    overrides: Dict[str, str] = {}
+    for item in args.set:
+        key, sep, value = item.partition("=")
+        if not sep:
+            raise SystemExit(f"--set expects KEY=VALUE, got {item!r}")
+        overrides[key.strip().lower()] = value.strip()
+    return Settings(**overrides)  # type: ignore[arg-type]
+
+
+def build_index(
+    index_type: str, exact: FlatVectorIndex, settings: Settings
+) -> Tuple[FlatVectorIndex, float]:
+    """``exact``'s rows as ``index_type``; the time includes training/graph building."""
     t0 = time.perf_counter()
-    _ = index.search(v, k=10, metric=settings.default_metric)
-    dt = (time.perf_counter() - t0) * 1000
-    print(f"Search latency: {dt:.2f} ms for N={index.size()} D={index.dimension}")
+    index = convert_index(exact, settings.model_copy(update={"index_type": index_type}))
+    index._materialize()
+    return index, time.perf_counter() - t0
 
 
-if __name__ == "__main__":
-    main()
+def memory_bytes(index: FlatVectorIndex) -> int:
+    if hasattr(index, "memory_bytes"):
+        return int(index.memory_bytes())  # type: ignore[attr-defined]
+    arrays = (index._vectors, index._normed, index._sqnorms)
+    return int(sum(a.nbytes for a in arrays if a is not None))
+
+
+def bench_index(
+    index: FlatVectorIndex,
+    queries: np.ndarray,
+    truth: List[List[str]],
+    k: int,
+    metric: str,
+    warmup: int,
+) -> Dict[str, Any]:
+    for q in queries[:warmup]:
+        index.search(q, k=k, metric=metric)  # type: ignore[arg-type]
+    latencies: List[float] = []
+    hits = 0
+    t_start = time.perf_counter()
+    for q, expected in zip(queries, truth):
+        t0 = time.perf_counter()
+        found = index.search(q, k=k, metric=metric)  # type: ignore[arg-type]
+        latencies.append(time.perf_counter() - t0)
+        hits += len({r[0] for r in found} & set(expected))
+    wall = time.perf_counter() - t_start
+    t0 = time.perf_counter()
+    index.search_batch(queries, k=k, metric=metric)  # type: ignore[arg-type]
+    batch_s = time.perf_counter() - t0
+    return {
+        **latency_summary(latencies),
+        "qps": len(queries) / wall if wall > 0 else 0.0,
+        "batch_qps": len(queries) / batch_s if batch_s > 0 else 0.0,
+        f"recall_at_{k}": hits / max(sum(len(t) for t in truth), 1),
+    }
+
+
+def run_search_suite(args: argparse.Namespace) -> List[Dict[str, Any]]:
+    if args.from_index:
+        corpus, queries = persisted_corpus(args.queries, seed=args.seed)
+    else:
+        corpus, queries = synthetic_corpus(
+            args.n, args.dim, args.queries, clusters=args.clusters, seed=args.seed
+        )
+    n, dim = corpus.shape
+    print(f"corpus N={n} D={dim}, {queries.shape[0]} queries, k={args.k}", file=sys.stderr)
+    exact = FlatVectorIndex(dim)
+    exact.bulk_insert([str(i) for i in range(n)], corpus, [{} for _ in range(n)])
+    metrics = [m for m in args.metrics.split(",") if m]
+    # Ground truth once per metric from the exact scan
+    truth = {
+        m: [[r[0] for r in hits] for hits in exact.search_batch(queries, k=args.k, metric=m)]  # type: ignore[arg-type]
+        for m in metrics
+    }
+    settings = bench_settings(args)
+    results: List[Dict[str, Any]] = []
+    for index_type in [t for t in args.index_types.split(",") if t]:
+        if index_type not in INDEX_TYPES:
+            raise SystemExit(
+                f"unknown index type: {index_type} (choose from {', '.join(INDEX_TYPES)})"
+            )
+        index, build_s = build_index(index_type, exact, settings)
+        for metric in metrics:
+            row = {
+                "index_type": index_type,
+                "metric": metric,
+                "n": n,
+                "dim": dim,
+                "k": args.k,
+                "queries": int(queries.shape[0]),
+                "build_s": build_s,
+                "memory_bytes": memory_bytes(index),
+                **bench_index(index, queries, truth[metric], args.k, metric, args.warmup),
+            }
+            results.append(row)
+            print(
+                f"  {index_type:8s} {metric:9s} "
+                f"p50 {row['p50_ms']:.3f} ms  p99 {row['p99_ms']:.3f} ms  "
+                f"{row['qps']:.0f} qps  recall@{args.k} {row[f'recall_at_{args.k}']:.3f}",
+                file=sys.stderr,
+            )
+    print_table(
+        results,
+        [
+            "index_type",
+            "metric",
+            "build_s",
+            "p50_ms",
+            "p95_ms",
+            "p99_ms",
+            "qps",
+            "batch_qps",
+            f"recall_at_{args.k}",
+            "memory_bytes",
+        ],
+    )
+    return results
+
+
+# ---------------------------------------------------------------- http load
+
+
+class SyntheticEncoder:
+    """Deterministic text -> vector stand-in, so HTTP runs measure serving rather than the model."""
+
+    model_name = "synthetic"
+    normalize_input = True
+
+    def __init__(self, dim: int, encode_ms: float = 0.0) -> None:
+        self.dim = dim
+        self.encode_ms = encode_ms
+
+    def encode(
+        self, texts: Sequence[str], batch_size: int = 1, normalize: bool = False
+    ) -> np.ndarray:
+        if self.encode_ms > 0:
+            time.sleep(self.encode_ms / 1000.0)
+        out = np.empty((len(texts), self.dim), dtype=np.float32)
+        for i, text in enumerate(texts):
+            seed = int.from_bytes(
+                hashlib.blake2b(text.encode("utf-8"), digest_size=8).digest(), "little"
+            )
+            out[i] = np.random.default_rng(seed).normal(size=self.dim)
+        if normalize:
+            out /= np.linalg.norm(out, axis=1, keepdims=True) + 1e-12
+        return out
+
+
+def install_synthetic_app(args: argparse.Namespace) -> Any:
+    """Point the app at a synthetic ``args.index_type`` index and encoder; returns the module."""
+    import backend.app.main as main
+
+    corpus, _ = synthetic_corpus(args.n, args.dim, 0, clusters=args.clusters, seed=args.seed)
+    exact = FlatVectorIndex(args.dim)
+    exact.bulk_insert(
+        [f"doc-{i}" for i in range(args.n)],
+        corpus,
+        [{"text": f"synthetic document {i}", "bucket": i % 10} for i in range(args.n)],
+    )
+    index, build_s = build_index(args.index_type, exact, bench_settings(args))
+    print(
+        f"serving synthetic {args.index_type} index N={args.n} D={args.dim} "
+        f"(built in {build_s:.1f}s)",
+        file=sys.stderr,
+    )
+    encoder: Any = SyntheticEncoder(args.dim, args.encode_ms)
+    if args.model:
+        from backend.app.embeddings import EmbeddingService
+
+        encoder = EmbeddingService.from_settings(bench_settings(args))
+        if encoder.model.get_sentence_embedding_dimension() != args.dim:
+            raise SystemExit("--model needs --dim equal to the model's embedding dimension")
+    main.INDEX = index
+    main.EMBEDDINGS = encoder
+    main.BATCHER = None
+    main.ERROR_MESSAGE = None
+    main.QUERY_CACHE.clear()
+    main.RESULT_CACHE.clear()
+    return main
+
+
+def request_body(i: int, args: argparse.Namespace) -> Dict[str, Any]:
+    # Distinct texts defeat the caches unless --distinct-queries makes them repeat
+    body: Dict[str, Any] = {
+        "query": f"benchmark query {i % args.distinct_queries} about topic {i % 97}",
+        "k": args.k,
+    }
+    if args.metric:
+        body["metric"] = args.metric
+    if args.mode != "vector":
+        body["mode"] = args.mode
+    return body
 
 
+async def run_load(client: Any, args: argparse.Namespace) -> Dict[str, Any]:
+    """Closed loop: ``concurrency`` workers each send their next request as soon as one returns."""
+    latencies: List[float] = []
+    ok_latencies: List[float] = []
+    statuses: Dict[str, int] = {}
+    counter = iter(range(args.requests))
+
+    async def worker() -> None:
+        for i in counter:
+            t0 = time.perf_counter()
+            try:
+                r = await client.post("/search", json=request_body(i, args))
+                status = str(r.status_code)
+            except Exception as e:  # connection errors count as failures, not crashes
+                status = type(e).__name__
+            dt = time.perf_counter() - t0
+            latencies.append(dt)
+            statuses[status] = statuses.get(status, 0) + 1
+            if status == "200":
+                ok_latencies.append(dt)
+
+    for i in range(min(args.warmup, args.requests)):
+        await client.post("/search", json=request_body(-1 - i, args))
+    t0 = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(args.concurrency)))
+    wall = time.perf_counter() - t0
+    ok = statuses.get("200", 0)
+    return {
+        "concurrency": args.concurrency,
+        "requests": args.requests,
+        "wall_s": wall,
+        "qps": ok / wall if wall > 0 else 0.0,
+        "statuses": dict(sorted(statuses.items())),
+        "shed": statuses.get("429", 0) + statuses.get("503", 0),
+        **latency_summary(ok_latencies),
+        "all": latency_summary(latencies),
+    }
+
+
+def start_uvicorn(app: Any, port: int) -> Tuple[Any, threading.Thread]:
+    import uvicorn
+
+    # lifespan off: startup would replace the synthetic index with the persisted one
+    server = uvicorn.Server(
+        uvicorn.Config(app, host="127.0.0.1", port=port, log_level="warning", lifespan="off")
+    )
+    thread = threading.Thread(target=server.run, daemon=True)
+    thread.start()
+    deadline = time.monotonic() + 10.0
+    while not server.started:
+        if time.monotonic() > deadline or not thread.is_alive():
+            raise SystemExit(f"uvicorn did not start on port {port}")
+        time.sleep(0.05)
+    return server, thread
+
+
+def run_http_suite(args: argparse.Namespace) -> List[Dict[str, Any]]:
+    import httpx
+
+    server = None
+    if args.url:
+        target, base_url, transport = args.url, args.url, None
+    else:
+        main = install_synthetic_app(args)
+        if args.target == "uvicorn":
+            server, _ = start_uvicorn(main.app, args.port)
+            target = base_url = f"http://127.0.0.1:{args.port}"
+            transport = None
+        else:
+            target, base_url = "in-process", "http://bench"
+            transport = httpx.ASGITransport(app=main.app)
+
+    async def go() -> List[Dict[str, Any]]:
+        limits = httpx.Limits(
+            max_connections=max(args.concurrency_levels),
+            max_keepalive_connections=max(args.concurrency_levels),
+        )
+        out: List[Dict[str, Any]] = []
+        async with httpx.AsyncClient(
+            base_url=base_url, transport=transport, timeout=args.timeout, limits=limits
+        ) as client:
+            for concurrency in args.concurrency_levels:
+                args.concurrency = concurrency
+                row = {"target": target, "mode": args.mode, **await run_load(client, args)}
+                out.append(row)
+                print(
+                    f"  c={concurrency:<4d} {row['qps']:8.0f} qps  "
+                    f"p50 {row['p50_ms']:.2f} ms  p95 {row['p95_ms']:.2f} ms  "
+                    f"p99 {row['p99_ms']:.2f} ms  statuses {row['statuses']}",
+                    file=sys.stderr,
+                )
+        return out
+
+    try:
+        results = asyncio.run(go())
+    finally:
+        if server is not None:
+            server.should_exit = True
+    print_table(results, ["target", "concurrency", "qps", "p50_ms", "p95_ms", "p99_ms", "shed"])
+    return results
+
+
+# ---------------------------------------------------------------- interleave
+
+
+def run_interleave(args: argparse.Namespace) -> List[Dict[str, Any]]:
+    """Alternate single-row inserts and searches on a synthetic flat index.
+
+    Also times the ``np.vstack`` of the whole matrix that the old per-row-list
+    storage ran before every search following an insert, for comparison.
+    """
+    rng = np.random.default_rng(args.seed)
+    base = rng.normal(size=(args.n, args.dim)).astype(np.float32)
+    extra = rng.normal(size=(args.steps, args.dim)).astype(np.float32)
+    index = FlatVectorIndex(args.dim)
+    t0 = time.perf_counter()
+    index.bulk_insert([f"b{i}" for i in range(args.n)], base, [{} for _ in range(args.n)])
+    bulk_s = time.perf_counter() - t0
+    inserts: List[float] = []
+    searches: List[float] = []
+    rebuild_s = 0.0
+    for i in range(args.steps):
+        t0 = time.perf_counter()
+        index.insert(f"x{i}", extra[i], {})
+        t1 = time.perf_counter()
+        index.search(extra[i], k=args.k)
+        t2 = time.perf_counter()
+        assert index._vectors is not None
+        np.vstack([index._vectors[:-1], extra[i][None, :]])
+        rebuild_s += time.perf_counter() - t2
+        inserts.append(t1 - t0)
+        searches.append(t2 - t1)
+    row = {
+        "n": args.n,
+        "dim": args.dim,
+        "steps": args.steps,
+        "bulk_insert_s": bulk_s,
+        "insert": latency_summary(inserts),
+        "search": latency_summary(searches),
+        "old_rebuild_ms_per_search": rebuild_s / max(args.steps, 1) * 1000.0,
+    }
+    print(
+        f"Interleaved insert+search: N={args.n}+{args.steps} D={args.dim} "
+        f"(bulk_insert of N: {bulk_s * 1000:.1f} ms)",
+        file=sys.stderr,
+    )
+    print(
+        f"  insert  p50 {row['insert']['p50_ms'] * 1000:8.1f} us  "
+        f"p99 {row['insert']['p99_ms'] * 1000:8.1f} us",
+        file=sys.stderr,
+    )
+    print(
+        f"  search  p50 {row['search']['p50_ms']:8.3f} ms  p99 {row['search']['p99_ms']:8.3f} ms",
+        file=sys.stderr,
+    )
+    print(
+        "  old full-matrix rebuild per search would add "
+        f"{row['old_rebuild_ms_per_search']:.3f} ms/op",
+        file=sys.stderr,
+    )
+    return [row]
+
+
+# ---------------------------------------------------------------- encode
+
+
+def corpus_texts(args: argparse.Namespace) -> List[str]:
+    """``--texts`` posts from blog.json, or synthetic ones with a long-tailed word count."""
+    if args.from_blogs:
+        from backend.app.loader import load_blogs
+
+        posts = load_blogs(get_settings().blog_json_path)
+        return [e["metadata"]["text"] for e in posts][: args.texts]
+    rng = np.random.default_rng(args.seed)
+    words = ["vector", "search", "index", "query", "latency", "model", "blog", "post"]
+    vocab = [f"{w}{i}" for i, w in enumerate(words * 250)]
+    lengths = np.clip(rng.lognormal(mean=3.5, sigma=1.0, size=args.texts), 3, 2000).astype(int)
+    return [" ".join(rng.choice(vocab, size=n)) for n in lengths]
+
+
+def run_encode_suite(args: argparse.Namespace) -> List[Dict[str, Any]]:
+    """Texts/sec of ``encode`` (``--batch-size`` texts in input order) and of ``encode_bulk``.
+
+    ``encode_bulk`` is run once per ``--token-budgets`` entry.
+    """
+    from backend.app.embeddings import EmbeddingService, length_batches
+
+    settings = bench_settings(args)
+    encoder = EmbeddingService.from_settings(settings)
+    texts = corpus_texts(args)
+    _, lengths = encoder._tokenize(texts)
+    total_tokens = int(np.sum(lengths))
+    encoder.encode(texts[: args.warmup], batch_size=args.batch_size)
+    rows: List[Dict[str, Any]] = []
+
+    def record(
+        mode: str,
+        param: int,
+        seconds: float,
+        padded: int,
+        reference: Optional[np.ndarray],
+        emb: np.ndarray,
+    ) -> None:
+        row: Dict[str, Any] = {
+            "mode": mode,
+            "param": param,
+            "texts": len(texts),
+            "seconds": seconds,
+            "texts_per_s": len(texts) / seconds,
+            "padding_ratio": padded / max(total_tokens, 1),
+        }
+        if reference is not None:
+            row["min_cosine_vs_encode"] = float(np.min(np.sum(emb * reference, axis=1)))
+        rows.append(row)
+
+    t0 = time.perf_counter()
+    reference = encoder.encode(texts, batch_size=args.batch_size, normalize=True)
+    seconds = time.perf_counter() - t0
+    # SentenceTransformer sorts a call's texts by character length before batching
+    order = np.argsort([-len(t) for t in texts], kind="stable")
+    batches = [order[s : s + args.batch_size] for s in range(0, len(texts), args.batch_size)]
+    padded = sum(max(lengths[i] for i in b) * len(b) for b in batches)
+    record("encode", args.batch_size, seconds, padded, None, reference)
+    for budget in args.token_budgets:
+        t0 = time.perf_counter()
+        emb = encoder.encode_bulk(texts, token_budget=budget, normalize=True)
+        seconds = time.perf_counter() - t0
+        padded = sum(int(lengths[b[0]]) * len(b) for b in length_batches(lengths, budget))
+        record("encode_bulk", budget, seconds, padded, reference, emb)
+
+    print(
+        f"Encode {len(texts)} texts ({total_tokens} tokens) "
+        f"with {settings.embed_model} [{settings.encoder_backend}]",
+        file=sys.stderr,
+    )
+    print_table(rows, ["mode", "param", "texts_per_s", "padding_ratio", "min_cosine_vs_encode"])
+    return rows
+
+
+# ---------------------------------------------------------------- cli
+
+
+def parse_args(argv: Optional[Sequence[str]] = None) -> argparse.Namespace:
+    common = argparse.ArgumentParser(add_help=False)
+    common.add_argument("--n", type=int, default=20000, help="Synthetic corpus rows")
+    common.add_argument("--dim", type=int, default=384, help="Synthetic vector dimension")
+    common.add_argument(
+        "--clusters",
+        type=int,
+        default=64,
+        help="Gaussian mixture components of the synthetic corpus",
+    )
+    common.add_argument("--k", type=int, default=10)
+    common.add_argument("--seed", type=int, default=0)
+    common.add_argument(
+        "--warmup", type=int, default=10, help="Untimed queries/requests before measuring"
+    )
+    common.add_argument("--json", metavar="PATH", help="Also write results as JSON (- for stdout)")
+    common.add_argument(
+        "--set",
+        action="append",
+        default=[],
+        metavar="KEY=VALUE",
+        help="Override a setting of the benchmarked indexes, e.g. --set pq_rerank=0",
+    )
+
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    sub = parser.add_subparsers(dest="suite", required=True)
+
+    search = sub.add_parser(
+        "search", parents=[common], help="Per index type/metric latency, QPS and recall"
+    )
+    search.add_argument("--queries", type=int, default=200)
+    # hnsw builds its graph in Python, row by row: add it explicitly (and keep --n small)
+    search.add_argument(
+        "--index-types", default="flat,sharded,ivf,pq,sq", help="Comma-separated index types"
+    )
+    search.add_argument("--metrics", default=",".join(METRICS), help="Comma-separated metrics")
+    search.add_argument(
+        "--from-index",
+        action="store_true",
+        help="Use the persisted index rows instead of a synthetic corpus",
+    )
+    search.set_defaults(func=run_search_suite)
+
+    http = sub.add_parser("http", parents=[common], help="Concurrent HTTP load on /search")
+    http.add_argument(
+        "--target",
+        choices=["inprocess", "uvicorn"],
+        default="inprocess",
+        help="Where to serve the synthetic app",
+    )
+    http.add_argument(
+        "--url", help="Load an already running server instead (its own index and model)"
+    )
+    http.add_argument("--port", type=int, default=8765, help="Port for --target uvicorn")
+    http.add_argument("--index-type", default="flat", choices=sorted(INDEX_TYPES))
+    http.add_argument(
+        "--concurrency",
+        dest="concurrency_levels",
+        type=lambda s: [int(c) for c in s.split(",")],
+        default=[1, 8, 32],
+        help="Comma-separated concurrency levels",
+    )
+    http.add_argument("--requests", type=int, default=1000, help="Requests per concurrency level")
+    http.add_argument(
+        "--distinct-queries",
+        type=int,
+        default=1_000_000,
+        help="Distinct query texts (smaller = more cache hits)",
+    )
+    http.add_argument("--metric", choices=METRICS)
+    http.add_argument("--mode", choices=["vector", "lexical", "hybrid"], default="vector")
+    http.add_argument(
+        "--encode-ms",
+        type=float,
+        default=0.0,
+        help="Simulated encode time of the synthetic encoder",
+    )
+    http.add_argument(
+        "--model",
+        action="store_true",
+        help="Encode with the configured model instead of the synthetic encoder",
+    )
+    http.add_argument(
+        "--timeout", type=float, default=30.0, help="Client timeout per request, seconds"
+    )
+    http.set_defaults(func=run_http_suite)
+
+    inter = sub.add_parser(
+        "interleave", parents=[common], help="Alternating inserts and searches on a flat index"
+    )
+    inter.add_argument("--steps", type=int, default=200, help="Insert+search rounds")
+    inter.set_defaults(func=run_interleave)
+
+    encode = sub.add_parser(
+        "encode", parents=[common], help="Bulk encode throughput of the configured model"
+    )
+    encode.add_argument("--texts", type=int, default=2000, help="Texts to encode")
+    encode.add_argument(
+        "--from-blogs",
+        action="store_true",
+        help="Encode posts from blog.json instead of synthetic texts",
+    )
+    encode.add_argument(
+        "--batch-size", type=int, default=64, help="Batch size of the plain encode baseline"
+    )
+    encode.add_argument(
+        "--token-budgets",
+        type=lambda s: [int(b) for b in s.split(",")],
+        default=[4096, 16384],
+        help="Comma-separated encode_bulk token budgets",
+    )
+    encode.set_defaults(func=run_encode_suite)
+    return parser.parse_args(argv)
+
+
+def main(argv: Optional[Sequence[str]] = None) -> None:
+    args = parse_args(argv)
+    func: Callable[[argparse.Namespace], List[Dict[str, Any]]] = args.func
+    results = func(args)
+    write_report(args.json, args.suite, args, results)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,67 @@
+from __future__ import annotations
+
+import argparse
+import json
+import logging
+import time
+from pathlib import Path
+
+from backend.app.config import get_settings
+from backend.app.indexes import load_index
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Files that only the other layout uses; removed after a successful conversion
+_NPZ_FILES = ("data.npz",)
+
+
+def main() -> None:
+	parser = argparse.ArgumentParser(
+		description="Convert the persisted index between npz and npy layouts"
+	)
+	parser.add_argument(
+		"--to", choices=["npz", "npy"], default="npy", help="Target layout (default: npy)"
+	)
+	parser.add_argument(
+		"--index-dir", type=Path, default=None, help="Index directory (default: settings.index_dir)"
+	)
+	parser.add_argument("--keep-old", action="store_true", help="Keep files of the previous layout")
+	args = parser.parse_args()
+
+	directory: Path = args.index_dir or get_settings().index_dir
+	with (directory / "index.json").open("r", encoding="utf-8") as f:
+		manifest = json.load(f)
+	old_layout = manifest.get("format", "npz")
+	old_arrays = list(manifest.get("arrays", []))
+
+	t0 = time.perf_counter()
+	index = load_index(directory)
+	index.save(
+		directory,
+		model_name=manifest.get("model", ""),
+		default_metric=manifest.get("default_metric", "cosine"),
+		layout=args.to,
+	)
+	logger.info(
+		"Converted %s index (%d vectors) from %s to %s in %.2fs",
+		index.index_type,
+		index.size(),
+		old_layout,
+		args.to,
+		time.perf_counter() - t0,
+	)
+
+	if args.keep_old or old_layout == args.to:
+		return
+	stale = _NPZ_FILES if old_layout == "npz" else tuple(f"{name}.npy" for name in old_arrays)
+	for name in stale:
+		path = directory / name
+		# PQ keeps vectors.npy in both layouts
+		if path.exists() and name != "vectors.npy":
+			path.unlink()
+			logger.info("Removed %s", path)
+
+
+if __name__ == "__main__":
+	main()
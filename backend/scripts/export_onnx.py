@@ -0,0 +1,70 @@
+from __future__ import annotations
+
+import argparse
+import logging
+import time
+from pathlib import Path
+
+import numpy as np
+
+from backend.app.config import get_settings
+from backend.app.onnx_encoder import (
+	OnnxEncoder,
+	ensure_export,
+	export_dir,
+	export_model,
+	quantize_model,
+)
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+_PROBES = [
+	"Vector search with approximate nearest neighbours",
+	"How we cut cold-start latency of our API in half",
+	"a",
+]
+
+
+def main() -> None:
+	parser = argparse.ArgumentParser(
+		description="Export embed_model to ONNX (for ENCODER_BACKEND=onnx)"
+	)
+	parser.add_argument("--model", default=None, help="Model id (default: settings.embed_model)")
+	parser.add_argument(
+		"--out", type=Path, default=None, help="Export root (default: settings.onnx_dir)"
+	)
+	parser.add_argument(
+		"--quantize", action="store_true", help="Also write the int8 dynamically quantized model"
+	)
+	parser.add_argument("--force", action="store_true", help="Re-export even if an export exists")
+	args = parser.parse_args()
+
+	settings = get_settings()
+	model_name = args.model or settings.embed_model
+	root: Path = args.out or settings.onnx_dir
+	t0 = time.perf_counter()
+	if args.force:
+		directory = export_dir(root, model_name)
+		export_model(model_name, directory, settings.max_seq_length)
+		if args.quantize:
+			quantize_model(directory)
+	else:
+		directory = ensure_export(
+			model_name, root, quantize=args.quantize, max_seq_length=settings.max_seq_length
+		)
+	logger.info("Export ready in %s (%.1fs)", directory, time.perf_counter() - t0)
+
+	# Agreement with the torch encoder on a few probes
+	from sentence_transformers import SentenceTransformer
+
+	torch_model = SentenceTransformer(model_name, device="cpu")
+	reference = torch_model.encode(_PROBES, normalize_embeddings=True)
+	for quantized in (False, True) if args.quantize else (False,):
+		emb = OnnxEncoder(directory, quantized=quantized).encode(_PROBES, normalize_embeddings=True)
+		cosine = np.sum(emb * reference, axis=1)
+		print(f"{'int8' if quantized else 'fp32'}: min cosine vs torch {cosine.min():.5f}")
+
+
+if __name__ == "__main__":
+	main()
@@ -0,0 +1,55 @@
+from __future__ import annotations
+
+import argparse
+import logging
+from pathlib import Path
+
+from backend.app.config import get_settings
+from backend.app.indexes import convert_index, load_index, read_manifest
+from backend.app.shared_index import publish_index
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+def main() -> None:
+	parser = argparse.ArgumentParser(
+		description="Publish the persisted index as a shared generation for multi-worker serving"
+	)
+	parser.add_argument(
+		"--index-dir",
+		type=Path,
+		default=None,
+		help="Source index directory (default: settings.index_dir)",
+	)
+	parser.add_argument(
+		"--shared-dir",
+		type=Path,
+		default=None,
+		help="Target directory (default: settings.shared_index_dir)",
+	)
+	parser.add_argument("--keep", type=int, default=2, help="Number of generations to keep on disk")
+	args = parser.parse_args()
+
+	settings = get_settings()
+	source: Path = args.index_dir or settings.index_dir
+	shared_dir = args.shared_dir or settings.shared_index_dir
+	if shared_dir is None:
+		raise SystemExit("Set SHARED_INDEX_DIR or pass --shared-dir")
+	manifest = read_manifest(source)
+	index = convert_index(load_index(source), settings)
+	generation = publish_index(
+		index,
+		shared_dir,
+		model_name=manifest.get("model", settings.embed_model),
+		default_metric=manifest.get("default_metric", settings.default_metric),
+		keep=args.keep,
+	)
+	print(
+		f"Published {index.index_type} index with {index.size()} vectors "
+		f"as generation {generation} in {shared_dir}"
+	)
+
+
+if __name__ == "__main__":
+	main()
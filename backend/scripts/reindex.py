@@ -2,35 +2,80 @@ from __future__ import annotations
 
 import argparse
 import logging
+from pathlib import Path
+from typing import Optional
 
 from backend.app.config import get_settings
 from backend.app.embeddings import EmbeddingService
-from backend.app.loader import load_blogs
+from backend.app.indexes import load_index, read_manifest
+from backend.app.indexing import rebuild_index
 from backend.app.vector_db import FlatVectorIndex
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 
+def _load_existing(index_dir: Path, model_name: str) -> Optional[FlatVectorIndex]:
+	"""Previous index whose vectors can be reused, or None if it is missing or stale."""
+	try:
+		index = load_index(index_dir)
+	except FileNotFoundError:
+		logger.info("No existing index in %s; embedding every entry", index_dir)
+		return None
+	previous_model = read_manifest(index_dir).get("model")
+	if previous_model != model_name:
+		logger.info(
+			"Index was built with %s, not %s; embedding every entry", previous_model, model_name
+		)
+		return None
+	return index
+
+
 def main() -> None:
 	parser = argparse.ArgumentParser(description="Rebuild the vector index from blogs.json")
+	parser.add_argument(
+		"--full",
+		action="store_true",
+		help="Re-embed every entry instead of reusing unchanged vectors",
+	)
+	parser.add_argument(
+		"--workers",
+		type=int,
+		default=1,
+		help=(
+			"Embed in this many processes, each loading its own encoder; "
+			"an interrupted run resumes from its shard checkpoints"
+		),
+	)
+	parser.add_argument(
+		"--threads-per-worker",
+		type=int,
+		default=0,
+		help=(
+			"Intra-op threads of each worker's encoder (default: library default; "
+			"about cores / workers avoids oversubscription)"
+		),
+	)
 	args = parser.parse_args()
 
 	settings = get_settings()
-	logger.info("Loading blogs from %s", settings.blog_json_path)
-	entries = load_blogs(settings.blog_json_path)
-	if not entries:
-		raise SystemExit("No entries found")
-
-	# No fallback: fail fast if model can't be loaded
-	emb = EmbeddingService(settings.embed_model, device=settings.device)
-	texts = [e["metadata"]["text"] for e in entries]
-	vecs = emb.encode(texts, batch_size=settings.batch_size)
-	index = FlatVectorIndex(dimension=int(vecs.shape[1]))
-	for e, v in zip(entries, vecs):
-		index.insert(e["id"], v, e["metadata"])
-	index.save(settings.index_dir, model_name=emb.model_name, default_metric=settings.default_metric)
-	logger.info("Saved index with %d vectors to %s", index.size(), settings.index_dir)
+	# No fallback: fail fast if model can't be loaded (in parallel mode each worker loads it)
+	emb = EmbeddingService.from_settings(settings) if args.workers <= 1 else None
+	existing = None if args.full else _load_existing(settings.index_dir, settings.embed_model)
+	try:
+		index, stats = rebuild_index(
+			settings,
+			emb,
+			existing=existing,
+			workers=args.workers,
+			threads_per_worker=args.threads_per_worker,
+		)
+	except RuntimeError as e:
+		raise SystemExit(str(e)) from e
+	logger.info(
+		"Saved %s index with %d vectors to %s", index.index_type, index.size(), settings.index_dir
+	)
+	print(f"Reindex summary: {stats.summary()}")
 
 
 if __name__ == "__main__":
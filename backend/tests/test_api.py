@@ -17,3 +17,144 @@ def test_health(client: TestClient):
     assert r.json().get("status") == "ok"
 
 
+def test_documents_upsert_and_delete(monkeypatch, tmp_path):
+	import numpy as np
+
+	import backend.app.main as m
+	from backend.app.vector_db import FlatVectorIndex
+
+	class FakeEmbedding:
+		model_name = "fake"
+		normalize_input = True
+
+		def encode(self, texts, batch_size: int = 1, normalize: bool = False):
+			return np.vstack(
+				[
+					np.array([1.0, 0.0], dtype=np.float32)
+					if "alpha" in t.lower()
+					else np.array([0.0, 1.0], dtype=np.float32)
+					for t in texts
+				]
+			)
+
+	idx = FlatVectorIndex(2)
+	idx.insert("old", np.array([1.0, 0.1], dtype=np.float32), {"text": "old alpha"})
+	monkeypatch.setattr(m, "INDEX", idx, raising=False)
+	monkeypatch.setattr(m, "EMBEDDINGS", FakeEmbedding(), raising=False)
+	monkeypatch.setattr(m, "ERROR_MESSAGE", None, raising=False)
+	monkeypatch.setattr(m.settings, "index_dir", tmp_path)
+	client = TestClient(m.app)
+
+	r = client.post(
+		"/documents",
+		json={"documents": [{"id": "new", "text": "Alpha launch"}, {"id": "old", "text": "beta"}]},
+	)
+	assert r.status_code == 200
+	assert r.json()["upserted"] == 2 and r.json()["size"] == 2
+	top = client.post("/search", json={"query": "alpha", "k": 2}).json()["results"]
+	assert [h["id"] for h in top] == ["new", "old"]
+	assert top[1]["text"] == "beta"
+
+	lexical = client.post("/search", json={"query": "Beta", "mode": "lexical"}).json()["results"]
+	assert [h["id"] for h in lexical] == ["old"]
+	r = client.post("/search", json={"query": "beta", "k": 2, "mode": "hybrid"})
+	hybrid = r.json()["results"]
+	assert hybrid[0]["id"] == "old" and len(hybrid) == 2
+
+	r = client.post(
+		"/documents",
+		json={"documents": [{"id": "tagged", "text": "gamma", "metadata": {"lang": "de"}}]},
+	)
+	assert r.status_code == 200
+	r = client.post("/search", json={"query": "alpha", "k": 2, "filter": {"lang": "de"}})
+	hits = r.json()["results"]
+	assert [h["id"] for h in hits] == ["tagged"]
+	r = client.post("/search", json={"query": "alpha", "filter": {"lang": {"like": "d"}}})
+	assert r.status_code == 400
+	client.request("DELETE", "/documents", json={"ids": ["tagged"]})
+
+	r = client.request("DELETE", "/documents", json={"ids": ["new", "nope"]})
+	assert r.json() == {"upserted": 0, "deleted": 1, "missing": ["nope"], "size": 1}
+	assert [h["id"] for h in client.get("/posts").json()["results"]] == ["old"]
+	# background maintenance compacted (2 of 3 rows tombstoned) and persisted the index
+	assert m.INDEX.tombstone_ratio() == 0.0
+	assert (tmp_path / "index.json").exists()
+
+
+def test_documents_persist_after_enough_writes(monkeypatch, tmp_path):
+	import numpy as np
+
+	import backend.app.main as m
+	from backend.app.vector_db import FlatVectorIndex
+
+	class FakeEmbedding:
+		model_name = "fake"
+
+		def encode(self, texts, batch_size: int = 1, normalize: bool = False):
+			return np.ones((len(texts), 2), dtype=np.float32)
+
+	idx = FlatVectorIndex(2)
+	idx.insert("a", np.array([1.0, 0.0], dtype=np.float32), {"text": "a"})
+	monkeypatch.setattr(m, "INDEX", idx, raising=False)
+	monkeypatch.setattr(m, "EMBEDDINGS", FakeEmbedding(), raising=False)
+	monkeypatch.setattr(m, "ERROR_MESSAGE", None, raising=False)
+	monkeypatch.setattr(m, "_UNSAVED_WRITES", 0, raising=False)
+	monkeypatch.setattr(m.settings, "index_dir", tmp_path)
+	monkeypatch.setattr(m.settings, "compact_tombstone_ratio", 0.0)
+	monkeypatch.setattr(m.settings, "persist_after_writes", 3)
+	monkeypatch.setattr(m.settings, "persist_interval_s", 0.0)
+	client = TestClient(m.app)
+
+	client.post("/documents", json={"documents": [{"id": "b", "text": "b"}]})
+	client.request("DELETE", "/documents", json={"ids": ["a"]})
+	# Two unsaved writes: no full save yet
+	assert not (tmp_path / "index.json").exists() and m._UNSAVED_WRITES == 2
+	client.post("/documents", json={"documents": [{"id": "c", "text": "c"}]})
+	assert (tmp_path / "index.json").exists() and m._UNSAVED_WRITES == 0
+	saved = FlatVectorIndex.load(tmp_path)
+	assert saved.size() == 2 and "a" not in saved and "c" in saved
+
+
+def test_posts_pagination_and_ndjson(monkeypatch):
+	import json
+
+	import numpy as np
+
+	import backend.app.main as m
+	from backend.app.vector_db import FlatVectorIndex
+
+	idx = FlatVectorIndex(2)
+	for i in range(10):
+		idx.insert(f"p{i}", np.array([1.0, float(i)], dtype=np.float32), {"text": f"post {i}"})
+	idx.delete("p2")
+	idx.delete("p3")
+	monkeypatch.setattr(m, "INDEX", idx, raising=False)
+	monkeypatch.setattr(m, "ERROR_MESSAGE", None, raising=False)
+	client = TestClient(m.app)
+	live = [f"p{i}" for i in range(10) if i not in (2, 3)]
+
+	everything = client.get("/posts").json()
+	assert [h["id"] for h in everything["results"]] == live
+	assert everything["total"] == 8 and everything["next_cursor"] is None
+
+	seen, cursor = [], None
+	while True:
+		params = {"limit": 3, **({"cursor": cursor} if cursor else {})}
+		page = client.get("/posts", params=params).json()
+		assert len(page["results"]) <= 3
+		seen += [h["id"] for h in page["results"]]
+		cursor = page["next_cursor"]
+		if cursor is None:
+			break
+	assert seen == live
+
+	page = client.get("/posts", params={"offset": 2, "limit": 2}).json()
+	assert [h["id"] for h in page["results"]] == ["p4", "p5"]
+	assert client.get("/posts", params={"offset": 1, "cursor": "3"}).status_code == 400
+	assert client.get("/posts", params={"cursor": "x"}).status_code == 400
+
+	r = client.get("/posts", params={"format": "ndjson", "limit": 4})
+	assert r.headers["content-type"].startswith("application/x-ndjson")
+	rows = [json.loads(line) for line in r.text.splitlines()]
+	assert [row["id"] for row in rows] == live[:4] and rows[0]["text"] == "post 0"
+	assert r.headers["x-total-count"] == "8" and r.headers["x-next-cursor"] == "6"
@@ -0,0 +1,73 @@
+from __future__ import annotations
+
+import threading
+
+import numpy as np
+
+from backend.app.batcher import EmbeddingBatcher
+
+
+class CountingEmbedding:
+	def __init__(self) -> None:
+		self.model_name = "fake"
+		self.calls: list[int] = []
+
+	def encode(self, texts, batch_size: int = 1, normalize: bool = False):
+		texts = list(texts)
+		self.calls.append(len(texts))
+		return np.asarray([[float(len(t)), 1.0, 0.0] for t in texts], dtype=np.float32)
+
+
+def test_concurrent_queries_are_coalesced_and_routed_back():
+	service = CountingEmbedding()
+	batcher = EmbeddingBatcher(service, window_ms=100.0, max_batch=64)  # type: ignore[arg-type]
+	results: dict[int, np.ndarray] = {}
+
+	def worker(i: int) -> None:
+		results[i] = batcher.encode_one("x" * (i + 1), normalize=(i % 2 == 1))
+
+	threads = [threading.Thread(target=worker, args=(i,)) for i in range(16)]
+	for t in threads:
+		t.start()
+	for t in threads:
+		t.join()
+	batcher.close()
+
+	assert sum(service.calls) == 16
+	assert len(service.calls) < 16
+	for i, row in results.items():
+		expected = np.array([i + 1.0, 1.0, 0.0], dtype=np.float32)
+		if i % 2 == 1:
+			expected = expected / np.linalg.norm(expected)
+		np.testing.assert_allclose(row, expected, rtol=1e-6)
+
+	snap = batcher.stats.snapshot()
+	assert snap["items"] == 16 and snap["batches"] == len(service.calls)
+	assert snap["max_batch_size"] > 1
+	assert snap["queue_delay_ms"]["max"] >= 0.0
+
+
+def test_async_waiters_coalesce_without_encode_threads():
+	import asyncio
+
+	from backend.app.pipeline import SearchPipeline
+
+	service = CountingEmbedding()
+	batcher = EmbeddingBatcher(service, window_ms=100.0, max_batch=64)  # type: ignore[arg-type]
+	pipeline = SearchPipeline(encode_threads=1)
+
+	async def run() -> list:
+		return await asyncio.gather(
+			*(pipeline.wait(batcher.submit("x" * (i + 1))) for i in range(16))
+		)
+
+	rows = asyncio.run(run())
+	# A cancelled request is dropped before its batch is encoded
+	dropped = batcher.submit("gone")
+	assert dropped.cancel()
+	assert batcher.encode_one("kept")[0] == 4.0
+	batcher.close()
+	pipeline.close()
+
+	assert [float(r[0]) for r in rows] == [i + 1.0 for i in range(16)]
+	assert sum(service.calls) == 17 and len(service.calls) < 16
@@ -61,7 +61,8 @@ def test_posts_lists_index_contents(monkeypatch: pytest.MonkeyPatch):
 	idx_path = settings.index_dir / "index.json"
 	with idx_path.open("r", encoding="utf-8") as f:
 		idx_json = json.load(f)
-	expected_len = len(idx_json.get("ids", []))
+	# Columnar manifests record the row count; older ones carry the ids inline
+	expected_len = idx_json.get("count", len(idx_json.get("ids", [])))
 	assert len(data) == expected_len
 
 	# Spot-check a couple of known entries from blog.json are present in /posts
@@ -136,3 +137,38 @@ def test_search_returns_expected_for_seed_rag_careers(monkeypatch: pytest.Monkey
 	assert "career" in res_careers["text"].lower() or "hiring" in res_careers["text"].lower()
 
 
+def test_search_batch_returns_one_ranked_list_per_query(monkeypatch: pytest.MonkeyPatch):
+	import backend.app.main as m
+
+	settings = get_settings()
+	with settings.blog_json_path.open("r", encoding="utf-8") as f:
+		blog = json.load(f)
+	seed_item = next(x for x in blog if "seed round" in x["metadata"]["text"].lower())
+	rag_item = next(x for x in blog if "rag" in x["metadata"]["text"].lower())
+
+	idx = FlatVectorIndex(2)
+	idx.insert(seed_item["id"], np.array([1.0, 0.0], dtype=np.float32), {"text": seed_item["metadata"]["text"]})
+	idx.insert(rag_item["id"], np.array([0.0, 1.0], dtype=np.float32), {"text": rag_item["metadata"]["text"]})
+
+	class FakeEmbedding:
+		model_name = "fake"
+
+		def encode(self, texts, batch_size: int = 1, normalize: bool = False):
+			return np.vstack([
+				np.array([1.0, 0.0] if "seed" in str(t).lower() else [0.0, 1.0], dtype=np.float32)
+				for t in texts
+			])
+
+	monkeypatch.setattr(m, "INDEX", idx, raising=False)
+	monkeypatch.setattr(m, "EMBEDDINGS", FakeEmbedding(), raising=False)
+	monkeypatch.setattr(m, "ERROR_MESSAGE", None, raising=False)
+	client = TestClient(m.app)
+
+	# One ranked list per query, in request order
+	resp = client.post(
+		"/search/batch",
+		json={"queries": ["explain RAG approach", "seed round funding announcement"], "k": 1},
+	)
+	assert resp.status_code == 200
+	batch = resp.json()["results"]
+	assert [r["results"][0]["id"] for r in batch] == [rag_item["id"], seed_item["id"]]
@@ -0,0 +1,92 @@
+from __future__ import annotations
+
+import math
+from collections import Counter
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+from backend.app.bm25 import BM25Index, fuse_results, tokenize
+from backend.app.vector_db import FlatVectorIndex
+
+DOCS = [
+	"The Acme X200 router ships today",
+	"Routers and switches: a buyer's guide",
+	"acme x200 firmware update",
+	"Quarterly results and hiring news",
+	"The X-200 is not the X200",
+]
+
+
+def _naive_bm25(docs: list[str], query: str, k1: float = 1.2, b: float = 0.75) -> np.ndarray:
+	toks = [tokenize(d) for d in docs]
+	avgdl = sum(map(len, toks)) / len(toks)
+	out = np.zeros(len(docs))
+	for term, qtf in Counter(tokenize(query)).items():
+		df = sum(term in t for t in toks)
+		if df == 0:
+			continue
+		idf = math.log(1 + (len(docs) - df + 0.5) / (df + 0.5))
+		for i, t in enumerate(toks):
+			tf = t.count(term)
+			out[i] += qtf * idf * tf * (k1 + 1) / (tf + k1 * (1 - b + b * len(t) / avgdl))
+	return out
+
+
+def test_bm25_scores_match_formula_and_survive_tail_and_roundtrip(tmp_path: Path):
+	assert tokenize("  Acme   X200-Router ") == ["acme", "x200", "router"]
+	query = "acme x200 router"
+	built = BM25Index.from_texts(DOCS)
+	np.testing.assert_allclose(built.score(query), _naive_bm25(DOCS, query), rtol=1e-5)
+
+	# Rows appended later (unmerged tail) score the same as a fresh build
+	incremental = BM25Index.from_texts(DOCS[:2])
+	incremental.add(DOCS[2:])
+	assert incremental._tail
+	np.testing.assert_allclose(incremental.score(query), built.score(query), rtol=1e-6)
+
+	incremental.save(tmp_path / "bm25.npz")
+	loaded = BM25Index.load(tmp_path / "bm25.npz")
+	np.testing.assert_allclose(loaded.score(query), built.score(query), rtol=1e-6)
+	assert loaded.score("nothing matches").sum() == 0.0
+
+
+def test_fuse_results_rrf_and_weighted():
+	vec = [("a", 0.9, {}), ("b", 0.8, {}), ("c", 0.1, {})]
+	lex = [("c", 12.0, {}), ("a", 3.0, {})]
+	assert [h[0] for h in fuse_results(vec, lex, k=3)] == ["a", "c", "b"]
+	weighted = fuse_results(vec, lex, k=3, fusion="weighted", alpha=0.25)
+	assert [h[0] for h in weighted] == ["c", "a", "b"]
+	assert weighted[0][1] == pytest.approx(0.75)
+
+
+def test_index_lexical_search_persists_and_follows_writes(tmp_path: Path):
+	idx = FlatVectorIndex(2)
+	rng = np.random.default_rng(0)
+	idx.bulk_insert(
+		[f"d{i}" for i in range(len(DOCS))],
+		rng.normal(size=(len(DOCS), 2)).astype(np.float32),
+		[{"text": t} for t in DOCS],
+	)
+	assert [h[0] for h in idx.search_lexical("Acme X200", k=10)] == ["d2", "d0", "d4"]
+
+	idx.save(tmp_path, model_name="fake", default_metric="cosine")
+	assert (tmp_path / "bm25.npz").exists()
+	loaded = FlatVectorIndex.load(tmp_path)
+	assert loaded._bm25 is not None
+	loaded.upsert("d0", np.ones(2, dtype=np.float32), {"text": "renamed product"})
+	loaded.insert("d9", np.ones(2, dtype=np.float32), {"text": "acme x200 x200 x200"})
+	assert [h[0] for h in loaded.search_lexical("Acme X200", k=10)] == ["d9", "d2", "d4"]
+
+
+def test_save_writes_bm25_only_once_built(tmp_path: Path):
+	idx = FlatVectorIndex(2)
+	idx.insert("d0", np.ones(2, dtype=np.float32), {"text": DOCS[0]})
+	idx.save(tmp_path, model_name="fake", default_metric="cosine")
+	assert idx._bm25 is None and not (tmp_path / "bm25.npz").exists()
+
+	loaded = FlatVectorIndex.load(tmp_path)
+	assert [h[0] for h in loaded.search_lexical("Acme", k=1)] == ["d0"]
+	loaded.save(tmp_path, model_name="fake", default_metric="cosine")
+	assert (tmp_path / "bm25.npz").exists()
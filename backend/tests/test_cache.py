@@ -0,0 +1,62 @@
+from __future__ import annotations
+
+import time
+
+import numpy as np
+
+from backend.app.cache import BoundLRUCache, LRUCache
+from backend.app.vector_db import FlatVectorIndex
+
+
+def test_lru_eviction_and_ttl():
+	cache: LRUCache[int] = LRUCache(maxsize=2)
+	cache.put("a", 1)
+	cache.put("b", 2)
+	assert cache.get("a") == 1  # "b" is now least recently used
+	cache.put("c", 3)
+	assert cache.get("b") is None
+	assert cache.get("a") == 1 and cache.get("c") == 3
+	stats = cache.stats()
+	assert (stats["hits"], stats["misses"], stats["evictions"]) == (3, 1, 1)
+
+	short: LRUCache[int] = LRUCache(maxsize=8, ttl_s=0.01)
+	short.put("x", 1)
+	time.sleep(0.02)
+	assert short.get("x") is None
+	assert short.stats()["expirations"] == 1
+
+
+def test_bound_cache_invalidates_on_insert_and_reload():
+	idx = FlatVectorIndex(2)
+	idx.insert("a", np.array([1.0, 0.0], dtype=np.float32), {"text": "A"})
+	cache: BoundLRUCache[str] = BoundLRUCache(maxsize=8)
+
+	cache.bind(idx)
+	cache.put("q", "result")
+	cache.bind(idx)
+	assert cache.get("q") == "result"
+
+	idx.insert("b", np.array([0.0, 1.0], dtype=np.float32), {"text": "B"})
+	cache.bind(idx)
+	assert cache.get("q") is None
+
+	cache.put("q", "result")
+	cache.bind(FlatVectorIndex(2))  # a reloaded index is a new object
+	assert cache.get("q") is None
+	assert cache.stats()["invalidations"] == 2
+
+
+def test_bound_cache_drops_results_from_a_replaced_owner():
+	old, new = FlatVectorIndex(2), FlatVectorIndex(2)
+	cache: BoundLRUCache[str] = BoundLRUCache(maxsize=8)
+	cache.bind(old)
+	# A reload swaps in ``new`` while a search on ``old`` is still running
+	cache.bind(new)
+	cache.put("q", "stale", owner=old)
+	assert cache.get("q") is None
+
+	cache.put("q", "fresh", owner=new)
+	assert cache.get("q") == "fresh"
+	new.insert("a", np.array([1.0, 0.0], dtype=np.float32), {"text": "A"})
+	cache.put("q2", "computed before the insert", owner=new)
+	assert cache.get("q2") is None
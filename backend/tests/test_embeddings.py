@@ -0,0 +1,83 @@
+from __future__ import annotations
+
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+from backend.app.embeddings import EmbeddingService, length_batches
+
+_TEXTS = [
+	"fast vector search",
+	"the quick brown fox jumps over the lazy dog",
+	"search",
+	"vectors vectors vectors and more vectors in the index",
+]
+
+
+def _tiny_model(directory: Path) -> str:
+	"""A randomly initialized BERT sentence encoder saved locally (no download)."""
+	import torch
+	from sentence_transformers import SentenceTransformer, models
+	from transformers import BertConfig, BertModel, BertTokenizerFast
+
+	torch.manual_seed(0)
+	words = sorted({w for t in _TEXTS for w in t.split()} | {"fox", "dog", "index"})
+	(directory / "vocab.txt").write_text(
+		"\n".join(["[PAD]", "[UNK]", "[CLS]", "[SEP]", "[MASK]", *words]), encoding="utf-8"
+	)
+	BertTokenizerFast(str(directory / "vocab.txt")).save_pretrained(str(directory))
+	config = BertConfig(
+		vocab_size=len(words) + 5,
+		hidden_size=32,
+		num_hidden_layers=2,
+		num_attention_heads=2,
+		intermediate_size=64,
+	)
+	BertModel(config).save_pretrained(str(directory))
+	transformer = models.Transformer(str(directory), max_seq_length=16)
+	pooling = models.Pooling(transformer.get_word_embedding_dimension(), pooling_mode="mean")
+	path = directory / "st"
+	st = SentenceTransformer(modules=[transformer, pooling, models.Normalize()], device="cpu")
+	st.save(str(path))
+	return str(path)
+
+
+def test_length_batches_respect_token_budget():
+	lengths = [5, 40, 12, 40, 3, 100, 7]
+	batches = length_batches(lengths, token_budget=80, max_batch=3, max_padding=1.0)
+	assert sorted(int(i) for b in batches for i in b) == list(range(len(lengths)))
+	assert [[lengths[i] for i in b] for b in batches] == [[100], [40, 40], [12, 7, 5], [3]]
+	# Padding 12 + 7 to 24 tokens would add more than 10%
+	batches = length_batches(lengths, token_budget=80, max_batch=3)
+	assert [[lengths[i] for i in b] for b in batches] == [[100], [40, 40], [12], [7], [5], [3]]
+
+
+def test_bulk_encode_matches_encode_in_input_order(tmp_path: Path):
+	enc = EmbeddingService(_tiny_model(tmp_path), max_seq_length=16)
+	texts = _TEXTS * 3 + ["  padded  input  "]
+	expected = enc.encode(texts, batch_size=4, normalize=True)
+	got = enc.encode_bulk(texts, token_budget=24, normalize=True)
+	assert got.shape == expected.shape
+	np.testing.assert_allclose(got, expected, atol=1e-5)
+
+
+def test_onnx_backend_matches_torch(tmp_path: Path):
+	pytest.importorskip("onnxruntime")
+	pytest.importorskip("onnx")
+	model = _tiny_model(tmp_path)
+	torch_enc = EmbeddingService(model, max_seq_length=16)
+	onnx_enc = EmbeddingService(
+		model, max_seq_length=16, backend="onnx", onnx_dir=tmp_path / "onnx", onnx_threads=1
+	)
+	int8_enc = EmbeddingService(
+		model, max_seq_length=16, backend="onnx", onnx_dir=tmp_path / "onnx", onnx_quantize=True
+	)
+
+	expected = torch_enc.encode(_TEXTS, batch_size=3, normalize=True)
+	got = onnx_enc.encode(_TEXTS, batch_size=3, normalize=True)
+	assert got.shape == expected.shape and onnx_enc.model.get_sentence_embedding_dimension() == 32
+	assert np.sum(got * expected, axis=1).min() > 0.9999
+	# Quantized weights change the vectors a little, not their direction
+	assert np.sum(int8_enc.encode(_TEXTS, normalize=True) * expected, axis=1).min() > 0.98
+	np.testing.assert_allclose(onnx_enc.encode_bulk(_TEXTS, token_budget=16), got, atol=1e-5)
@@ -0,0 +1,78 @@
+from __future__ import annotations
+
+import numpy as np
+import pytest
+
+from backend.app.filters import parse_filter
+from backend.app.ivf import IVFVectorIndex
+from backend.app.vector_db import FlatVectorIndex
+
+
+def _metas(n: int) -> list[dict]:
+	return [
+		{
+			"text": f"t{i}",
+			"lang": ["en", "de", "fr"][i % 3],
+			"year": 2000 + i % 25,
+			"draft": i % 10 == 0,
+		}
+		for i in range(n)
+	]
+
+
+def test_parse_filter_forms_and_errors():
+	conds = parse_filter(
+		{"lang": "en", "tag": ["a", "b"], "year": {"gte": 2010, "lt": 2020}, "x": {"eq": 1}}
+	)
+	assert [(c.field, c.op) for c in conds] == [
+		("lang", "eq"),
+		("tag", "in"),
+		("year", "range"),
+		("x", "eq"),
+	]
+	for bad in (
+		{"year": {"gte": "2010"}},
+		{"lang": {"like": "e%"}},
+		{"lang": None},
+		{"tag": [["nested"]]},
+	):
+		with pytest.raises(ValueError):
+			parse_filter(bad)
+
+
+@pytest.mark.parametrize("cls", [FlatVectorIndex, IVFVectorIndex])
+def test_filtered_search_returns_k_matching_hits(cls):
+	rng = np.random.default_rng(0)
+	n = 600
+	data = rng.normal(size=(n, 8)).astype(np.float32)
+	metas = _metas(n)
+	idx = cls(8) if cls is FlatVectorIndex else cls(8, nlist=16, nprobe=1)
+	idx.bulk_insert([str(i) for i in range(n)], data, metas)
+	idx.delete("30")
+	q = data[30]
+
+	spec = {"lang": "en", "draft": True, "year": {"gte": 2005, "lte": 2020}}
+	want = [
+		i
+		for i in range(n)
+		if i != 30
+		and metas[i]["lang"] == "en"
+		and metas[i]["draft"]
+		and 2005 <= metas[i]["year"] <= 2020
+	]
+	hits = idx.search_filtered(q, k=10, conditions=parse_filter(spec))
+	# Selective filter (few matches), narrow probe: still the exact top-k of the matching rows
+	exact = sorted(want, key=lambda i: -float(data[i] @ q / np.linalg.norm(data[i])))[:10]
+	assert [h[0] for h in hits] == [str(i) for i in exact]
+
+	# Dense filter takes the masked full scan
+	dense = idx.search_filtered(
+		q, k=5, conditions=parse_filter({"lang": ["en", "de"]}), metric="dot"
+	)
+	assert len(dense) == 5 and all(h[2]["lang"] in ("en", "de") for h in dense)
+
+	# Columns follow inserts, including new fields
+	idx.insert("new", q, {"text": "x", "lang": "es", "stars": 5})
+	hits = idx.search_filtered(q, k=3, conditions=parse_filter({"stars": {"gt": 4}}))
+	assert [h[0] for h in hits] == ["new"]
+	assert idx.search_filtered(q, k=3, conditions=parse_filter({"lang": "xx"})) == []
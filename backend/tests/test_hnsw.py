@@ -0,0 +1,111 @@
+from __future__ import annotations
+
+from pathlib import Path
+
+import numpy as np
+
+from backend.app.hnsw import HNSWVectorIndex, _Graph
+from backend.app.indexes import load_index, read_manifest
+from backend.app.vector_db import FlatVectorIndex
+
+
+def _recall(approx: list, exact: list) -> float:
+	return len({r[0] for r in approx} & {r[0] for r in exact}) / len(exact)
+
+
+def test_hnsw_recall_against_flat_with_incremental_inserts():
+	rng = np.random.default_rng(0)
+	data = rng.normal(size=(500, 16)).astype(np.float32)
+	flat = FlatVectorIndex(16)
+	hnsw = HNSWVectorIndex(16, M=8, ef_construction=64, ef_search=64)
+	for i, v in enumerate(data[:300]):
+		flat.insert(str(i), v, {"text": str(i)})
+		hnsw.insert(str(i), v, {"text": str(i)})
+	assert hnsw._graph.linked == 300  # linked on insert, not by the first search
+
+	# Live inserts after the graph exists are linked without a rebuild
+	for i, v in enumerate(data[300:], start=300):
+		flat.insert(str(i), v, {"text": str(i)})
+		hnsw.insert(str(i), v, {"text": str(i)})
+
+	assert hnsw._graph.links0.dtype == np.int32
+	queries = rng.normal(size=(20, 16)).astype(np.float32)
+	for metric in ("cosine", "euclidean"):
+		recalls = [
+			_recall(hnsw.search(q, k=10, metric=metric), flat.search(q, k=10, metric=metric))
+			for q in queries
+		]
+		assert np.mean(recalls) >= 0.9
+	assert hnsw.search(data[420], k=1)[0][0] == "420"
+
+
+def test_hnsw_graph_persists(tmp_path: Path):
+	rng = np.random.default_rng(1)
+	data = rng.normal(size=(120, 8)).astype(np.float32)
+	hnsw = HNSWVectorIndex(8, M=4, ef_construction=32)
+	for i, v in enumerate(data):
+		hnsw.insert(str(i), v, {"text": str(i)})
+	hnsw.save(tmp_path, model_name="fake", default_metric="cosine")
+
+	loaded = load_index(tmp_path)
+	assert isinstance(loaded, HNSWVectorIndex)
+	assert loaded._graph.linked == 120
+	np.testing.assert_array_equal(loaded._graph.links0, hnsw._graph.links0[:120])
+	assert loaded.search(data[5], k=5) == hnsw.search(data[5], k=5)
+
+
+
+def test_hnsw_save_takes_arrays_and_manifest_from_one_graph(tmp_path: Path, monkeypatch):
+	rng = np.random.default_rng(2)
+	hnsw = HNSWVectorIndex(8, M=4, ef_construction=32)
+	hnsw.bulk_insert(
+		[str(i) for i in range(60)],
+		rng.normal(size=(60, 8)).astype(np.float32),
+		[{} for _ in range(60)],
+	)
+	saved = hnsw._graph
+	extra_arrays = hnsw._extra_arrays
+
+	def arrays_then_swap() -> dict:
+		arrays = extra_arrays()
+		# A new graph version lands between the arrays and the manifest
+		hnsw._graph = _Graph.empty(hnsw.M)
+		return arrays
+
+	monkeypatch.setattr(hnsw, "_extra_arrays", arrays_then_swap)
+	hnsw.save(tmp_path, model_name="fake", default_metric="cosine")
+	params = read_manifest(tmp_path)["hnsw"]
+	assert (params["entry"], params["max_level"]) == (saved.entry, saved.max_level)
+	assert saved.entry >= 0
+
+def test_hnsw_search_never_modifies_the_graph_and_compact_keeps_it():
+	rng = np.random.default_rng(2)
+	data = rng.normal(size=(300, 8)).astype(np.float32)
+	flat = FlatVectorIndex(8)
+	hnsw = HNSWVectorIndex(8, M=6, ef_construction=48, ef_search=48)
+	ids = [str(i) for i in range(300)]
+	flat.bulk_insert(ids, data, [{} for _ in ids])
+	hnsw.bulk_insert(ids, data, [{} for _ in ids])
+	graph = hnsw._graph
+	links0 = graph.links0.copy()
+	hnsw.search(data[0], k=5)
+	assert hnsw._graph is graph
+	np.testing.assert_array_equal(graph.links0, links0)
+
+	# A searcher holding the old graph is unaffected by later inserts
+	hnsw.insert("new", data[1] + 0.01, {})
+	flat.insert("new", data[1] + 0.01, {})
+	assert hnsw._graph is not graph and hnsw._graph.linked == 301
+	np.testing.assert_array_equal(graph.links0, links0)
+
+	for i in range(0, 300, 3):
+		assert hnsw.delete(str(i)) and flat.delete(str(i))
+	assert hnsw.compact() == 100
+	flat.compact()
+	compacted = hnsw._graph
+	assert compacted.linked == 201 and compacted.links0.max() < 201
+	assert all(compacted.neighbors(n, 0).shape[0] > 0 for n in range(201))
+	queries = rng.normal(size=(20, 8)).astype(np.float32)
+	recalls = [_recall(hnsw.search(q, k=10), flat.search(q, k=10)) for q in queries]
+	assert np.mean(recalls) >= 0.9
+	assert hnsw.search(data[2], k=1)[0][0] == "2"
@@ -0,0 +1,129 @@
+from __future__ import annotations
+
+import json
+
+import numpy as np
+
+from backend.app.config import Settings
+from backend.app.indexing import build_index
+from backend.app.loader import _clean_entry, _iter_json_array, count_blogs, iter_blogs
+from backend.app.metadata_store import BlobRows
+
+
+class CountingEmbedding:
+	model_name = "fake"
+
+	def __init__(self) -> None:
+		self.seen: list[str] = []
+
+	def encode(self, texts, batch_size: int = 64, normalize: bool = False):
+		texts = list(texts)
+		self.seen.extend(texts)
+		return np.asarray([[len(t), 1.0, float(t.count("a"))] for t in texts], dtype=np.float32)
+
+
+def _entries(texts: dict[str, str]) -> list[dict]:
+	return [{"id": k, "metadata": {"text": v}} for k, v in texts.items()]
+
+
+def test_incremental_build_embeds_only_changed_entries():
+	settings = Settings(index_type="flat")
+	emb = CountingEmbedding()
+	first, stats = build_index(_entries({"a": "alpha", "b": "beta", "c": "gamma"}), emb, settings)  # type: ignore[arg-type]
+	assert (stats.embedded, stats.reused, stats.removed) == (3, 0, 0)
+
+	emb.seen.clear()
+	second, stats = build_index(
+		_entries({"a": "alpha", "c": "gamma ray", "d": "delta"}), emb, settings, existing=first  # type: ignore[arg-type]
+	)
+	assert sorted(emb.seen) == ["delta", "gamma ray"]
+	assert (stats.embedded, stats.reused, stats.removed) == (2, 1, 1)
+	assert stats.time_saved_seconds is not None and "reused=1" in stats.summary()
+
+	# Same result as a full rebuild of the new dataset
+	full, _ = build_index(
+		_entries({"a": "alpha", "c": "gamma ray", "d": "delta"}),
+		CountingEmbedding(),  # type: ignore[arg-type]
+		settings,
+	)
+	second._materialize()
+	full._materialize()
+	assert second._ids == full._ids == ["a", "c", "d"]
+	np.testing.assert_array_equal(second._vectors, full._vectors)
+	assert second._metadatas == full._metadatas
+
+
+def test_streamed_build_matches_in_memory(tmp_path):
+	texts = {f"id{i}": "a" * (i % 7 + 1) + f" text {i}" for i in range(25)}
+	jsonl = tmp_path / "blogs.jsonl"
+	jsonl.write_text("\n".join(json.dumps(e) for e in _entries(texts)) + "\n", encoding="utf-8")
+	as_json = tmp_path / "blogs.json"
+	as_json.write_text(json.dumps(_entries(texts) + [{"id": "", "metadata": {}}]), encoding="utf-8")
+
+	# Elements straddling read boundaries must still parse; invalid entries are skipped
+	with as_json.open("r", encoding="utf-8") as f:
+		parsed = [e for e in map(_clean_entry, _iter_json_array(f, read_size=7)) if e]
+	assert parsed == _entries(texts)
+	assert list(iter_blogs(jsonl)) == _entries(texts)
+	assert count_blogs(as_json) == 25
+
+	settings = Settings(index_type="flat", embed_chunk_size=4)
+	streamed, stats = build_index(
+		iter_blogs(jsonl), CountingEmbedding(), settings, count=25, scratch_dir=tmp_path / ".build"  # type: ignore[arg-type]
+	)
+	in_memory, _ = build_index(_entries(texts), CountingEmbedding(), settings)  # type: ignore[arg-type]
+	assert stats.embedded == 25
+	assert isinstance(streamed._vectors, np.memmap)
+	# Rows went to columnar scratch files chunk by chunk, not Python lists
+	assert isinstance(streamed._ids, BlobRows) and isinstance(streamed._metadatas, BlobRows)
+	assert streamed._ids == in_memory._ids and streamed._metadatas == in_memory._metadatas
+	assert "id7" in streamed
+	np.testing.assert_array_equal(streamed._vectors, in_memory._vectors)
+	np.testing.assert_allclose(streamed._normed, in_memory._normed)
+	q = np.array([3.0, 1.0, 1.0], dtype=np.float32)
+	assert streamed.search(q, k=5) == in_memory.search(q, k=5)
+
+
+def _counting_embedding(settings: Settings) -> CountingEmbedding:
+	return CountingEmbedding()
+
+
+def test_parallel_embedding_matches_serial_and_resumes(tmp_path):
+	from backend.app.parallel_build import VECTORS_FILE, embed_parallel
+
+	texts = {f"id{i}": "a" * (i % 7 + 1) + f" text {i}" for i in range(23)}
+	settings = Settings(index_type="flat", embed_chunk_size=4)
+	serial, _ = build_index(_entries(texts), CountingEmbedding(), settings)  # type: ignore[arg-type]
+
+	work_dir = tmp_path / ".build-parallel"
+	encoded, resumed = embed_parallel(
+		_entries(texts),
+		settings,
+		workers=2,
+		threads_per_worker=1,
+		work_dir=work_dir,
+		factory=_counting_embedding,
+	)
+	assert resumed == 0 and len(list(work_dir.glob("shard-*.json"))) == 6
+	parallel, stats = build_index(_entries(texts), None, settings, encoded=encoded)
+	assert stats.embedded == 23
+	assert parallel._ids == serial._ids and parallel._metadatas == serial._metadatas
+	np.testing.assert_array_equal(parallel._vectors, serial._vectors)
+
+	# Interrupted before shard 2 was checkpointed: only that shard is embedded again
+	(work_dir / "shard-000002.json").unlink()
+	rows = np.load(work_dir / VECTORS_FILE, mmap_mode="r+")
+	rows[8:12] = 0.0
+	rows.flush()
+	del rows
+	# A one-pass iterator is planned and dispatched as it is read
+	encoded, resumed = embed_parallel(
+		iter(_entries(texts)),
+		settings,
+		workers=2,
+		work_dir=work_dir,
+		factory=_counting_embedding,
+		count=23,
+	)
+	assert resumed == 5
+	np.testing.assert_array_equal(encoded, serial._vectors)
@@ -0,0 +1,72 @@
+from __future__ import annotations
+
+from pathlib import Path
+
+import numpy as np
+
+from backend.app.indexes import load_index
+from backend.app.ivf import IVFVectorIndex
+from backend.app.vector_db import FlatVectorIndex
+
+
+def _clustered(n: int, dim: int, seed: int = 0) -> np.ndarray:
+	rng = np.random.default_rng(seed)
+	centers = rng.normal(size=(8, dim)).astype(np.float32) * 5.0
+	labels = rng.integers(0, 8, size=n)
+	return (centers[labels] + rng.normal(size=(n, dim))).astype(np.float32)
+
+
+def test_ivf_full_probe_matches_flat_for_all_metrics():
+	data = _clustered(400, 16)
+	flat = FlatVectorIndex(16)
+	ivf = IVFVectorIndex(16, nlist=8, nprobe=2)
+	for i, v in enumerate(data):
+		flat.insert(str(i), v, {"text": str(i)})
+		ivf.insert(str(i), v, {"text": str(i)})
+
+	q = data[7] + 0.1
+	for metric in ("cosine", "dot", "euclidean"):
+		exact = [r[0] for r in flat.search(q, k=10, metric=metric)]
+		approx = [r[0] for r in ivf.search(q, k=10, metric=metric, nprobe=8)]
+		assert approx == exact
+
+	# A narrow probe still finds the query's own cluster
+	assert ivf.search(data[7], k=1, metric="euclidean", nprobe=1)[0][0] == "7"
+
+
+def test_ivf_save_load_roundtrip(tmp_path: Path):
+	data = _clustered(200, 8, seed=1)
+	ivf = IVFVectorIndex(8, nlist=4, nprobe=2)
+	for i, v in enumerate(data):
+		ivf.insert(str(i), v, {"text": str(i)})
+	ivf.save(tmp_path, model_name="fake", default_metric="cosine")
+
+	loaded = load_index(tmp_path)
+	assert isinstance(loaded, IVFVectorIndex)
+	assert loaded.nlist == 4 and loaded.nprobe == 2
+	q = data[3]
+	assert loaded.search(q, k=5) == ivf.search(q, k=5)
+
+
+def test_ivf_inserts_after_training_go_to_the_list_tail():
+	data = _clustered(300, 8, seed=2)
+	flat = FlatVectorIndex(8)
+	ivf = IVFVectorIndex(8, nlist=4, nprobe=4)
+	for i, v in enumerate(data[:200]):
+		flat.insert(str(i), v, {})
+		ivf.insert(str(i), v, {})
+	ivf.search(data[0], k=1)
+	offsets, list_rows, _ = ivf._lists
+	for i, v in enumerate(data[200:], start=200):
+		flat.insert(str(i), v, {})
+		ivf.insert(str(i), v, {})
+		if i % 25 == 0:
+			ivf.search(data[i], k=1)
+
+	q = data[250] + 0.1
+	assert [r[0] for r in ivf.search(q, k=10)] == [r[0] for r in flat.search(q, k=10)]
+	# New rows are searchable from the tail without rebuilding the CSR lists
+	assert ivf._lists[0] is offsets and ivf._lists[1] is list_rows
+	assert sum(len(r) for r in ivf._lists[2].values()) == 100
+	ivf._build_lists()
+	assert ivf._lists[1].shape[0] == 300 and not ivf._lists[2]
@@ -0,0 +1,93 @@
+from __future__ import annotations
+
+import numpy as np
+import pytest
+from fastapi.testclient import TestClient
+
+from backend.app.metrics import Counter, Histogram, Registry, stage
+
+
+def test_registry_renders_prometheus_text():
+	registry = Registry()
+	requests = registry.register(Counter("t_requests_total", "Requests", ["path"]))
+	latency = registry.register(Histogram("t_seconds", "Latency", buckets=(0.1, 1.0)))
+	requests.inc('/a"b')
+	requests.inc('/a"b', amount=2)
+	for v in (0.05, 0.1, 0.5, 3.0):
+		latency.observe(v)
+	# Outside a request, stage() records nothing
+	with stage("encode"):
+		pass
+
+	text = registry.render()
+	assert "# TYPE t_requests_total counter" in text
+	assert 't_requests_total{path="/a\\"b"} 3' in text
+	assert 't_seconds_bucket{le="0.1"} 2' in text
+	assert 't_seconds_bucket{le="1"} 3' in text
+	assert 't_seconds_bucket{le="+Inf"} 4' in text
+	assert "t_seconds_count 4" in text and "t_seconds_sum 3.65" in text
+
+
+def test_search_stages_reach_metrics_and_server_timing(monkeypatch):
+	import backend.app.main as m
+	from backend.app.metrics import REQUESTS, STAGE_SECONDS
+	from backend.app.vector_db import FlatVectorIndex
+
+	class FakeEmbedding:
+		model_name = "fake"
+		normalize_input = True
+
+		def encode(self, texts, batch_size: int = 1, normalize: bool = False):
+			return np.ones((len(list(texts)), 2), dtype=np.float32)
+
+	idx = FlatVectorIndex(2)
+	idx.insert("a", np.array([1.0, 1.0], dtype=np.float32), {"text": "a"})
+	monkeypatch.setattr(m, "INDEX", idx, raising=False)
+	monkeypatch.setattr(m, "EMBEDDINGS", FakeEmbedding(), raising=False)
+	monkeypatch.setattr(m, "BATCHER", None, raising=False)
+	monkeypatch.setattr(m, "ERROR_MESSAGE", None, raising=False)
+	monkeypatch.setattr(m.settings, "server_timing", True)
+	m.QUERY_CACHE.clear()
+	m.RESULT_CACHE.clear()
+	client = TestClient(m.app)
+	before = {
+		s: STAGE_SECONDS.count(s)
+		for s in ("normalize", "encode", "search", "score", "topk", "serialize")
+	}
+	ok = REQUESTS.value("/search", "200")
+
+	r = client.post("/search", json={"query": "metrics probe", "k": 3})
+	assert r.status_code == 200 and r.json()["results"][0]["id"] == "a"
+	timing = r.headers["server-timing"]
+	for name in ("normalize", "encode", "search", "score", "topk", "serialize", "total"):
+		assert f"{name};dur=" in timing
+	assert all(STAGE_SECONDS.count(s) == n + 1 for s, n in before.items())
+	assert REQUESTS.value("/search", "200") == ok + 1
+	assert client.post("/search", json={"query": ""}).status_code == 422
+
+	r = client.get("/metrics")
+	assert r.status_code == 200
+	assert r.headers["content-type"].startswith("text/plain; version=0.0.4")
+	assert 'vsearch_http_errors_total{path="/search",status="422"}' in r.text
+	assert "vsearch_index_size 1" in r.text
+	assert 'vsearch_search_queries_total{endpoint="search",metric="cosine",mode="vector"}' in r.text
+	assert 'vsearch_stage_duration_seconds_bucket{stage="topk",le="+Inf"}' in r.text
+	assert "# TYPE vsearch_cache_events_total counter" in r.text
+	assert 'vsearch_cache_events_total{cache="result",event="misses"}' in r.text
+
+
+def test_unhandled_exception_is_one_error_and_still_timed():
+	import asyncio
+
+	from backend.app.metrics import ERRORS, REQUEST_SECONDS, MetricsMiddleware
+
+	async def boom(scope, receive, send):
+		raise RuntimeError("boom")
+
+	app = MetricsMiddleware(boom, paths=lambda: ["/boom"])
+	before = (ERRORS.value("/boom", "exception"), REQUEST_SECONDS.count("/boom"))
+	with pytest.raises(RuntimeError):
+		asyncio.run(app({"type": "http", "path": "/boom"}, None, None))  # type: ignore[arg-type]
+	assert ERRORS.value("/boom", "exception") == before[0] + 1
+	assert ERRORS.value("/boom", "500") == 0
+	assert REQUEST_SECONDS.count("/boom") == before[1] + 1
@@ -0,0 +1,78 @@
+from __future__ import annotations
+
+import asyncio
+import threading
+import time
+
+import numpy as np
+import pytest
+from fastapi.testclient import TestClient
+
+from backend.app.pipeline import DeadlineExceeded, Overloaded, SearchPipeline
+
+
+def test_admission_limit_and_deadlines():
+	pipeline = SearchPipeline(encode_threads=1, score_threads=1, max_inflight=1, deadline_ms=50.0)
+
+	with pipeline.admit(), pytest.raises(Overloaded), pipeline.admit():
+		pass
+	with pipeline.admit():
+		pass
+
+	async def scenario() -> None:
+		release = threading.Event()
+		assert await pipeline.score(lambda: 7) == 7
+		# The only encode thread is busy, so the second call times out in the queue and never runs
+		ran = []
+		blocker = asyncio.ensure_future(pipeline.encode(release.wait))
+		await asyncio.sleep(0.01)
+		with pytest.raises(DeadlineExceeded):
+			await pipeline.encode(lambda: ran.append(1), pipeline.deadline())
+		release.set()
+		assert await blocker is True
+		await asyncio.sleep(0.01)
+		assert ran == []
+		with pytest.raises(DeadlineExceeded):
+			await pipeline.score(lambda: time.sleep(0.2), pipeline.deadline(timeout_ms=20.0))
+
+	asyncio.run(scenario())
+	stats = pipeline.stats()
+	counts = (stats["admitted"], stats["rejected"], stats["deadline_exceeded"], stats["inflight"])
+	assert counts == (2, 1, 2, 0)
+	pipeline.close()
+
+
+def test_search_sheds_with_429_and_503(monkeypatch):
+	import backend.app.main as m
+	from backend.app.vector_db import FlatVectorIndex
+
+	class SlowEmbedding:
+		model_name = "fake"
+		normalize_input = True
+
+		def encode(self, texts, batch_size: int = 1, normalize: bool = False):
+			time.sleep(0.2)
+			return np.ones((len(list(texts)), 2), dtype=np.float32)
+
+	idx = FlatVectorIndex(2)
+	idx.insert("a", np.array([1.0, 1.0], dtype=np.float32), {"text": "a"})
+	pipeline = SearchPipeline(encode_threads=1, score_threads=1, max_inflight=1)
+	monkeypatch.setattr(m, "INDEX", idx, raising=False)
+	monkeypatch.setattr(m, "EMBEDDINGS", SlowEmbedding(), raising=False)
+	monkeypatch.setattr(m, "BATCHER", None, raising=False)
+	monkeypatch.setattr(m, "ERROR_MESSAGE", None, raising=False)
+	monkeypatch.setattr(m, "PIPELINE", pipeline, raising=False)
+	m.QUERY_CACHE.clear()
+	m.RESULT_CACHE.clear()
+	client = TestClient(m.app)
+
+	r = client.post("/search", json={"query": "too slow", "timeout_ms": 20})
+	assert r.status_code == 503 and r.headers["retry-after"] == "1"
+	with pipeline.admit():
+		r = client.post("/search", json={"query": "no room"})
+		assert r.status_code == 429
+		assert client.post("/search/batch", json={"queries": ["no room"]}).status_code == 429
+	r = client.post("/search", json={"query": "fits"})
+	assert r.status_code == 200 and r.json()["results"][0]["id"] == "a"
+	assert client.get("/stats").json()["search_pipeline"]["rejected"] == 2
+	pipeline.close()
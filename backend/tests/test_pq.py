@@ -0,0 +1,92 @@
+from __future__ import annotations
+
+from pathlib import Path
+from typing import Tuple
+
+import numpy as np
+
+from backend.app.indexes import load_index, recall_at_k
+from backend.app.pq import PQVectorIndex
+from backend.app.vector_db import FlatVectorIndex, Metric
+
+METRICS: Tuple[Metric, ...] = ("cosine", "dot", "euclidean")
+
+
+def _build(n: int = 600, dim: int = 32, seed: int = 0):
+	rng = np.random.default_rng(seed)
+	data = rng.normal(size=(n, dim)).astype(np.float32)
+	flat = FlatVectorIndex(dim)
+	pq = PQVectorIndex(dim, m=8, rerank=50)
+	for i, v in enumerate(data):
+		flat.insert(str(i), v, {"text": str(i)})
+		pq.insert(str(i), v, {"text": str(i)})
+	return data, flat, pq
+
+
+def test_pq_compression_and_recall():
+	data, flat, pq = _build()
+	assert pq.search(data[0], k=1)[0][0] == "0"
+	assert pq._codes.dtype == np.uint8 and pq._codes.shape == (600, 8)
+	assert pq._normed is None
+	# Codebooks dominate at this tiny N; the ratio grows towards 4*(2D+1)/(m+4) with N
+	assert pq.compression_ratio() > 3.0
+
+	queries = data[:30] + 0.01
+	for metric in METRICS:
+		assert recall_at_k(pq, flat, queries, k=10, metric=metric) >= 0.9
+	pq.rerank = 0
+	assert recall_at_k(pq, flat, queries, k=1, metric="euclidean") >= 0.5
+
+
+def test_pq_save_load_memmaps_vectors(tmp_path: Path):
+	data, flat, pq = _build(n=300, dim=16, seed=1)
+	pq.save(tmp_path, model_name="fake", default_metric="cosine")
+	assert (tmp_path / "vectors.npy").exists()
+
+	loaded = load_index(tmp_path)
+	assert isinstance(loaded, PQVectorIndex)
+	assert isinstance(loaded._mapped, np.memmap)
+	np.testing.assert_array_equal(loaded._codes, pq._codes)
+	assert loaded.search(data[9], k=3) == pq.search(data[9], k=3)
+	assert loaded.search(data[9], k=1)[0][0] == flat.search(data[9], k=1)[0][0]
+
+
+def test_pq_inserts_after_load_leave_the_mapping_on_disk(tmp_path: Path):
+	data, _, pq = _build(n=300, dim=16, seed=4)
+	pq.save(tmp_path, model_name="fake", default_metric="cosine")
+	loaded = load_index(tmp_path)
+	assert isinstance(loaded, PQVectorIndex)
+	mapped = loaded._mapped
+	extra = data[:3] + 0.25
+	for i, v in enumerate(extra):
+		loaded.insert(f"new-{i}", v, {"text": "new"})
+		assert loaded.search(v, k=1)[0][0] == f"new-{i}"
+	# New float32 rows are buffered after the memmap, which is never copied into RAM
+	assert loaded._mapped is mapped and loaded._vectors is not None
+	assert loaded._vectors.shape == (3, 16) and loaded._codes.shape == (303, 8)
+	np.testing.assert_array_equal(loaded._all_vectors()[300:], extra)
+
+	loaded.save(tmp_path, model_name="fake", default_metric="cosine")
+	again = load_index(tmp_path)
+	assert again.size() == 303 and again.search(extra[2], k=1)[0][0] == "new-2"
+
+
+def test_pq_tombstones_survive_save_load(tmp_path: Path):
+	data, _, pq = _build(n=300, dim=16, seed=2)
+	assert pq.delete("5")
+	pq.save(tmp_path, model_name="fake", default_metric="cosine")
+
+	loaded = load_index(tmp_path)
+	assert isinstance(loaded, PQVectorIndex)
+	assert "5" not in loaded
+	assert all(doc_id != "5" for doc_id, _, _ in loaded.search(data[5], k=10))
+	loaded.rerank = 0
+	assert all(doc_id != "5" for doc_id, _, _ in loaded.search(data[5], k=10))
+
+
+def test_pq_search_ignores_rows_not_yet_encoded():
+	data, _, pq = _build(n=300, dim=16, seed=3)
+	pq.search(data[0], k=1)
+	# As seen by a search racing an insert: norms already grown, codes not yet
+	pq._sqnorms = np.concatenate([pq._sqnorms, np.ones((5,), dtype=np.float32)])
+	assert pq.search(data[7], k=1, rerank=0)[0][0] == "7"
@@ -0,0 +1,88 @@
+from __future__ import annotations
+
+from pathlib import Path
+
+import numpy as np
+from fastapi.testclient import TestClient
+
+from backend.app.reload import IndexDirWatcher
+from backend.app.vector_db import FlatVectorIndex
+
+
+class FakeEmbedding:
+	model_name = "fake"
+	normalize_input = True
+
+	def encode(self, texts, batch_size: int = 1, normalize: bool = False):
+		return np.ones((len(list(texts)), 4), dtype=np.float32)
+
+
+def _index(n: int, seed: int, dim: int = 4) -> FlatVectorIndex:
+	rng = np.random.default_rng(seed)
+	idx = FlatVectorIndex(dim)
+	idx.bulk_insert(
+		[f"{seed}-{i}" for i in range(n)],
+		rng.normal(size=(n, dim)).astype(np.float32),
+		[{"text": str(i)} for i in range(n)],
+	)
+	return idx
+
+
+def test_admin_reload_swaps_validated_index(monkeypatch, tmp_path: Path):
+	import backend.app.main as m
+
+	_index(5, seed=1).save(tmp_path, model_name="fake", default_metric="cosine")
+	current = FlatVectorIndex.load(tmp_path)
+	monkeypatch.setattr(m.settings, "index_dir", tmp_path)
+	monkeypatch.setattr(m.settings, "admin_token", None)
+	monkeypatch.setattr(m, "INDEX", current, raising=False)
+	monkeypatch.setattr(m, "INDEX_GENERATION", 1, raising=False)
+	monkeypatch.setattr(m, "EMBEDDINGS", FakeEmbedding(), raising=False)
+	monkeypatch.setattr(m, "ERROR_MESSAGE", None, raising=False)
+	client = TestClient(m.app)
+	headers = {"X-Admin-Token": "secret"}
+
+	# Without a configured token the endpoint is off, whatever the header says
+	assert client.post("/admin/reload", headers=headers).status_code == 403
+	monkeypatch.setattr(m.settings, "admin_token", "secret")
+	assert client.post("/admin/reload").status_code == 401
+	_index(8, seed=2).save(tmp_path, model_name="fake", default_metric="cosine")
+	r = client.post("/admin/reload", headers=headers)
+	assert r.status_code == 200
+	body = r.json()
+	got = [body[k] for k in ("previous_generation", "generation", "size", "reloaded")]
+	assert got == [1, 2, 8, True]
+	assert m.INDEX is not None and m.INDEX is not current and m.INDEX.size() == 8
+	# A search that took the old reference before the swap still completes on it
+	assert current.search(np.ones(4, dtype=np.float32), k=1)[0][0].startswith("1-")
+
+	# Built with another model, or another dimension: rejected, the current index keeps serving
+	serving = m.INDEX
+	_index(3, seed=3).save(tmp_path, model_name="other-model", default_metric="cosine")
+	r = client.post("/admin/reload", headers=headers)
+	assert r.status_code == 409 and "other-model" in r.json()["detail"]
+	assert m.INDEX is serving and m.INDEX_GENERATION == 2
+
+
+def test_index_dir_watcher_ignores_own_saves(monkeypatch, tmp_path: Path):
+	import backend.app.main as m
+
+	_index(5, seed=1).save(tmp_path, model_name="fake", default_metric="cosine")
+	monkeypatch.setattr(m.settings, "index_dir", tmp_path)
+	monkeypatch.setattr(m, "INDEX", FlatVectorIndex.load(tmp_path), raising=False)
+	monkeypatch.setattr(m, "INDEX_GENERATION", 1, raising=False)
+	monkeypatch.setattr(m, "EMBEDDINGS", FakeEmbedding(), raising=False)
+
+	watcher = IndexDirWatcher(tmp_path, m._on_index_dir_change, interval_s=60)
+	try:
+		assert watcher.poll() is False
+		# The server's own maintenance save is not treated as a new index
+		monkeypatch.setattr(m, "_UNSAVED_WRITES", 1, raising=False)
+		m._maintain_index(flush=True)
+		assert watcher.poll() is True and m.INDEX_GENERATION == 1
+		_index(7, seed=4).save(tmp_path, model_name="fake", default_metric="cosine")
+		assert watcher.poll() is True and m.INDEX_GENERATION == 2
+		assert m.INDEX is not None and m.INDEX.size() == 7
+		assert watcher.poll() is False
+	finally:
+		watcher.close()
@@ -0,0 +1,78 @@
+from __future__ import annotations
+
+from pathlib import Path
+
+import numpy as np
+
+from backend.app.indexes import load_index
+from backend.app.sharded import ShardedVectorIndex
+from backend.app.vector_db import FlatVectorIndex, Metric
+
+METRICS: tuple[Metric, ...] = ("cosine", "dot", "euclidean")
+
+
+def _assert_same(got, want) -> None:
+	# Same rows in the same order; BLAS may round a slice's dot products differently in the last ulp
+	assert [(r[0], r[2]) for r in got] == [(r[0], r[2]) for r in want]
+	np.testing.assert_allclose([r[1] for r in got], [r[1] for r in want], rtol=1e-5)
+
+
+def _pair(n: int, dim: int) -> tuple[FlatVectorIndex, ShardedVectorIndex, np.ndarray]:
+	rng = np.random.default_rng(0)
+	data = rng.normal(size=(n, dim)).astype(np.float32)
+	ids = [str(i) for i in range(n)]
+	metas = [{"text": str(i)} for i in range(n)]
+	flat = FlatVectorIndex(dim)
+	sharded = ShardedVectorIndex(dim, shards=4, threads=3)
+	sharded.min_shard_rows = 10
+	flat.bulk_insert(ids, data, metas)
+	sharded.bulk_insert(ids, data, metas)
+	return flat, sharded, data
+
+
+def test_sharded_search_matches_flat():
+	flat, sharded, data = _pair(203, 8)
+	assert len(sharded._bounds(203)) == 4
+	for d in ("5", "77", "150"):
+		flat.delete(d)
+		sharded.delete(d)
+	queries = data[[5, 9, 100]] + 0.05
+	for metric in METRICS:
+		for q in queries:
+			_assert_same(
+				sharded.search(q, k=10, metric=metric), flat.search(q, k=10, metric=metric)
+			)
+		for got, want in zip(
+			sharded.search_batch(queries, k=10, metric=metric),
+			flat.search_batch(queries, k=10, metric=metric),
+		):
+			_assert_same(got, want)
+	# k larger than a shard still yields the global top-k
+	_assert_same(sharded.search(queries[0], k=120), flat.search(queries[0], k=120))
+
+
+def test_sharded_save_load_roundtrip(tmp_path: Path):
+	_, sharded, data = _pair(50, 4)
+	sharded.save(tmp_path, model_name="fake", default_metric="cosine")
+	loaded = load_index(tmp_path)
+	assert isinstance(loaded, ShardedVectorIndex) and loaded.shards == 4
+	assert loaded.search(data[3], k=5) == sharded.search(data[3], k=5)
+
+
+def test_load_applies_search_settings(tmp_path: Path):
+	from backend.app.config import Settings
+	from backend.app.ivf import IVFVectorIndex
+
+	_, sharded, data = _pair(50, 4)
+	sharded.save(tmp_path / "sharded", model_name="fake", default_metric="cosine")
+	loaded = load_index(tmp_path / "sharded", Settings(search_shards=2, search_threads=5))
+	assert isinstance(loaded, ShardedVectorIndex) and (loaded.shards, loaded.threads) == (2, 5)
+	loaded.min_shard_rows = 10
+	_assert_same(loaded.search(data[3], k=5), sharded.search(data[3], k=5))
+
+	ivf = IVFVectorIndex(4, nlist=4, nprobe=1)
+	ivf.bulk_insert([str(i) for i in range(50)], data, [{} for _ in range(50)])
+	ivf.save(tmp_path / "ivf", model_name="fake", default_metric="cosine")
+	saved, tuned = load_index(tmp_path / "ivf"), load_index(tmp_path / "ivf", Settings(ivf_nprobe=3))
+	assert isinstance(saved, IVFVectorIndex) and isinstance(tuned, IVFVectorIndex)
+	assert saved.nprobe == 1 and tuned.nprobe == 3
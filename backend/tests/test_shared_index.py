@@ -0,0 +1,73 @@
+from __future__ import annotations
+
+import multiprocessing as mp
+from pathlib import Path
+
+import numpy as np
+
+from backend.app.shared_index import (
+	GenerationWatcher,
+	load_generation,
+	publish_index,
+	read_generation,
+)
+from backend.app.vector_db import FlatVectorIndex
+
+
+def _index(n: int, seed: int) -> FlatVectorIndex:
+	rng = np.random.default_rng(seed)
+	idx = FlatVectorIndex(4)
+	idx.bulk_insert(
+		[f"{seed}-{i}" for i in range(n)],
+		rng.normal(size=(n, 4)).astype(np.float32),
+		[{} for _ in range(n)],
+	)
+	return idx
+
+
+def _worker_top_hit(root: str, query: list) -> str:
+	index, _ = load_generation(Path(root))
+	hit: str = index.search(np.asarray(query, dtype=np.float32), k=1)[0][0]
+	return hit
+
+
+def test_publish_generations_and_watcher_switch(tmp_path: Path):
+	first = _index(20, seed=1)
+	assert publish_index(first, tmp_path, model_name="fake", default_metric="cosine") == 1
+	index, generation = load_generation(tmp_path)
+	assert generation == 1
+	# Workers map the published arrays read-only instead of holding private copies
+	assert isinstance(index._vectors, np.memmap) and not index._vectors.flags.writeable
+
+	# Another process attaches to the same files
+	assert first._vectors is not None
+	q = first._vectors[3].tolist()
+	with mp.get_context("spawn").Pool(1) as pool:
+		assert pool.apply(_worker_top_hit, (str(tmp_path), q)) == "1-3"
+
+	seen = []
+	watcher = GenerationWatcher(
+		tmp_path, lambda idx, gen: seen.append((idx, gen)), current=1, interval_s=60
+	)
+	try:
+		assert watcher.poll() is False
+		for seed in (2, 3):
+			publish_index(
+				_index(10, seed), tmp_path, model_name="fake", default_metric="cosine", keep=2
+			)
+		assert read_generation(tmp_path) == 3
+		assert watcher.poll() is True and seen[-1][1] == 3 and seen[-1][0].size() == 10
+		assert sorted(p.name for p in tmp_path.glob("gen-*")) == ["gen-00000002", "gen-00000003"]
+	finally:
+		watcher.close()
+
+
+def test_generation_load_applies_search_settings(tmp_path: Path):
+	from backend.app.config import Settings
+	from backend.app.sq import SQVectorIndex
+
+	idx = SQVectorIndex(4, rerank=0)
+	idx._copy_from(_index(20, seed=3))
+	publish_index(idx, tmp_path, model_name="fake", default_metric="cosine")
+	index, _ = load_generation(tmp_path, settings=Settings(sq_rerank=7))
+	assert isinstance(index, SQVectorIndex) and index.rerank == 7
@@ -0,0 +1,71 @@
+from __future__ import annotations
+
+from pathlib import Path
+from typing import Tuple
+
+import numpy as np
+import pytest
+
+from backend.app.indexes import load_index, read_manifest, recall_at_k
+from backend.app.sq import SQVectorIndex
+from backend.app.vector_db import FlatVectorIndex, Metric
+
+METRICS: Tuple[Metric, ...] = ("cosine", "dot", "euclidean")
+
+
+def _build(dtype: str, n: int = 500, dim: int = 32, seed: int = 0):
+	rng = np.random.default_rng(seed)
+	data = rng.normal(size=(n, dim)).astype(np.float32)
+	ids = [str(i) for i in range(n)]
+	metas = [{"text": str(i)} for i in range(n)]
+	flat = FlatVectorIndex(dim)
+	sq = SQVectorIndex(dim, dtype=dtype, rerank=0)  # type: ignore[arg-type]
+	flat.bulk_insert(ids, data, metas)
+	sq.bulk_insert(ids, data, metas)
+	return data, flat, sq
+
+
+@pytest.mark.parametrize("dtype,min_ratio", [("float16", 3.5), ("int8", 6.5)])
+def test_sq_recall_and_compression(dtype: str, min_ratio: float):
+	data, flat, sq = _build(dtype)
+	assert sq.search(data[0], k=1)[0][0] == "0"
+	assert sq._codes.dtype == np.dtype(dtype) and sq._normed is None
+	assert sq.compression_ratio() > min_ratio
+
+	queries = data[:30] + 0.01
+	for metric in METRICS:
+		assert recall_at_k(sq, flat, queries, k=10, metric=metric) >= 0.9
+		# A float32 re-rank of a wide candidate set restores the exact top-k
+		sq.rerank = 100
+		assert recall_at_k(sq, flat, queries, k=10, metric=metric) == 1.0
+		sq.rerank = 0
+
+
+def test_sq_save_load_persists_quantizer(tmp_path: Path):
+	data, _, sq = _build("int8", n=200, dim=8, seed=1)
+	sq.rerank = 20
+	sq.save(tmp_path, model_name="fake", default_metric="cosine", layout="npy")
+	assert read_manifest(tmp_path)["sq"] == {"dtype": "int8", "rerank": 20}
+
+	loaded = load_index(tmp_path)
+	assert isinstance(loaded, SQVectorIndex) and loaded.dtype == "int8"
+	assert isinstance(loaded._mapped, np.memmap)
+	assert loaded._scale is not None and sq._scale is not None
+	np.testing.assert_array_equal(loaded._codes, sq._codes)
+	np.testing.assert_array_equal(loaded._scale, sq._scale)
+	assert loaded.search(data[9], k=3) == sq.search(data[9], k=3)
+
+
+def test_sq_inserts_encode_into_the_codes_buffer():
+	data, _, sq = _build("int8", n=100, dim=8, seed=2)
+	sq.search(data[0], k=1)
+	sq.insert("new-0", data[1] + 0.5, {"text": "new"})
+	sq.search(data[0], k=1)
+	buf = sq._codes_buf
+	assert buf is not None and sq._codes.base is buf
+	for i in range(1, 5):
+		sq.insert(f"new-{i}", data[i] + 0.5, {"text": "new"})
+		assert sq.search(data[i] + 0.5, k=1, rerank=10)[0][0] == f"new-{i}"
+	# Appended in place: the buffer had room, so the existing codes were not copied
+	assert sq._codes.base is buf and sq._codes.shape[0] == 105
+	np.testing.assert_array_equal(sq._codes[104], sq._encode((data[4] + 0.5)[None, :])[0])
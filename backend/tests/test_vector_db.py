@@ -25,3 +25,150 @@ def test_metrics_and_topk():
     assert l2[0][0] == "a"
 
 
+
+
+def test_search_batch_matches_single_queries():
+	rng = np.random.default_rng(0)
+	idx = FlatVectorIndex(8)
+	for i, v in enumerate(rng.normal(size=(50, 8)).astype(np.float32)):
+		idx.insert(str(i), v, {"text": str(i)})
+	queries = rng.normal(size=(7, 8)).astype(np.float32)
+
+	for metric in ("cosine", "dot", "euclidean"):
+		for normalize in (False, True):
+			# tiny chunk budget forces several chunks over Q
+			batch = idx.search_batch(
+				queries, k=5, metric=metric, normalize_scores=normalize, max_chunk_bytes=400
+			)
+			assert len(batch) == len(queries)
+			for q, got in zip(queries, batch):
+				single = idx.search(q, k=5, metric=metric, normalize_scores=normalize)
+				assert [r[0] for r in got] == [r[0] for r in single]
+				np.testing.assert_allclose(
+					[r[1] for r in got], [r[1] for r in single], rtol=1e-5, atol=1e-6
+				)
+
+
+def test_npy_layout_memmaps_and_reads_legacy_npz(tmp_path):
+	from backend.app.indexes import load_index
+
+	rng = np.random.default_rng(1)
+	idx = FlatVectorIndex(4)
+	for i, v in enumerate(rng.normal(size=(20, 4)).astype(np.float32)):
+		idx.insert(str(i), v, {"text": str(i)})
+	q = rng.normal(size=4).astype(np.float32)
+
+	idx.save(tmp_path / "npz", model_name="fake", default_metric="cosine")
+	idx.save(tmp_path / "npy", model_name="fake", default_metric="cosine", layout="npy")
+	assert (tmp_path / "npz" / "data.npz").exists()
+	assert not (tmp_path / "npy" / "data.npz").exists()
+
+	mapped = load_index(tmp_path / "npy")
+	assert isinstance(mapped._vectors, np.memmap)
+	assert (
+		mapped.search(q, k=5) == load_index(tmp_path / "npz").search(q, k=5) == idx.search(q, k=5)
+	)
+
+	# A memory-mapped index still accepts inserts
+	mapped.insert("new", q, {"text": "new"})
+	assert mapped.search(q, k=1)[0][0] == "new"
+
+
+def test_upsert_delete_tombstones_and_compact():
+    idx = FlatVectorIndex(3)
+    idx.insert("a", np.array([1.0, 0.0, 0.0], dtype=np.float32), {"text": "A"})
+    idx.insert("b", np.array([0.0, 1.0, 0.0], dtype=np.float32), {"text": "B"})
+    idx.insert("c", np.array([0.0, 0.0, 1.0], dtype=np.float32), {"text": "C"})
+    q = np.array([1.0, 0.2, 0.0], dtype=np.float32)
+
+    # Replacing "a" tombstones its old row; the new vector is what gets ranked
+    idx.upsert("a", np.array([0.0, 0.0, 1.0], dtype=np.float32), {"text": "A2"})
+    assert idx.size() == 3
+    top = idx.search(q, k=3)
+    assert top[0][0] == "b"
+    assert [r[2]["text"] for r in top if r[0] == "a"] == ["A2"]
+
+    assert idx.delete("b") is True
+    assert idx.delete("missing") is False
+    assert {r[0] for r in idx.search(q, k=10)} == {"a", "c"}
+    assert {r[0] for r in idx.search_batch(q[None, :], k=10)[0]} == {"a", "c"}
+    assert [i for i, _ in idx.iter_records()] == ["c", "a"]
+
+    version = idx.version
+    assert idx.compact() == 2
+    assert idx.version > version and idx.tombstone_ratio() == 0.0
+    assert idx._ids == ["c", "a"] and idx._vectors.shape == (2, 3)
+    assert {r[0] for r in idx.search(q, k=10)} == {"a", "c"}
+
+
+def test_bulk_insert_array_and_amortized_growth(tmp_path):
+    rng = np.random.default_rng(0)
+    X = rng.normal(size=(40, 6)).astype(np.float32)
+    ids = [f"r{i}" for i in range(40)]
+
+    bulk = FlatVectorIndex(6)
+    bulk.bulk_insert(ids[:20], X[:20], [{"i": i} for i in range(20)])
+    single = FlatVectorIndex(6)
+    for i in range(20):
+        single.insert(ids[i], X[i], {"i": i})
+    q = rng.normal(size=6).astype(np.float32)
+    assert bulk.search(q, k=5) == single.search(q, k=5)
+
+    # Appends write into the doubled buffer in place; searches never rebuild it
+    bulk.insert(ids[20], X[20], {"i": 20})
+    buf = bulk._vectors_buf
+    assert buf is not None and buf.shape[0] == 40  # doubled from 20
+    for i in range(21, 40):
+        bulk.insert(ids[i], X[i], {"i": i})
+        assert bulk.search(X[i], k=1)[0][0] == ids[i]
+    assert bulk._vectors_buf is buf and bulk._vectors.base is buf
+    np.testing.assert_array_equal(bulk._vectors, X)
+
+    # Rows loaded from a memmap are copied into a buffer once on the first insert
+    bulk.save(tmp_path, model_name="m", default_metric="cosine", layout="npy")
+    loaded = FlatVectorIndex.load(tmp_path)
+    loaded.insert("new", X[0] * 2, {})
+    assert loaded.size() == 41 and loaded.search(X[5], k=1)[0][0] == "r5"
+    assert loaded._vectors.base is loaded._vectors_buf
+
+
+def test_columnar_rows_decode_on_access_and_follow_writes(tmp_path):
+	import json
+
+	from backend.app.metadata_store import BlobRows, IdLookup
+
+	rng = np.random.default_rng(2)
+	X = rng.normal(size=(30, 4)).astype(np.float32)
+	idx = FlatVectorIndex(4)
+	idx.bulk_insert(
+		[f"id{i}" for i in range(30)], X, [{"text": f"t{i} é", "n": i} for i in range(30)]
+	)
+	idx.delete("id3")
+	idx.save(tmp_path, model_name="m", default_metric="cosine", layout="npy")
+
+	manifest = json.loads((tmp_path / "index.json").read_text(encoding="utf-8"))
+	assert "ids" not in manifest and "metadatas" not in manifest and manifest["count"] == 30
+
+	loaded = FlatVectorIndex.load(tmp_path)
+	assert isinstance(loaded._metadatas, BlobRows) and isinstance(loaded._id_to_row, IdLookup)
+	assert loaded._metadatas[7] == {"text": "t7 é", "n": 7} and loaded._ids == idx._ids
+	assert loaded.search(X[5], k=3) == idx.search(X[5], k=3)
+	assert "id5" in loaded and "id3" not in loaded and "nope" not in loaded
+
+	# Writes after load go to the tail and the hash-table overlay
+	loaded.upsert("id5", X[6], {"text": "new"})
+	loaded.insert("extra", X[0], {"text": "extra"})
+	assert loaded.delete("id9") and not loaded.delete("id9")
+	assert loaded.search(X[6], k=2)[0][2] in ({"text": "new"}, {"text": "t6 é", "n": 6})
+	assert dict(loaded._id_map().items())["id5"] == 30
+	assert [i for i, _ in loaded.iter_records()][-2:] == ["id5", "extra"]
+
+	# Compaction gathers the surviving blob rows without decoding them
+	clone = loaded.clone()
+	assert clone.compact() == 3
+	assert isinstance(clone._ids, BlobRows) and len(clone._ids) == 29
+	assert list(clone.iter_records()) == list(loaded.iter_records())
+	clone.save(tmp_path / "compacted", model_name="m", default_metric="cosine")
+	again = FlatVectorIndex.load(tmp_path / "compacted")
+	assert list(again.iter_records()) == list(loaded.iter_records())
+	assert again._id_map().get("extra") == 28
@@ -58,11 +58,11 @@ function App() {
 
 const debouncedSearch = useMemo(() => debounce(doSearch, 280), [k, metric])
 
-// Load all posts on mount for empty state
+// Load the first page of posts on mount for empty state
 useEffect(() => {
     (async () => {
         try {
-            const data = await fetchJSON<SearchResponse>('http://localhost:8000/posts')
+            const data = await fetchJSON<SearchResponse>('http://localhost:8000/posts?limit=100')
             setResults(data.results)
         } catch (e: any) {
             setError(e?.message || 'Failed to load posts')